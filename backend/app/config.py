@@ -0,0 +1,112 @@
+"""
+Runtime configuration, read from the environment (or a .env file).
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Storage. Point DATA_DIR (or the individual paths) at a shared volume to run
+# several workers or hosts against the same documents
+DATA_DIR = os.getenv("DATA_DIR", ".")
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(DATA_DIR, "uploads"))
+EXTRACTED_TEXTS_DIR = os.getenv("EXTRACTED_TEXTS_DIR", os.path.join(DATA_DIR, "extracted_texts"))
+# Lock files serializing schema upgrades and startup backfills across workers
+LOCK_DIR = os.getenv("LOCK_DIR", DATA_DIR)
+
+# OCR job queue
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+OCR_QUEUE_SIZE = int(os.getenv("OCR_QUEUE_SIZE", "32"))
+OCR_JOB_HISTORY = int(os.getenv("OCR_JOB_HISTORY", "500"))
+# Keep job status in the database, so a poll answered by another worker finds it
+SHARED_JOB_STATE = os.getenv("SHARED_JOB_STATE", "false").lower() in ("1", "true", "yes")
+
+# OCR pipeline
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_PAGE_PROCESSES = int(os.getenv("OCR_PAGE_PROCESSES", str(os.cpu_count() or 1)))
+# Pages rasterized/OCR'd at once; bounds peak memory regardless of page count
+OCR_PAGE_WINDOW = int(os.getenv("OCR_PAGE_WINDOW", str(OCR_PAGE_PROCESSES * 2)))
+
+# Born-digital PDFs: use the embedded text layer and only OCR pages without one
+PDF_TEXT_LAYER = os.getenv("PDF_TEXT_LAYER", "true").lower() in ("1", "true", "yes")
+PDF_TEXT_MIN_CHARS = int(os.getenv("PDF_TEXT_MIN_CHARS", "25"))
+
+# Content-addressed cache of extracted text (whole documents and single pages)
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", os.path.join(DATA_DIR, "ocr_cache.db"))
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Chat proxy
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")  # "gemini" or "fake"
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+CHAT_CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", "1000"))
+CHAT_CONTEXT_CACHE = int(os.getenv("CHAT_CONTEXT_CACHE", "64"))
+CHAT_CONVERSATIONS = int(os.getenv("CHAT_CONVERSATIONS", "1000"))
+CHAT_HISTORY_TURNS = int(os.getenv("CHAT_HISTORY_TURNS", "10"))
+
+# Sentiment model used when feedback is written ("textblob" or "vader")
+SENTIMENT_SCORER = os.getenv("SENTIMENT_SCORER", "textblob")
+
+# Authenticated-user cache (per process). Entries are compared with
+# users.token_version at most every USER_CACHE_CHECK_SECONDS, which bounds
+# how long a change made by another worker can go unseen
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_CHECK_SECONDS = float(os.getenv("USER_CACHE_CHECK_SECONDS", "5"))
+
+# Password hashing: bcrypt cost and the bounded executor it runs on
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 1)))
+# Hash/verify calls allowed to wait for a worker before new ones get 503
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "64"))
+PASSWORD_RETRY_AFTER = int(os.getenv("PASSWORD_RETRY_AFTER", "2"))
+
+# Database. Any SQLAlchemy URL; the async driver is derived from it unless
+# ASYNC_DATABASE_URL is set (sqlite -> aiosqlite, postgresql -> asyncpg)
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{os.path.join(DATA_DIR, 'campusconnect.db')}")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", "")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# SQLite tuning
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "65536"))
+SQLITE_MMAP_BYTES = int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+
+# Feedback write-behind. When enabled, POST /feedback returns 202 once the
+# message is queued (and appended to the log), and a background thread
+# commits queued messages in batches
+FEEDBACK_WRITE_BEHIND = os.getenv("FEEDBACK_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+FEEDBACK_BATCH_SIZE = int(os.getenv("FEEDBACK_BATCH_SIZE", "500"))
+FEEDBACK_FLUSH_INTERVAL = float(os.getenv("FEEDBACK_FLUSH_INTERVAL", "0.5"))
+FEEDBACK_BUFFER_LIMIT = int(os.getenv("FEEDBACK_BUFFER_LIMIT", "20000"))
+FEEDBACK_RETRY_AFTER = int(os.getenv("FEEDBACK_RETRY_AFTER", "2"))
+# Append-only log of accepted but uncommitted messages, replayed on start;
+# empty disables it. Each worker process claims its own <path>, <path>.1, ...
+# FEEDBACK_LOG_FSYNC trades throughput for surviving power loss
+FEEDBACK_LOG_PATH = os.getenv("FEEDBACK_LOG_PATH", os.path.join(DATA_DIR, "feedback_buffer.log"))
+FEEDBACK_LOG_FSYNC = os.getenv("FEEDBACK_LOG_FSYNC", "false").lower() in ("1", "true", "yes")
+# Tries for a batch that fails to commit; after that its messages are committed
+# one by one and those that still fail are appended to the dead-letter file
+FEEDBACK_MAX_ATTEMPTS = int(os.getenv("FEEDBACK_MAX_ATTEMPTS", "5"))
+FEEDBACK_DEAD_LETTER_PATH = os.getenv("FEEDBACK_DEAD_LETTER_PATH", os.path.join(DATA_DIR, "feedback_dead_letter.log"))
+
+# Prometheus metrics at /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Uploads are streamed to disk in chunks; larger files are refused with 413
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+# Extracted texts never change once written: browsers may keep them this long without revalidating
+DOCUMENT_CACHE_MAX_AGE = int(os.getenv("DOCUMENT_CACHE_MAX_AGE", str(365 * 24 * 3600)))
+# Write .gz (and .br, if the brotli package is installed) copies of every extracted text
+PRECOMPRESS_TEXTS = os.getenv("PRECOMPRESS_TEXTS", "true").lower() in ("1", "true", "yes")
+
+# Near-duplicate documents (re-issued notices, re-scans) are grouped at upload;
+# listing, search and the chatbot context only use the newest of each group
+NEAR_DUPLICATES = os.getenv("NEAR_DUPLICATES", "true").lower() in ("1", "true", "yes")
+# Estimated Jaccard similarity of word 5-gram shingles above which two texts are versions of one document
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
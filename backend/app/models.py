@@ -2,7 +2,7 @@ from pydantic import BaseModel, EmailStr
 from typing import Optional
 from datetime import datetime
 from enum import Enum
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Enum as SQLAlchemyEnum, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Float, LargeBinary, Enum as SQLAlchemyEnum, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from app.base import Base
 
@@ -23,6 +23,16 @@ class UserDB(Base):
     user_type = Column(String)  # "student", "faculty", or "admin"
     created_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
+    # Bumped on every change; cached logins are checked against it
+    token_version = Column(Integer, default=0)
+
+    __table_args__ = (
+        # Backs keyset pagination of the faculty and student listings
+        Index("ix_users_user_type_id", "user_type", "id"),
+        # Case-insensitive prefix search on name and email within a user type
+        Index("ix_users_user_type_lower_full_name", "user_type", func.lower(full_name)),
+        Index("ix_users_user_type_lower_email", "user_type", func.lower(email)),
+    )
 
 # Pydantic Models
 class UserBase(BaseModel):
@@ -60,7 +70,93 @@ class Feedback(Base):
     message = Column(String)
     user_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Scored once when the feedback is written
+    polarity = Column(Float)
+    subjectivity = Column(Float)
+    sentiment_label = Column(String)  # "positive", "negative" or "neutral"
     
     user = relationship("UserDB", back_populates="feedback")
 
-UserDB.feedback = relationship("Feedback", back_populates="user") 
\ No newline at end of file
+    __table_args__ = (
+        # Backs keyset pagination over (created_at, id)
+        Index("ix_feedback_created_at_id", "created_at", "id"),
+    )
+
+UserDB.feedback = relationship("Feedback", back_populates="user")
+
+class FeedbackRollup(Base):
+    """
+    Sentiment totals of the feedback created in one hour, day or week,
+    maintained as feedback is created and deleted.
+    """
+    __tablename__ = "feedback_rollups"
+
+    granularity = Column(String, primary_key=True)  # "hour", "day" or "week"
+    bucket_start = Column(DateTime, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    positive = Column(Integer, nullable=False, default=0)
+    negative = Column(Integer, nullable=False, default=0)
+    neutral = Column(Integer, nullable=False, default=0)
+    polarity_sum = Column(Float, nullable=False, default=0)
+    subjectivity_sum = Column(Float, nullable=False, default=0) 
+
+class FeedbackRollupState(Base):
+    """
+    One row, written in the same transaction as a full rollup rebuild, so
+    startup can tell built rollups from a table that only holds the
+    buckets of feedback written since.
+    """
+    __tablename__ = "feedback_rollup_state"
+
+    id = Column(Integer, primary_key=True)  # Always 1
+    rebuilt_at = Column(DateTime, nullable=False)
+
+class DocumentDB(Base):
+    __tablename__ = "documents"
+
+    id = Column(String, primary_key=True)  # Extracted text file name without ".txt"
+    original_filename = Column(String)
+    stored_filename = Column(String)  # Name of the upload in uploads/
+    uploaded_at = Column(DateTime, default=datetime.utcnow)
+    uploaded_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    page_count = Column(Integer)
+    byte_size = Column(Integer)
+    content_hash = Column(String, index=True)  # SHA-256 of the uploaded file
+    # Near-duplicate grouping: MinHash signature of the text, the group (id of
+    # its first document) and whether this is the group's newest upload
+    minhash = Column(LargeBinary)
+    group_id = Column(String, index=True)
+    is_latest = Column(Boolean, index=True)
+
+    __table_args__ = (
+        # Backs keyset pagination over (uploaded_at, id)
+        Index("ix_documents_uploaded_at_id", "uploaded_at", "id"),
+    )
+
+class DocumentBandDB(Base):
+    """
+    LSH buckets of document MinHash signatures: documents sharing a bucket in
+    any band are near-duplicate candidates.
+    """
+    __tablename__ = "document_minhash_bands"
+
+    band = Column(Integer, primary_key=True)
+    bucket = Column(BigInteger, primary_key=True)
+    document_id = Column(String, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+
+class OCRJobDB(Base):
+    """
+    Status of an OCR job, written by the worker running it when
+    SHARED_JOB_STATE is on, so any worker can answer a status poll.
+    """
+    __tablename__ = "ocr_jobs"
+
+    id = Column(String, primary_key=True)
+    status = Column(String, nullable=False)  # queued -> running -> done | failed
+    pages_done = Column(Integer, nullable=False, default=0)
+    total_pages = Column(Integer)
+    error = Column(String)
+    details = Column(String)  # JSON of the job metadata (document id, file names)
+    created_at = Column(DateTime, nullable=False, index=True)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
@@ -1,33 +1,55 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, status
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Response, Request, Query, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from . import models, schemas, database
-from typing import List
+from typing import List, Optional
 from datetime import datetime
-from passlib.context import CryptContext
 import os
 import shutil
+import threading
+import gzip
+import hashlib
+import json
 from pathlib import Path
-import pytesseract
-from PIL import Image
-import io
-from pdf2image import convert_from_bytes
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from app.utils.sentiment import analyze_feedback_batch
+from app.utils.feedback import (
+    score_feedback, stored_sentiment, aggregate_stats, update_rollups, sentiment_trend, list_feedback
+)
+from app.utils.ocr import process_upload
+from app.utils.jobs import JobQueue, QueueFullError
+from app.utils import job_store
+from app.utils.feedback_buffer import FeedbackBuffer, FeedbackBufferFullError
+from app.utils.uploads import receive_upload, UploadTooLargeError, InvalidUploadError
+from app.utils.search import (
+    index_document, search_documents, retrieve_chunks, InvalidQueryError, SearchUnavailableError
+)
+from app.utils import documents as catalog
+from app.utils import pages as page_index
+from app.utils import near_duplicates
+from app.utils import http_cache
+from app.utils import users
+from app.utils.pagination import encode_cursor
+from app.utils import metrics
+from app.utils.llm import ChatService
+from app.utils.user_cache import user_cache
+from app.utils.passwords import password_hasher, PasswordBusyError
+from app.utils.user_import import UserImporter, iter_rows
+from app import config
 
 router = APIRouter()
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # JWT settings
 SECRET_KEY = "your-secret-key-here"  # In production, use environment variable
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -39,7 +61,7 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -53,115 +75,218 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
 
-    # Get user from database
-    user = get_user_by_email(db, email)
+    # Serve repeat requests from the user cache, falling back to the database.
+    # Now and then a hit is compared with the row's token_version, so users
+    # changed or deleted by another worker are not served for long
+    cached = user_cache.get(email)
+    if cached is not None:
+        if not cached.check_due:
+            return cached.user
+        current = (await db.execute(
+            select(models.UserDB.token_version).where(models.UserDB.id == cached.user.id)
+        )).first()
+        if current is not None and current.token_version == cached.token_version:
+            user_cache.confirm(email, cached.token_version)
+            return cached.user
+        user_cache.invalidate(email)
+    generation = user_cache.generation
+    user = await get_user_by_email(db, email)
     if user is None:
         raise credentials_exception
-    return user
+    return user_cache.put(user, generation)
+
+async def get_optional_user(token: str = Depends(optional_oauth2_scheme), db: AsyncSession = Depends(database.get_async_db)):
+    """
+    The logged-in user if a valid token was sent, otherwise None.
+    """
+    if not token:
+        return None
+    try:
+        return await get_current_user(token, db)
+    except HTTPException:
+        return None
 
 # Create uploads directory if it doesn't exist
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+UPLOAD_DIR = Path(config.UPLOAD_DIR)
+UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 # Create extracted_texts directory if it doesn't exist
-EXTRACTED_TEXTS_DIR = Path("extracted_texts")
-EXTRACTED_TEXTS_DIR.mkdir(exist_ok=True)
+EXTRACTED_TEXTS_DIR = Path(config.EXTRACTED_TEXTS_DIR)
+EXTRACTED_TEXTS_DIR.mkdir(parents=True, exist_ok=True)
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+def publish_job(job):
+    db = database.SessionLocal()
+    try:
+        job_store.save_job(db, job, history=config.OCR_JOB_HISTORY)
+    finally:
+        db.close()
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(models.UserDB).filter(models.UserDB.email == email).first()
+# OCR runs on a bounded pool of background workers so uploads never block the event loop.
+# With SHARED_JOB_STATE every change is also written to the database for the other workers
+ocr_jobs = JobQueue(
+    workers=config.OCR_WORKERS,
+    max_queued=config.OCR_QUEUE_SIZE,
+    history=config.OCR_JOB_HISTORY,
+    on_change=publish_job if config.SHARED_JOB_STATE else None,
+)
 
-def clean_text(text):
-    """
-    Clean the text while preserving paragraph structure.
-    """
-    # Split text into lines
-    lines = text.split('\n')
-    
-    # Process each line
-    processed_lines = []
-    current_line = []
-    
-    for line in lines:
-        # Skip empty lines
-        if not line.strip():
-            if current_line:
-                # Join current paragraph and add it
-                processed_lines.append(' '.join(current_line))
-                current_line = []
-            processed_lines.append('')  # Preserve paragraph break
-            continue
-            
-        # Clean the line
-        cleaned_line = line.strip()
-        if cleaned_line:
-            current_line.append(cleaned_line)
-    
-    # Add any remaining paragraph
-    if current_line:
-        processed_lines.append(' '.join(current_line))
-    
-    # Join lines with double newlines to preserve paragraph structure
-    return '\n\n'.join(processed_lines)
+# Server-side chat with response and context caching
+chat_service = ChatService()
+
+# Batched feedback writes; only used for new submissions when FEEDBACK_WRITE_BEHIND is on,
+# but always started so a log left by an earlier run is committed
+feedback_buffer = FeedbackBuffer(
+    database.SessionLocal,
+    batch_size=config.FEEDBACK_BATCH_SIZE,
+    flush_interval=config.FEEDBACK_FLUSH_INTERVAL,
+    limit=config.FEEDBACK_BUFFER_LIMIT,
+    log_path=config.FEEDBACK_LOG_PATH,
+    fsync=config.FEEDBACK_LOG_FSYNC,
+    max_attempts=config.FEEDBACK_MAX_ATTEMPTS,
+    dead_letter_path=config.FEEDBACK_DEAD_LETTER_PATH,
+)
 
-@router.post("/upload/", response_model=dict)
-async def upload_file(file: UploadFile = File(...), db: Session = Depends(database.get_db)):
+# Read when /metrics is scraped
+metrics.gauge_function("ocr_jobs_queued", "OCR jobs waiting for a worker", ocr_jobs.qsize)
+metrics.gauge_function("feedback_buffer_pending", "Feedback messages queued for a batched commit",
+                       lambda: feedback_buffer.stats()["pending"])
+metrics.gauge_function("password_hashes_in_flight", "Password hash/verify operations running or waiting",
+                       lambda: password_hasher.in_flight)
+metrics.counter_function("user_cache_hits_total", "Authenticated-user cache hits", lambda: user_cache.hits)
+metrics.counter_function("user_cache_misses_total", "Authenticated-user cache misses", lambda: user_cache.misses)
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(models.UserDB).where(models.UserDB.email == email))
+
+def run_ocr_job(job, file_path: Path, text_path: Path, digest: str, original_filename: str, uploaded_by, uploaded_at):
+    content = process_upload(file_path, text_path, job.progress, digest)
+    db = database.SessionLocal()
     try:
-        # Read file content first
-        file_content = await file.read()
-        
-        # Create a unique filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{file.filename}"
-        file_path = UPLOAD_DIR / filename
+        index_document(db, text_path.stem, content)
+        catalog.record_document(
+            db,
+            text_path.stem,
+            original_filename=original_filename,
+            stored_filename=file_path.name,
+            content=content,
+            byte_size=file_path.stat().st_size,
+            content_hash=digest,
+            uploaded_by=uploaded_by,
+            uploaded_at=uploaded_at,
+        )
+        # Group with earlier versions of the same notice, if any
+        near_duplicates.assign_group(db, text_path.stem, content)
+    finally:
+        db.close()
 
-        # Save the file using the content we already read
-        with file_path.open("wb") as buffer:
-            buffer.write(file_content)
+@router.post(
+    "/upload/",
+    response_model=dict,
+    status_code=status.HTTP_202_ACCEPTED,
+    # The body is parsed by receive_upload, so describe the form for the docs here
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["file"],
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                    }
+                }
+            },
+        }
+    },
+)
+async def upload_file(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: models.UserDB = Depends(get_optional_user)
+):
+    try:
+        timestamp = catalog.new_document_prefix()
+        partial_path = UPLOAD_DIR / f"{timestamp}.part"
 
-        # Process the file for OCR
-        text = ""
-        
-        if file.filename.lower().endswith('.pdf'):
-            try:
-                # Convert PDF to images using the content we already read
-                pdf_images = convert_from_bytes(file_content, dpi=300)  # Increased DPI for better quality
-                for i, pdf_image in enumerate(pdf_images):
-                    try:
-                        page_text = pytesseract.image_to_string(pdf_image, lang='eng')
-                        text += f"\n\n--- Page {i+1} ---\n\n{page_text}"
-                    except Exception as e:
-                        print(f"Error processing page {i+1}: {str(e)}")
-                        continue
-            except Exception as e:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Error processing PDF: {str(e)}"
-                )
-        else:
+        try:
+            # Parse the multipart body as it arrives and write the file straight
+            # to disk, hashing on the way, instead of letting it be spooled first
             try:
-                # Process image file using the content we already read
-                image = Image.open(io.BytesIO(file_content))
-                text = pytesseract.image_to_string(image, lang='eng')
-            except Exception as e:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Error processing image: {str(e)}"
-                )
-
-        # Clean the text
-        cleaned_text = clean_text(text)
-
-        # Save extracted text to a file
-        text_filename = f"{timestamp}_{file.filename.rsplit('.', 1)[0]}.txt"
+                client_filename, byte_size, digest = await receive_upload(request, partial_path)
+            except UploadTooLargeError as e:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+            except InvalidUploadError as e:
+                raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+
+            # Create a unique filename
+            original_filename = catalog.safe_filename(client_filename)
+            filename = f"{timestamp}_{original_filename}"
+            file_path = UPLOAD_DIR / filename
+
+            # Same bytes uploaded before: point at the existing copy instead of storing another
+            existing = await db.run_sync(catalog.find_document_by_hash, digest)
+            duplicate = existing is not None and (EXTRACTED_TEXTS_DIR / f"{existing.id}.txt").exists()
+            if not duplicate:
+                partial_path.replace(file_path)
+        finally:
+            # Left over if this is a duplicate or anything above failed
+            partial_path.unlink(missing_ok=True)
+
+        if duplicate:
+            text_filename = f"{existing.id}.txt"
+            # In the threadpool: with SHARED_JOB_STATE, recording a job writes to the database
+            job = await run_in_threadpool(
+                ocr_jobs.completed,
+                duplicate=True,
+                document_id=existing.id,
+                filename=existing.stored_filename,
+                text_filename=text_filename,
+            )
+            response.status_code = status.HTTP_200_OK
+            return {
+                "message": "File was already uploaded",
+                "job_id": job.id,
+                "status": job.status,
+                "duplicate": True,
+                "document_id": existing.id,
+                "filename": existing.stored_filename,
+                "file_path": str(UPLOAD_DIR / existing.stored_filename),
+                "text_filename": text_filename,
+                "text_path": str(EXTRACTED_TEXTS_DIR / text_filename)
+            }
+
+        text_filename = f"{timestamp}_{original_filename.rsplit('.', 1)[0]}.txt"
         text_path = EXTRACTED_TEXTS_DIR / text_filename
-        with text_path.open("w", encoding="utf-8") as f:
-            f.write(cleaned_text)
+
+        # Hand the OCR work to the background workers and return straight away
+        try:
+            job = await run_in_threadpool(
+                ocr_jobs.submit,
+                lambda job: run_ocr_job(
+                    job, file_path, text_path, digest,
+                    original_filename=original_filename,
+                    uploaded_by=current_user.id if current_user else None,
+                    uploaded_at=datetime.utcnow(),
+                ),
+                document_id=text_path.stem,
+                filename=filename,
+                text_filename=text_filename,
+            )
+        except QueueFullError as e:
+            file_path.unlink(missing_ok=True)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e),
+                headers={"Retry-After": "10"}
+            )
 
         return {
-            "message": "File uploaded and processed successfully",
+            "message": "File uploaded, text extraction queued",
+            "job_id": job.id,
+            "status": job.status,
+            "duplicate": False,
+            "document_id": text_path.stem,
             "filename": filename,
             "file_path": str(file_path),
             "text_filename": text_filename,
@@ -175,15 +300,32 @@ async def upload_file(file: UploadFile = File(...), db: Session = Depends(databa
             detail=f"An unexpected error occurred: {str(e)}"
         )
 
+@router.get("/upload/jobs/{job_id}", response_model=dict)
+async def get_upload_job(job_id: str, db: AsyncSession = Depends(database.get_async_db)):
+    job = ocr_jobs.get(job_id)
+    if job is not None:
+        return job.to_dict()
+    # Submitted to another worker
+    if config.SHARED_JOB_STATE:
+        shared = await db.run_sync(job_store.find_job, job_id)
+        if shared is not None:
+            return shared
+    raise HTTPException(status_code=404, detail="Job not found")
+
 @router.post("/login/", response_model=dict)
-async def login(credentials: models.UserLogin, db: Session = Depends(database.get_db)):
+async def login(credentials: models.UserLogin, db: AsyncSession = Depends(database.get_async_db)):
     try:
-        user = get_user_by_email(db, credentials.email)
+        user = await get_user_by_email(db, credentials.email)
         if not user:
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
-        if not verify_password(credentials.password, user.password):
+        matches, new_hash = await password_hasher.verify_and_update(credentials.password, user.password)
+        if not matches:
             raise HTTPException(status_code=401, detail="Invalid email or password")
+        if new_hash:
+            # The bcrypt cost setting changed since this hash was made
+            user.password = new_hash
+            await db.commit()
         
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
@@ -201,112 +343,517 @@ async def login(credentials: models.UserLogin, db: Session = Depends(database.ge
                 "user_type": user.user_type
             }
         }
+    except (HTTPException, PasswordBusyError):
+        raise
     except Exception as e:
         print(f"Login error: {str(e)}")  # For debugging
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/faculty/", response_model=List[models.User])
-async def get_faculty(db: Session = Depends(database.get_db)):
-    return db.query(models.UserDB).filter(models.UserDB.user_type == "faculty").all()
+async def list_users(
+    db: AsyncSession,
+    user_type: str,
+    limit: int,
+    cursor: Optional[str],
+    q: Optional[str],
+    fields: Optional[str],
+    format: str,
+):
+    try:
+        columns = users.parse_fields(fields)
+        statement = users.user_listing(user_type, columns, limit=limit + 1, cursor=cursor, q=q)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "ndjson":
+        return StreamingResponse(
+            stream_users(user_type, columns, cursor, q),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": f'attachment; filename="{user_type}.ndjson"'}
+        )
 
-@router.get("/students/", response_model=List[models.User])
-async def get_students(db: Session = Depends(database.get_db)):
-    return db.query(models.UserDB).filter(models.UserDB.user_type == "student").all()
+    rows = (await db.execute(statement)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].id)
+    return {
+        "users": [users.user_row_to_dict(row) for row in rows],
+        "next_cursor": next_cursor
+    }
+
+async def stream_users(user_type: str, columns: List[str], cursor: Optional[str], q: Optional[str]):
+    """
+    Every matching user as one JSON line each, read in keyset batches so the
+    whole listing is never held in memory. Uses its own session because it
+    outlives the request handler.
+    """
+    after_id = None
+    async with database.AsyncSessionLocal() as db:
+        while True:
+            statement = users.user_listing(
+                user_type, columns, limit=users.EXPORT_BATCH_SIZE,
+                cursor=cursor if after_id is None else None, q=q, after_id=after_id
+            )
+            rows = (await db.execute(statement)).all()
+            if not rows:
+                return
+            yield "".join(json.dumps(users.user_row_to_dict(row)) + "\n" for row in rows)
+            after_id = rows[-1].id
+
+@router.get("/faculty/", response_model=dict)
+async def get_faculty(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    q: Optional[str] = Query(None, min_length=1, description="Prefix of the name or email"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,full_name"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson streams every match"),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    return await list_users(db, "faculty", limit, cursor, q, fields, format)
+
+@router.get("/students/", response_model=dict)
+async def get_students(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    q: Optional[str] = Query(None, min_length=1, description="Prefix of the name or email"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,full_name"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson streams every match"),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    return await list_users(db, "student", limit, cursor, q, fields, format)
 
 @router.post("/faculty/", response_model=models.User)
-async def create_faculty(user: models.UserCreate, db: Session = Depends(database.get_db)):
+async def create_faculty(user: models.UserCreate, db: AsyncSession = Depends(database.get_async_db)):
     # Check if email already exists
-    if get_user_by_email(db, user.email):
+    if await get_user_by_email(db, user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create new user
     db_user = models.UserDB(
         **user.dict(exclude={'password'}),
-        password=pwd_context.hash(user.password)
+        password=await password_hasher.hash(user.password)
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @router.post("/students/", response_model=models.User)
-async def create_student(user: models.UserCreate, db: Session = Depends(database.get_db)):
+async def create_student(user: models.UserCreate, db: AsyncSession = Depends(database.get_async_db)):
     # Check if email already exists
-    if get_user_by_email(db, user.email):
+    if await get_user_by_email(db, user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create new user
     db_user = models.UserDB(
         **user.dict(exclude={'password'}),
-        password=pwd_context.hash(user.password)
+        password=await password_hasher.hash(user.password)
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
+@router.post("/users/import", response_model=dict)
+async def import_users(
+    file: UploadFile = File(..., description="CSV with a header row, or NDJSON"),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="Defaults to the file extension"),
+    user_type: models.UserType = Query(models.UserType.STUDENT, description="For rows without a user_type"),
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Bulk-create students or faculty from a CSV or NDJSON file with email,
+    username, full_name, password and optionally user_type. Returns a
+    per-row report; for a file that cannot be read to the end it covers the
+    rows before the failure, with "complete": false.
+    """
+    if current_user.user_type != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can import users"
+        )
+
+    fmt = format or ("ndjson" if (file.filename or "").lower().endswith((".ndjson", ".jsonl")) else "csv")
+    importer = UserImporter(db, user_type)
+    # Parsing, hashing and inserting are blocking work; keep them off the event loop
+    return await run_in_threadpool(importer.run, iter_rows(file.file, fmt))
+
 @router.get("/users/{user_id}", response_model=models.User)
-async def get_user(user_id: int, db: Session = Depends(database.get_db)):
-    user = db.query(models.UserDB).filter(models.UserDB.id == user_id).first()
+async def get_user(user_id: int, db: AsyncSession = Depends(database.get_async_db)):
+    user = await db.get(models.UserDB, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
-@router.get("/documents/", response_model=List[dict])
-async def list_documents():
+@router.get("/documents/", response_model=dict)
+async def list_documents(
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    uploaded_after: Optional[datetime] = None,
+    uploaded_before: Optional[datetime] = None,
+    uploaded_by: Optional[int] = None,
+    all_versions: bool = Query(False, description="Include older near-duplicate versions"),
+    db: AsyncSession = Depends(database.get_async_db)
+):
     try:
-        documents = []
-        for file in EXTRACTED_TEXTS_DIR.glob("*.txt"):
-            # Get the original filename without timestamp
-            original_name = "_".join(file.stem.split("_")[1:])
-            documents.append({
-                "id": str(file.stem),
-                "filename": original_name,
-                "created_at": datetime.fromtimestamp(file.stat().st_mtime).isoformat(),
-                "path": f"/extracted_texts/{file.name}"
-            })
-        return sorted(documents, key=lambda x: x["created_at"], reverse=True)
+        documents, next_cursor = await db.run_sync(
+            catalog.list_documents,
+            limit=limit,
+            cursor=cursor,
+            uploaded_after=uploaded_after,
+            uploaded_before=uploaded_before,
+            uploaded_by=uploaded_by,
+            all_versions=all_versions,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error listing documents: {str(e)}"
         )
+    body = json.dumps({
+        "documents": [catalog.document_to_dict(document) for document in documents],
+        "next_cursor": next_cursor
+    }).encode("utf-8")
+    # The page changes as documents are added, so clients revalidate, but an unchanged one costs a 304
+    etag = f'"{hashlib.sha256(body).hexdigest()}"'
+    return http_cache.cached_response(
+        request.headers, etag, http_cache.REVALIDATE,
+        lambda: Response(content=body, media_type="application/json"),
+    )
+
+@router.get("/document/{document_id}/versions", response_model=dict)
+async def get_document_versions(document_id: str, db: AsyncSession = Depends(database.get_async_db)):
+    """
+    The near-duplicate group of a document (re-issues, re-scans), newest first.
+    """
+    versions = await db.run_sync(catalog.document_versions, document_id)
+    if not versions:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return {
+        "group_id": versions[0].group_id or versions[0].id,
+        "versions": [catalog.document_to_dict(version) for version in versions],
+    }
+
+# Read size of byte-range responses
+TEXT_CHUNK_BYTES = 64 * 1024
+
+def safe_text_path(document_id: str) -> Optional[Path]:
+    """
+    Path of a document's extracted text, or None if the id could point
+    outside EXTRACTED_TEXTS_DIR. Ids come from URLs and request bodies.
+    """
+    if not document_id or any(c in document_id for c in ("/", "\\", "\0")):
+        return None
+    texts_dir = EXTRACTED_TEXTS_DIR.resolve()
+    file_path = (texts_dir / f"{document_id}.txt").resolve()
+    if file_path.parent != texts_dir:
+        return None
+    return file_path
+
+async def document_text_path(db: AsyncSession, document_id: str) -> Path:
+    # Only cataloged documents are served, never arbitrary .txt files
+    file_path = safe_text_path(document_id)
+    if file_path is None or await db.get(models.DocumentDB, document_id) is None or not file_path.exists():
+        raise HTTPException(status_code=404, detail="Document not found")
+    return file_path
+
+async def read_document_pages(db: AsyncSession, document_id: str, first: int, last: int) -> dict:
+    file_path = await document_text_path(db, document_id)
+    try:
+        result = await run_in_threadpool(page_index.read_pages, file_path, first, last)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error reading document: {str(e)}"
+        )
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Document has no pages in {first}-{last}")
+    return {"document_id": document_id, **result}
+
+async def document_etag(file_path: Path, variant: str = "") -> str:
+    # Strong ETag from the text's content hash; `variant` tells apart responses derived from it
+    index = await run_in_threadpool(page_index.load_text_index, file_path)
+    return f'"{index["sha256"]}{variant}"'
+
+def immutable_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": http_cache.immutable_cache_control()}
 
 @router.get("/document/{document_id}")
-async def get_document(document_id: str):
+async def get_document(
+    request: Request,
+    document_id: str,
+    pages: Optional[str] = Query(None, description="Only these pages, e.g. 7 or 3-9"),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    file_path = await document_text_path(db, document_id)
+    if pages is not None:
+        try:
+            first, last = page_index.parse_page_range(pages)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        etag = await document_etag(file_path, f"-p{first}-{last}")
+        if http_cache.etag_matches(request.headers.get("if-none-match"), etag):
+            return http_cache.not_modified(immutable_headers(etag))
+        result = await read_document_pages(db, document_id, first, last)
+        return JSONResponse(result, headers=immutable_headers(etag))
+
     try:
-        file_path = EXTRACTED_TEXTS_DIR / f"{document_id}.txt"
-        if not file_path.exists():
-            raise HTTPException(status_code=404, detail="Document not found")
-        
+        etag = await document_etag(file_path, "-json")
+        if http_cache.etag_matches(request.headers.get("if-none-match"), etag):
+            return http_cache.not_modified(immutable_headers(etag))
+
         with open(file_path, "r", encoding="utf-8") as f:
             content = f.read()
         
-        return {"content": content}
+        return JSONResponse({"content": content}, headers=immutable_headers(etag))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error reading document: {str(e)}"
         )
 
+@router.get("/document/{document_id}/pages")
+async def get_document_pages(document_id: str, request: Request, db: AsyncSession = Depends(database.get_async_db)):
+    """
+    Page numbers with their byte offsets in the extracted text, for
+    fetching single pages or byte ranges of /text.
+    """
+    file_path = await document_text_path(db, document_id)
+    index = await run_in_threadpool(page_index.load_text_index, file_path)
+    etag = f'"{index["sha256"]}-pages"'
+    if http_cache.etag_matches(request.headers.get("if-none-match"), etag):
+        return http_cache.not_modified(immutable_headers(etag))
+    return JSONResponse({
+        "document_id": document_id,
+        "page_count": len(index["pages"]),
+        "byte_size": index["size"],
+        "pages": [{"page": page, "start": start, "end": end} for page, start, end in index["pages"]],
+    }, headers=immutable_headers(etag))
+
+@router.get("/document/{document_id}/pages/{page}")
+async def get_document_page(document_id: str, page: int, request: Request, db: AsyncSession = Depends(database.get_async_db)):
+    etag = await document_etag(await document_text_path(db, document_id), f"-p{page}-{page}")
+    if http_cache.etag_matches(request.headers.get("if-none-match"), etag):
+        return http_cache.not_modified(immutable_headers(etag))
+    result = await read_document_pages(db, document_id, page, page)
+    return JSONResponse(result, headers=immutable_headers(etag))
+
+@router.get("/document/{document_id}/text")
+async def get_document_text(document_id: str, request: Request, db: AsyncSession = Depends(database.get_async_db)):
+    """
+    The extracted text as text/plain, precompressed when the client accepts
+    it. Honours a single "Range: bytes=..." header with 206, so clients can
+    fetch the offsets listed by /pages.
+    """
+    file_path = await document_text_path(db, document_id)
+    size = file_path.stat().st_size
+    header = request.headers.get("range")
+    try:
+        byte_range = page_index.parse_byte_range(header, size) if header else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail=str(e),
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    if byte_range is None:
+        return await run_in_threadpool(
+            http_cache.text_file_response, file_path, request.headers, "GET", {"Accept-Ranges": "bytes"}
+        )
+
+    start, end = byte_range
+    etag = await document_etag(file_path)
+
+    def chunks():
+        with file_path.open("rb") as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = f.read(min(TEXT_CHUNK_BYTES, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    return StreamingResponse(
+        chunks(),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type="text/plain",
+        headers={
+            "Accept-Ranges": "bytes",
+            "Content-Range": f"bytes {start}-{end - 1}/{size}",
+            "Content-Length": str(end - start),
+            **immutable_headers(etag),
+        }
+    )
+
+@router.get("/search", response_model=dict)
+async def search(
+    q: str = Query(..., min_length=1, description='Words to match; use "double quotes" for phrases'),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    try:
+        hits = await db.run_sync(search_documents, q, limit=limit, offset=offset)
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SearchUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+
+    for hit in hits:
+        hit["filename"] = catalog.display_name(hit["document_id"])
+        hit["path"] = f"/extracted_texts/{hit['document_id']}.txt"
+    return {"query": q, "results": hits}
+
+@router.get("/retrieve", response_model=dict)
+async def retrieve(
+    q: str = Query(..., min_length=1, description="The user's question"),
+    k: int = Query(8, ge=1, le=50, description="Maximum number of chunks"),
+    max_tokens: int = Query(2000, ge=1, le=100000, description="Token budget for all chunks together"),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    try:
+        chunks = await db.run_sync(retrieve_chunks, q, k=k, max_tokens=max_tokens)
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SearchUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+
+    for chunk in chunks:
+        chunk["filename"] = catalog.display_name(chunk["document_id"])
+    return {
+        "query": q,
+        "chunks": chunks,
+        "total_tokens": sum(chunk["tokens"] for chunk in chunks)
+    }
+
+# ETag, JSON body and its gzip copy of the last combined response, reused until a text changes
+_combined_documents = {"etag": None, "body": None, "gzip": None}
+_combined_documents_lock = threading.Lock()
+
+def combined_documents_response(request_headers) -> Response:
+    # Only the latest version of near-duplicate documents goes to the chatbot
+    db = database.SessionLocal()
+    try:
+        superseded = near_duplicates.superseded_document_ids(db)
+    finally:
+        db.close()
+    files = sorted(file for file in EXTRACTED_TEXTS_DIR.glob("*.txt") if file.stem not in superseded)
+    # Derived from the per-text hashes, so a 304 costs no text reads
+    digest = hashlib.sha256()
+    for file in files:
+        digest.update(f"{file.stem}:{page_index.load_text_index(file)['sha256']}\n".encode("utf-8"))
+    etag = f'"{digest.hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": http_cache.REVALIDATE, "Vary": "Accept-Encoding"}
+    if http_cache.etag_matches(request_headers.get("if-none-match"), etag):
+        return http_cache.not_modified(headers)
+
+    with _combined_documents_lock:
+        if _combined_documents["etag"] != etag:
+            combined_text = ""
+            for file in files:
+                with open(file, "r", encoding="utf-8") as f:
+                    content = f.read()
+                    combined_text += f"\n\n--- Document: {file.stem} ---\n\n{content}\n"
+            body = json.dumps({"content": combined_text}).encode("utf-8")
+            _combined_documents.update(etag=etag, body=body, gzip=gzip.compress(body, compresslevel=6))
+        body, compressed = _combined_documents["body"], _combined_documents["gzip"]
+
+    if "gzip" in http_cache.accepted_encodings(request_headers.get("accept-encoding")):
+        return Response(content=compressed, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.get("/documents/combined")
-async def get_combined_documents():
+async def get_combined_documents(request: Request):
     try:
-        combined_text = ""
-        for file in EXTRACTED_TEXTS_DIR.glob("*.txt"):
-            with open(file, "r", encoding="utf-8") as f:
-                content = f.read()
-                combined_text += f"\n\n--- Document: {file.stem} ---\n\n{content}\n"
-        return {"content": combined_text}
+        return await run_in_threadpool(combined_documents_response, request.headers)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error combining documents: {str(e)}"
         )
 
+async def load_chat_context(db: AsyncSession, document_id: str, pages: Optional[str] = None):
+    """
+    (content hash, text) of a document, or of some of its pages, served
+    from the chat context cache after the first turn.
+    """
+    cache_key = f"{document_id}#{pages}" if pages else document_id
+    cached = chat_service.contexts.get(cache_key)
+    if cached is not None:
+        return cached
+
+    if pages:
+        try:
+            first, last = page_index.parse_page_range(pages)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        content = (await read_document_pages(db, document_id, first, last))["content"]
+        # Answers about a page range are cached apart from whole-document answers
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    else:
+        file_path = await document_text_path(db, document_id)
+        with open(file_path, "r", encoding="utf-8") as f:
+            content = f.read()
+
+        document = await db.get(models.DocumentDB, document_id)
+        if document is not None and document.content_hash:
+            content_hash = document.content_hash
+        else:
+            content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    chat_service.contexts.put(cache_key, (content_hash, content))
+    return content_hash, content
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/chat")
+async def chat(request: schemas.ChatRequest, db: AsyncSession = Depends(database.get_async_db)):
+    """
+    Answer a question about a document as a server-sent event stream:
+    a "start" event with the conversation id, "token" events with answer
+    text, then "done" (or "error").
+    """
+    if not request.question.strip():
+        raise HTTPException(status_code=400, detail="Question is empty")
+
+    content_hash, context = await load_chat_context(db, request.document_id, request.pages)
+    conversation_id = chat_service.start(request.document_id, request.conversation_id)
+    cached = chat_service.cached_answer(content_hash, conversation_id, request.question)
+
+    def events():
+        yield sse_event("start", {"conversation_id": conversation_id, "cached": cached is not None})
+        try:
+            if cached is not None:
+                chat_service.record(conversation_id, request.question, cached)
+                yield sse_event("token", {"text": cached})
+            else:
+                for text in chat_service.answer(content_hash, context, conversation_id, request.question):
+                    yield sse_event("token", {"text": text})
+            yield sse_event("done", {})
+        except Exception as e:
+            print(f"Error in chat: {str(e)}")  # For debugging
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/feedback", response_model=dict)
 async def get_feedback(
-    db: Session = Depends(database.get_db),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    db: AsyncSession = Depends(database.get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     if current_user.user_type != "admin":
@@ -316,10 +863,12 @@ async def get_feedback(
         )
     
     try:
-        # Get all feedback
-        feedback = db.query(models.Feedback).order_by(models.Feedback.created_at.desc()).all()
+        # Get one page of feedback, newest first
+        try:
+            feedback, next_cursor = await db.run_sync(list_feedback, limit=limit, cursor=cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Convert to list of dictionaries for sentiment analysis
         feedback_list = [
             {
                 'id': f.id,
@@ -330,13 +879,22 @@ async def get_feedback(
             for f in feedback
         ]
         
-        # Perform sentiment analysis
-        sentiment_results = analyze_feedback_batch(feedback_list)
+        # Sentiment was scored when each message was written; totals come from the rollups
+        sentiment_results = {
+            'aggregate_stats': await db.run_sync(aggregate_stats),
+            'individual_sentiments': [
+                {'id': f.id, 'sentiment': stored_sentiment(f)}
+                for f in feedback
+            ]
+        }
         
         return {
             'feedback': feedback_list,
-            'sentiment_analysis': sentiment_results
+            'sentiment_analysis': sentiment_results,
+            'next_cursor': next_cursor
         }
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in get_feedback: {str(e)}")  # For debugging
         raise HTTPException(
@@ -344,20 +902,56 @@ async def get_feedback(
             detail=str(e)
         )
 
-@router.post("/feedback", response_model=schemas.Feedback)
+@router.get("/feedback/trends", response_model=dict)
+async def get_feedback_trends(
+    granularity: str = Query("day", pattern="^(hour|day|week)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if current_user.user_type != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can view feedback"
+        )
+    return {
+        'granularity': granularity,
+        'buckets': await db.run_sync(sentiment_trend, granularity, start=start, end=end)
+    }
+
+@router.post("/feedback", response_model=schemas.Feedback, responses={202: {"description": "Queued (write-behind mode)"}})
 async def create_feedback(
     feedback: schemas.FeedbackCreate,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
+    if config.FEEDBACK_WRITE_BEHIND:
+        # Acknowledge once queued and logged; the buffer scores and commits in batches
+        try:
+            entry = await run_in_threadpool(
+                feedback_buffer.submit, feedback.message, current_user.id, datetime.utcnow()
+            )
+        except FeedbackBufferFullError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e),
+                headers={"Retry-After": str(config.FEEDBACK_RETRY_AFTER)}
+            )
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={"status": "queued", **entry})
+
     try:
         db_feedback = models.Feedback(
             message=feedback.message,
-            user_id=current_user.id
+            user_id=current_user.id,
+            created_at=datetime.utcnow()
         )
+        # TextBlob is CPU work; keep it off the event loop
+        await run_in_threadpool(score_feedback, db_feedback)
         db.add(db_feedback)
-        db.commit()
-        db.refresh(db_feedback)
+        await db.run_sync(update_rollups, db_feedback)
+        await db.commit()
+        await db.refresh(db_feedback)
         return db_feedback
     except Exception as e:
         print(f"Error in create_feedback: {str(e)}")  # For debugging
@@ -369,7 +963,7 @@ async def create_feedback(
 @router.delete("/users/{user_id}")
 async def delete_user(
     user_id: int,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     # Check if user is admin
@@ -380,7 +974,7 @@ async def delete_user(
         )
     
     # Get user to delete
-    user = db.query(models.UserDB).filter(models.UserDB.id == user_id).first()
+    user = await db.get(models.UserDB, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -391,16 +985,27 @@ async def delete_user(
             detail="Cannot delete your own account"
         )
     
-    # Delete user
-    db.delete(user)
-    db.commit()
+    # Delete user; run_sync so the feedback relationship can lazy-load for the unit of work
+    await db.run_sync(lambda session: session.delete(user))
+    await db.commit()
+    # Also dropped by the session events; explicit, as this must not depend on them
+    user_cache.invalidate(user.email)
     return {"message": "User deleted successfully"}
 
+@router.get("/auth/cache", response_model=dict)
+async def get_user_cache_stats(current_user: models.User = Depends(get_current_user)):
+    if current_user.user_type != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can view cache statistics"
+        )
+    return user_cache.stats()
+
 # Add an endpoint to create the initial admin user
 @router.post("/create-admin/", response_model=models.User)
-async def create_admin_user(db: Session = Depends(database.get_db)):
+async def create_admin_user(db: AsyncSession = Depends(database.get_async_db)):
     # Check if admin already exists
-    admin = db.query(models.UserDB).filter(models.UserDB.email == "admin@campusconnect.com").first()
+    admin = await get_user_by_email(db, "admin@campusconnect.com")
     if admin:
         raise HTTPException(status_code=400, detail="Admin user already exists")
     
@@ -409,31 +1014,33 @@ async def create_admin_user(db: Session = Depends(database.get_db)):
         email="admin@campusconnect.com",
         username="admin",
         full_name="Administrator",
-        password=pwd_context.hash("admin123"),
+        password=await password_hasher.hash("admin123"),
         user_type="admin"
     )
     db.add(admin_user)
-    db.commit()
-    db.refresh(admin_user)
+    await db.commit()
+    await db.refresh(admin_user)
     return admin_user
 
 @router.delete("/feedback/{feedback_id}")
 async def delete_feedback(
     feedback_id: int,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     if current_user.user_type != "admin":
         raise HTTPException(status_code=403, detail="Only admin users can delete feedback")
     
-    feedback = db.query(models.Feedback).filter(models.Feedback.id == feedback_id).first()
+    feedback = await db.get(models.Feedback, feedback_id)
     if not feedback:
         raise HTTPException(status_code=404, detail="Feedback not found")
     
     try:
-        db.delete(feedback)
-        db.commit()
+        if feedback.created_at is not None:
+            await db.run_sync(update_rollups, feedback, sign=-1)
+        await db.delete(feedback)
+        await db.commit()
         return {"message": "Feedback deleted successfully"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
@@ -12,6 +12,16 @@ class Feedback(FeedbackBase):
     id: int
     user_id: int
     created_at: datetime
+    polarity: Optional[float] = None
+    subjectivity: Optional[float] = None
+    sentiment_label: Optional[str] = None
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+class ChatRequest(BaseModel):
+    document_id: str
+    question: str
+    conversation_id: Optional[str] = None
+    # "7" or "3-9": answer from these pages only instead of the whole document
+    pages: Optional[str] = None
@@ -0,0 +1,157 @@
+import glob
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from app.models import DocumentDB
+from app.utils.ocr import split_pages, file_digest
+from app.utils.pagination import encode_cursor, decode_keyset_cursor
+
+def page_count(content: str) -> int:
+    return max((page for page, _ in split_pages(content)), default=0)
+
+def display_name(document_id: str) -> str:
+    # Document ids are "<date>_<time>_<original name>"
+    parts = document_id.split("_", 2)
+    return parts[2] if len(parts) == 3 else document_id
+
+def new_document_prefix() -> str:
+    """
+    "<date>_<time>-<random>" prefix of a new upload's file names. The random
+    part keeps uploads in the same second, on any worker, from overwriting
+    each other; display_name and backfill_documents only read the date,
+    time and name.
+    """
+    return f"{datetime.now():%Y%m%d_%H%M%S}-{uuid.uuid4().hex[:12]}"
+
+def safe_filename(filename: Optional[str]) -> str:
+    # Client-supplied names may carry directories ("../x.pdf", "C:\\x.pdf")
+    return (filename or "").replace("\\", "/").rsplit("/", 1)[-1] or "upload"
+
+def document_to_dict(document: DocumentDB) -> Dict[str, Any]:
+    return {
+        "id": document.id,
+        "filename": document.original_filename,
+        "created_at": document.uploaded_at.isoformat(),
+        "uploaded_by": document.uploaded_by,
+        "page_count": document.page_count,
+        "byte_size": document.byte_size,
+        "content_hash": document.content_hash,
+        "group_id": document.group_id or document.id,
+        "is_latest": document.is_latest is not False,
+        "path": f"/extracted_texts/{document.id}.txt"
+    }
+
+def find_document_by_hash(db: Session, content_hash: str) -> Optional[DocumentDB]:
+    return db.query(DocumentDB).filter(DocumentDB.content_hash == content_hash).first()
+
+def record_document(
+    db: Session,
+    document_id: str,
+    original_filename: str,
+    stored_filename: str,
+    content: str,
+    byte_size: int,
+    content_hash: str,
+    uploaded_by: Optional[int] = None,
+    uploaded_at: Optional[datetime] = None,
+) -> DocumentDB:
+    """
+    Add (or refresh) the catalog entry of a processed upload.
+    """
+    document = db.get(DocumentDB, document_id) or DocumentDB(id=document_id)
+    document.original_filename = original_filename
+    document.stored_filename = stored_filename
+    document.uploaded_by = uploaded_by
+    document.uploaded_at = uploaded_at or document.uploaded_at or datetime.utcnow()
+    document.page_count = page_count(content)
+    document.byte_size = byte_size
+    document.content_hash = content_hash
+    db.add(document)
+    db.commit()
+    return document
+
+def backfill_documents(db: Session, texts_dir: Path, upload_dir: Path) -> int:
+    """
+    Catalog extracted texts that predate the documents table.
+    """
+    known = {row[0] for row in db.query(DocumentDB.id)}
+    count = 0
+    for text_file in texts_dir.glob("*.txt"):
+        if text_file.stem in known:
+            continue
+
+        # The upload is stored under the same stem with its original extension
+        uploads = sorted(upload_dir.glob(f"{glob.escape(text_file.stem)}.*"))
+        upload = uploads[0] if uploads else None
+        try:
+            uploaded_at = datetime.strptime(text_file.stem[:15], "%Y%m%d_%H%M%S")
+        except ValueError:
+            uploaded_at = datetime.fromtimestamp(text_file.stat().st_mtime)
+
+        db.add(DocumentDB(
+            id=text_file.stem,
+            original_filename=upload.name.split("_", 2)[-1] if upload else display_name(text_file.stem),
+            stored_filename=upload.name if upload else None,
+            uploaded_at=uploaded_at,
+            page_count=page_count(text_file.read_text(encoding="utf-8")),
+            byte_size=upload.stat().st_size if upload else None,
+            content_hash=file_digest(upload) if upload else None,
+        ))
+        count += 1
+    db.commit()
+    return count
+
+def document_versions(db: Session, document_id: str) -> List[DocumentDB]:
+    """
+    Every version in the near-duplicate group of a document, newest first.
+    """
+    document = db.get(DocumentDB, document_id)
+    if document is None:
+        return []
+    return (
+        db.query(DocumentDB)
+        .filter(DocumentDB.group_id == (document.group_id or document.id))
+        .order_by(DocumentDB.uploaded_at.desc(), DocumentDB.id.desc())
+        .all()
+    ) or [document]
+
+def list_documents(
+    db: Session,
+    limit: int,
+    cursor: Optional[str] = None,
+    uploaded_after: Optional[datetime] = None,
+    uploaded_before: Optional[datetime] = None,
+    uploaded_by: Optional[int] = None,
+    all_versions: bool = False,
+) -> Tuple[List[DocumentDB], Optional[str]]:
+    """
+    One page of the catalog, newest first. Uses keyset pagination on
+    (uploaded_at, id), so the cost depends on `limit`, not on how many
+    documents precede the page. Older near-duplicate versions are left out
+    unless `all_versions` is set.
+    """
+    query = db.query(DocumentDB)
+    if not all_versions:
+        query = query.filter(DocumentDB.is_latest.isnot(False))
+    if uploaded_after:
+        query = query.filter(DocumentDB.uploaded_at >= uploaded_after)
+    if uploaded_before:
+        query = query.filter(DocumentDB.uploaded_at < uploaded_before)
+    if uploaded_by is not None:
+        query = query.filter(DocumentDB.uploaded_by == uploaded_by)
+    if cursor:
+        last_uploaded_at, last_id = decode_keyset_cursor(cursor, str)
+        query = query.filter(or_(
+            DocumentDB.uploaded_at < last_uploaded_at,
+            and_(DocumentDB.uploaded_at == last_uploaded_at, DocumentDB.id < last_id),
+        ))
+
+    rows = query.order_by(DocumentDB.uploaded_at.desc(), DocumentDB.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].uploaded_at.isoformat(), rows[-1].id)
+    return rows, next_cursor
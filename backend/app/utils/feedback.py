@@ -0,0 +1,301 @@
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, and_, or_, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app import config
+from app.models import Feedback, FeedbackRollup, FeedbackRollupState
+from app.utils.pagination import encode_cursor, decode_keyset_cursor
+from app.utils.sentiment import analyze_sentiment, score_batch, scoring_pool
+
+SENTIMENT_LABELS = ('positive', 'negative', 'neutral')
+GRANULARITIES = ('hour', 'day', 'week')
+ROLLUP_COUNTERS = ('count', 'positive', 'negative', 'neutral', 'polarity_sum', 'subjectivity_sum')
+
+def score_feedback(feedback: Feedback):
+    """
+    Store the sentiment of a feedback message on the row itself.
+    """
+    sentiment = analyze_sentiment(feedback.message or "", config.SENTIMENT_SCORER)
+    feedback.polarity = sentiment['polarity']
+    feedback.subjectivity = sentiment['subjectivity']
+    feedback.sentiment_label = sentiment['overall_sentiment']
+
+def stored_sentiment(feedback: Feedback) -> Dict[str, Any]:
+    return {
+        'polarity': feedback.polarity,
+        'subjectivity': feedback.subjectivity,
+        'overall_sentiment': feedback.sentiment_label
+    }
+
+def backfill_feedback_sentiment(db: Session, batch_size: int = 500) -> int:
+    """
+    Score feedback written before sentiment was stored. Returns the number of rows updated.
+    """
+    count = 0
+    while True:
+        batch = (
+            db.query(Feedback)
+            .filter(Feedback.sentiment_label.is_(None))
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            return count
+        sentiments = score_batch([f.message or "" for f in batch], config.SENTIMENT_SCORER)['sentiments']
+        for feedback, sentiment in zip(batch, sentiments):
+            feedback.polarity = sentiment['polarity']
+            feedback.subjectivity = sentiment['subjectivity']
+            feedback.sentiment_label = sentiment['overall_sentiment']
+        db.commit()
+        count += len(batch)
+
+def rescore_feedback(db: Session, scorer: str, batch_size: int = 50000, processes: int = None) -> Dict[str, Any]:
+    """
+    Re-score the whole feedback history, e.g. after changing the sentiment
+    model. Rows are read and updated in keyset-ordered batches, all scored
+    on one process pool; returns overall throughput stats.
+    """
+    last_id = 0
+    messages = 0
+    seconds = 0.0
+    with scoring_pool(processes) as pool:
+        while True:
+            rows = (
+                db.query(Feedback.id, Feedback.message)
+                .filter(Feedback.id > last_id)
+                .order_by(Feedback.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            result = score_batch([message or "" for _, message in rows], scorer, processes=processes, pool=pool)
+            updates: List[Dict[str, Any]] = [
+                {
+                    'id': feedback_id,
+                    'polarity': sentiment['polarity'],
+                    'subjectivity': sentiment['subjectivity'],
+                    'sentiment_label': sentiment['overall_sentiment'],
+                }
+                for (feedback_id, _), sentiment in zip(rows, result['sentiments'])
+            ]
+            db.bulk_update_mappings(Feedback, updates)
+            db.commit()
+
+            last_id = rows[-1][0]
+            messages += len(rows)
+            seconds += result['stats']['seconds']
+
+    # Scores changed, so the rollups have to be recomputed
+    rebuild_rollups(db)
+
+    return {
+        'scorer': scorer,
+        'messages': messages,
+        'scoring_seconds': seconds,
+        'messages_per_second': messages / seconds if seconds else 0
+    }
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    """
+    Start of the hour, day or (Monday-based) week containing `moment`.
+    """
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+def _rollup_delta(feedback: Feedback, sign: int) -> Dict[str, Any]:
+    label = feedback.sentiment_label
+    return {
+        'count': sign,
+        'positive': sign if label == 'positive' else 0,
+        'negative': sign if label == 'negative' else 0,
+        'neutral': sign if label == 'neutral' else 0,
+        'polarity_sum': sign * (feedback.polarity or 0),
+        'subjectivity_sum': sign * (feedback.subjectivity or 0),
+    }
+
+def _upsert_rollup(db: Session, granularity: str, start: datetime, delta: Dict[str, Any]):
+    dialect = db.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        statement = insert(FeedbackRollup).values(granularity=granularity, bucket_start=start, **delta)
+        statement = statement.on_conflict_do_update(
+            index_elements=['granularity', 'bucket_start'],
+            set_={
+                counter: getattr(FeedbackRollup, counter) + getattr(statement.excluded, counter)
+                for counter in ROLLUP_COUNTERS
+            },
+        )
+        db.execute(statement)
+        return
+
+    rollup = db.get(FeedbackRollup, (granularity, start))
+    if rollup is None:
+        db.add(FeedbackRollup(granularity=granularity, bucket_start=start, **delta))
+    else:
+        for counter in ROLLUP_COUNTERS:
+            setattr(rollup, counter, getattr(rollup, counter) + delta[counter])
+
+def update_rollups(db: Session, feedback: Feedback, sign: int = 1):
+    """
+    Add (sign=1) or remove (sign=-1) one feedback row from the hourly, daily
+    and weekly rollups. Runs in the caller's transaction.
+    """
+    delta = _rollup_delta(feedback, sign)
+    for granularity in GRANULARITIES:
+        _upsert_rollup(db, granularity, bucket_start(feedback.created_at, granularity), delta)
+
+def _bucket_totals(feedbacks: Iterable[Feedback]) -> Dict[Tuple[str, datetime], Dict[str, Any]]:
+    buckets: Dict[Tuple[str, datetime], Dict[str, Any]] = {}
+    for feedback in feedbacks:
+        delta = _rollup_delta(feedback, 1)
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_start(feedback.created_at, granularity))
+            totals = buckets.setdefault(key, {counter: 0 for counter in ROLLUP_COUNTERS})
+            for counter in ROLLUP_COUNTERS:
+                totals[counter] += delta[counter]
+    return buckets
+
+def add_to_rollups(db: Session, feedbacks: Iterable[Feedback]):
+    """
+    Add a batch of new feedback rows to the rollups with one upsert per
+    touched bucket rather than three per row. Runs in the caller's transaction.
+    """
+    for (granularity, start), totals in _bucket_totals(feedbacks).items():
+        _upsert_rollup(db, granularity, start, totals)
+
+def _lock_rollups(db: Session):
+    # PostgreSQL row locks from the DELETE would not stop inserts of new buckets
+    if db.get_bind().dialect.name == 'postgresql':
+        db.execute(text("LOCK TABLE feedback_rollups IN EXCLUSIVE MODE"))
+
+def rebuild_rollups(db: Session) -> int:
+    """
+    Recompute all rollups from the raw feedback rows, e.g. after a backfill
+    or re-scoring. Returns the number of buckets written.
+
+    Runs as one transaction that takes the rollup write lock before reading
+    the feedback: writers that committed earlier are in the read, and
+    writers that come later wait for the commit and then add their rows to
+    the rebuilt buckets, so no upsert is lost or counted twice.
+    """
+    # Start a new transaction, so nothing is read before the lock is held
+    db.commit()
+    _lock_rollups(db)
+    db.query(FeedbackRollup).delete()
+    rows = db.query(Feedback).filter(Feedback.created_at.isnot(None)).yield_per(5000)
+    buckets = _bucket_totals(rows)
+
+    db.bulk_insert_mappings(FeedbackRollup, [
+        {'granularity': granularity, 'bucket_start': start, **totals}
+        for (granularity, start), totals in buckets.items()
+    ])
+    db.merge(FeedbackRollupState(id=1, rebuilt_at=datetime.utcnow()))
+    db.commit()
+    return len(buckets)
+
+def ensure_rollups(db: Session):
+    """
+    Build the rollups unless a rebuild has completed before (first start
+    after the rollup table was added). Checked against the rebuild marker,
+    not an empty table: feedback written before this runs already has
+    buckets of its own.
+    """
+    if db.get(FeedbackRollupState, 1) is None:
+        rebuild_rollups(db)
+
+def aggregate_stats(db: Session) -> Dict[str, Any]:
+    """
+    Sentiment summary of all feedback, summed from the weekly rollups so the
+    cost does not grow with the feedback history. Same shape as
+    analyze_feedback_batch's aggregate_stats.
+    """
+    totals = db.query(*[func.coalesce(func.sum(getattr(FeedbackRollup, counter)), 0) for counter in ROLLUP_COUNTERS]) \
+        .filter(FeedbackRollup.granularity == 'week') \
+        .one()
+    totals = dict(zip(ROLLUP_COUNTERS, totals))
+
+    total_feedback = totals['count']
+    sentiment_counts = {label: totals[label] for label in SENTIMENT_LABELS}
+    return {
+        'total_feedback': total_feedback,
+        'average_polarity': totals['polarity_sum'] / total_feedback if total_feedback else 0,
+        'average_subjectivity': totals['subjectivity_sum'] / total_feedback if total_feedback else 0,
+        'sentiment_counts': sentiment_counts,
+        'percentages': {
+            label: (count / total_feedback) * 100 if total_feedback else 0
+            for label, count in sentiment_counts.items()
+        }
+    }
+
+def sentiment_trend(
+    db: Session,
+    granularity: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Per-bucket sentiment counts and means between `start` and `end`, oldest first.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    query = db.query(FeedbackRollup).filter(
+        FeedbackRollup.granularity == granularity,
+        FeedbackRollup.count > 0,
+    )
+    if start:
+        query = query.filter(FeedbackRollup.bucket_start >= bucket_start(start, granularity))
+    if end:
+        query = query.filter(FeedbackRollup.bucket_start < end)
+    return [
+        {
+            'bucket_start': rollup.bucket_start.isoformat(),
+            'total_feedback': rollup.count,
+            'sentiment_counts': {label: getattr(rollup, label) for label in SENTIMENT_LABELS},
+            'average_polarity': rollup.polarity_sum / rollup.count,
+            'average_subjectivity': rollup.subjectivity_sum / rollup.count,
+        }
+        for rollup in query.order_by(FeedbackRollup.bucket_start)
+    ]
+
+def list_feedback(db: Session, limit: int, cursor: Optional[str] = None) -> Tuple[List[Feedback], Optional[str]]:
+    """
+    One page of feedback, newest first, using keyset pagination on (created_at, id).
+    """
+    query = db.query(Feedback)
+    if cursor:
+        last_created_at, last_id = decode_keyset_cursor(cursor, int)
+        query = query.filter(or_(
+            Feedback.created_at < last_created_at,
+            and_(Feedback.created_at == last_created_at, Feedback.id < last_id),
+        ))
+
+    rows = query.order_by(Feedback.created_at.desc(), Feedback.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at.isoformat(), rows[-1].id)
+    return rows, next_cursor
+
+if __name__ == "__main__":
+    # python -m app.utils.feedback --scorer vader
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Re-score the sentiment of all stored feedback")
+    parser.add_argument("--scorer", choices=("textblob", "vader"), default=config.SENTIMENT_SCORER)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(rescore_feedback(db, args.scorer, processes=args.processes))
+    finally:
+        db.close()
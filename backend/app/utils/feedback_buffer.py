@@ -0,0 +1,425 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app import config
+from app.models import Feedback
+from app.utils.feedback import add_to_rollups
+from app.utils.locks import FileLock
+from app.utils.sentiment import score_batch
+
+logger = logging.getLogger(__name__)
+
+# Longest wait between retries of a batch that failed to commit (seconds)
+MAX_RETRY_DELAY = 30
+
+class FeedbackBufferFullError(Exception):
+    """Raised when the write-behind buffer cannot accept more feedback."""
+
+class FeedbackBuffer:
+    """
+    Write-behind buffer for feedback submissions.
+
+    Accepted messages are appended to a local log and queued in memory; one
+    background thread scores and commits them in batches of up to
+    `batch_size`, at least every `flush_interval` seconds.
+
+    The log is a series of segment files of up to `segment_size` lines.
+    Each message gets a sequence number, and after each commit a
+    "committed" marker with the batch's last number is appended; segments
+    holding only committed messages are deleted. Committing costs the same
+    however much is queued, and a restart replays exactly what was accepted
+    but not yet committed (a crash between a commit and its marker can
+    replay that batch once more).
+
+    A batch that still fails after `max_attempts` tries is committed one
+    message at a time; messages that fail on their own go to
+    `dead_letter_path` instead of holding up everything queued behind them.
+
+    Each worker process writes its own log: the first of `log_path`,
+    `log_path`.1, ... not locked by a running process. Logs whose process is
+    gone are taken over at start, so nothing is lost when fewer workers run.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        batch_size: int,
+        flush_interval: float,
+        limit: int,
+        log_path: Optional[str] = None,
+        fsync: bool = False,
+        max_attempts: int = 5,
+        dead_letter_path: Optional[str] = None,
+        segment_size: int = 10000,
+    ):
+        self._session_factory = session_factory
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._limit = limit
+        self._log_path = Path(log_path) if log_path else None
+        self._base_log_path = self._log_path
+        self._fsync = fsync
+        self._max_attempts = max(1, max_attempts)
+        self._dead_letter_path = Path(dead_letter_path) if dead_letter_path else None
+        self._segment_size = max(1, segment_size)
+        self._log = None
+        self._log_lock: Optional[FileLock] = None
+        # Active segment: its path, lines written and last sequence number in it
+        self._segment_path: Optional[Path] = None
+        self._segment_lines = 0
+        self._segment_last_seq = 0
+        self._next_segment = 1
+        # Full segments, oldest first, with the last sequence number in each
+        self._closed_segments: Deque[Tuple[Path, int]] = deque()
+        self._seq = 0
+        self._pending: Deque[Dict[str, Any]] = deque()
+        self._in_flight = 0
+        self._committed = 0
+        self._failed_flushes = 0
+        self._dead_lettered = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        """
+        Replay messages left in the log by the previous run and start the
+        flusher. Call once at startup, before any submit.
+        """
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._claim_log()
+            replayed = self._recover_logs()
+            self._pending.extend(replayed)
+            self._thread = threading.Thread(target=self._run, name="feedback-flusher", daemon=True)
+            self._thread.start()
+        if replayed:
+            logger.info("Replaying %d buffered feedback messages", len(replayed))
+
+    def submit(self, message: str, user_id: int, created_at: datetime) -> Dict[str, Any]:
+        entry = {
+            'message': message,
+            'user_id': user_id,
+            'created_at': created_at.isoformat(),
+        }
+        with self._condition:
+            if self._closed:
+                raise FeedbackBufferFullError("Feedback is not being accepted while the server shuts down")
+            if len(self._pending) + self._in_flight >= self._limit:
+                raise FeedbackBufferFullError("Too much feedback waiting to be saved, try again later")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="feedback-flusher", daemon=True)
+                self._thread.start()
+            record = self._log_entry(entry)
+            self._pending.append(record)
+            if len(self._pending) >= self._batch_size:
+                self._condition.notify_all()
+        return entry
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until everything accepted so far is committed. Returns False on timeout.
+        """
+        with self._condition:
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: not self._pending and not self._in_flight, timeout)
+
+    def close(self, timeout: float = 30):
+        """
+        Stop accepting feedback, commit what is queued and stop the flusher.
+        Anything that could not be committed stays in the log for the next start.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._condition:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            if not self._pending and not self._in_flight:
+                # Everything is committed: leave no log behind
+                for path in [path for path, _ in self._closed_segments] + [self._segment_path]:
+                    if path is not None:
+                        path.unlink(missing_ok=True)
+                self._closed_segments.clear()
+                self._segment_path = None
+            if self._log_lock is not None:
+                self._log_lock.release()
+                self._log_lock = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'pending': len(self._pending),
+                'in_flight': self._in_flight,
+                'committed': self._committed,
+                'failed_flushes': self._failed_flushes,
+                'dead_lettered': self._dead_lettered,
+                'limit': self._limit,
+            }
+
+    def _run(self):
+        attempts = 0
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: len(self._pending) >= self._batch_size or self._closed,
+                    self._flush_interval,
+                )
+                if not self._pending:
+                    if self._closed:
+                        return
+                    continue
+                batch = [self._pending.popleft() for _ in range(min(self._batch_size, len(self._pending)))]
+                self._in_flight = len(batch)
+
+            try:
+                self._write(batch)
+                dead = []
+            except Exception as e:
+                attempts += 1
+                logger.warning(
+                    "Could not commit %d feedback messages (attempt %d of %d): %s",
+                    len(batch), attempts, self._max_attempts, e,
+                )
+                if attempts >= self._max_attempts:
+                    # Give up on the batch as a whole: commit what can be, set aside the rest
+                    dead = self._write_each(batch)
+                else:
+                    with self._condition:
+                        self._pending.extendleft(reversed(batch))
+                        self._in_flight = 0
+                        self._failed_flushes += 1
+                        closed = self._closed
+                    if closed:
+                        # Leave the rest in the log for the next start
+                        return
+                    time.sleep(min(self._flush_interval * 2 ** (attempts - 1), MAX_RETRY_DELAY))
+                    continue
+            attempts = 0
+            if dead:
+                self._dead_letter(dead)
+
+            with self._condition:
+                self._in_flight = 0
+                self._committed += len(batch) - len(dead)
+                self._dead_lettered += len(dead)
+                finished = self._mark_committed(batch[-1]['seq'])
+                self._condition.notify_all()
+            for path in finished:
+                path.unlink(missing_ok=True)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        sentiments = score_batch([entry['message'] for entry in batch], config.SENTIMENT_SCORER)['sentiments']
+        rows = [
+            Feedback(
+                message=entry['message'],
+                user_id=entry['user_id'],
+                created_at=datetime.fromisoformat(entry['created_at']),
+                polarity=sentiment['polarity'],
+                subjectivity=sentiment['subjectivity'],
+                sentiment_label=sentiment['overall_sentiment'],
+            )
+            for entry, sentiment in zip(batch, sentiments)
+        ]
+        db = self._session_factory()
+        try:
+            db.add_all(rows)
+            add_to_rollups(db, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _write_each(self, batch: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], str]]:
+        """
+        Commit the messages of a failing batch one by one; returns the ones
+        that failed with their errors.
+        """
+        dead = []
+        for entry in batch:
+            try:
+                self._write([entry])
+            except Exception as e:
+                dead.append((entry, str(e)))
+        return dead
+
+    def _dead_letter(self, dead: List[Tuple[Dict[str, Any], str]]):
+        logger.error("%d feedback messages could not be committed and were set aside", len(dead))
+        if self._dead_letter_path is None:
+            for entry, error in dead:
+                logger.error("Dropped feedback %s: %s", json.dumps(self._public(entry)), error)
+            return
+        # Same line format as the log: moving the file to a free log slot replays it on start
+        lines = "".join(
+            json.dumps({**self._public(entry), 'error': error}) + "\n" for entry, error in dead
+        )
+        self._dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._dead_letter_path.open("a", encoding="utf-8") as f:
+            f.write(lines)
+            self._sync(f)
+
+    @staticmethod
+    def _public(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in entry.items() if key != 'seq'}
+
+    # The log is only touched with self._condition held
+
+    def _slot_path(self, slot: int) -> Path:
+        return self._base_log_path if slot == 0 else self._base_log_path.with_name(f"{self._base_log_path.name}.{slot}")
+
+    def _claim_log(self):
+        if self._log_path is None:
+            return
+        slot = 0
+        while True:
+            path = self._slot_path(slot)
+            lock = FileLock(path.with_name(path.name + ".lock"))
+            if lock.acquire(blocking=False):
+                self._log_path, self._log_lock = path, lock
+                return
+            slot += 1
+
+    def _slot_files(self, slot_path: Path) -> List[Tuple[int, Path]]:
+        """
+        (segment number, path) of a slot's log files in order; a single-file
+        log written by an earlier version comes first as segment 0.
+        """
+        files = [(0, slot_path)] if slot_path.exists() else []
+        pattern = re.compile(re.escape(slot_path.name) + r"\.seg(\d+)")
+        for path in slot_path.parent.glob(f"{slot_path.name}.seg*"):
+            match = pattern.fullmatch(path.name)
+            if match:
+                files.append((int(match.group(1)), path))
+        return sorted(files)
+
+    def _other_slots(self) -> List[Path]:
+        base = self._base_log_path
+        pattern = re.compile(re.escape(base.name) + r"(?:\.(\d+))?(?:\.seg\d+)?")
+        slots = set()
+        for path in base.parent.glob(f"{base.name}*"):
+            match = pattern.fullmatch(path.name)
+            if match:
+                slots.add(int(match.group(1) or 0))
+        return [self._slot_path(slot) for slot in sorted(slots) if self._slot_path(slot) != self._log_path]
+
+    def _recover_logs(self) -> List[Dict[str, Any]]:
+        """
+        Read the uncommitted messages of our slot's earlier log and of logs no
+        running process holds, and move them into a fresh segment of ours.
+        """
+        if self._log_path is None:
+            return []
+        own = self._slot_files(self._log_path)
+        # New segments are numbered after the old ones, which are removed below
+        self._next_segment = max((number for number, _ in own), default=0) + 1
+        sources = [[path for _, path in own]]
+        locks = []
+        for slot_path in self._other_slots():
+            lock = FileLock(slot_path.with_name(slot_path.name + ".lock"))
+            if not lock.acquire(blocking=False):
+                continue
+            locks.append(lock)
+            sources.append([path for _, path in self._slot_files(slot_path)])
+        try:
+            read = [self._read_segments(paths) for paths in sources]
+            # Numbered after everything in the old files, so their markers never cover new entries
+            self._seq = max([self._seq] + [last_seq for _, last_seq in read])
+            recovered = []
+            for entries, _ in read:
+                for entry in entries:
+                    # Into our log before the old files are removed, so a crash in between loses nothing
+                    recovered.append(self._log_entry(self._public(entry)))
+            for paths in sources:
+                for path in paths:
+                    path.unlink(missing_ok=True)
+        finally:
+            for lock in locks:
+                lock.release()
+        return recovered
+
+    def _read_segments(self, paths: List[Path]) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        The uncommitted entries of one slot's log files, and the highest
+        sequence number they mention.
+        """
+        entries = []
+        committed = last_seq = 0
+        for path in paths:
+            with path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by a crash was never acknowledged
+                        continue
+                    if 'committed' in record:
+                        committed = max(committed, record['committed'])
+                    else:
+                        entries.append(record)
+                    last_seq = max(last_seq, record.get('committed', 0), record.get('seq', 0))
+        # Entries from logs without sequence numbers were all uncommitted
+        return [entry for entry in entries if entry.get('seq', committed + 1) > committed], last_seq
+
+    def _open_log(self):
+        if self._log is None and self._log_path is not None:
+            self._segment_path = self._log_path.with_name(f"{self._log_path.name}.seg{self._next_segment}")
+            self._next_segment += 1
+            self._log = self._segment_path.open("a", encoding="utf-8")
+        return self._log
+
+    def _sync(self, f):
+        f.flush()
+        if self._fsync:
+            os.fsync(f.fileno())
+
+    def _log_entry(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        self._seq += 1
+        record = {'seq': self._seq, **entry}
+        self._append_log(record)
+        return record
+
+    def _append_log(self, record: Dict[str, Any]) -> bool:
+        log = self._open_log()
+        if log is None:
+            return False
+        log.write(json.dumps(record) + "\n")
+        self._sync(log)
+        self._segment_lines += 1
+        self._segment_last_seq = max(self._segment_last_seq, record.get('seq', 0))
+        if self._segment_lines >= self._segment_size:
+            self._rotate_log()
+        return True
+
+    def _rotate_log(self):
+        self._log.close()
+        self._closed_segments.append((self._segment_path, self._segment_last_seq))
+        self._log = None
+        self._segment_path = None
+        self._segment_lines = 0
+        self._segment_last_seq = 0
+
+    def _mark_committed(self, seq: int) -> List[Path]:
+        """
+        Record that every message up to `seq` is committed. Returns the
+        segments that now hold nothing else, for the caller to delete.
+        """
+        if not self._append_log({'committed': seq}):
+            return []
+        finished = []
+        while self._closed_segments and self._closed_segments[0][1] <= seq:
+            finished.append(self._closed_segments.popleft()[0])
+        return finished
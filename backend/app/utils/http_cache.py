@@ -0,0 +1,125 @@
+import os
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Tuple
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from app import config
+from app.utils.pages import load_text_index, current_variants
+
+def immutable_cache_control() -> str:
+    return f"public, max-age={config.DOCUMENT_CACHE_MAX_AGE}, immutable"
+
+# For responses that change as documents are added: cache, but revalidate every time
+REVALIDATE = "no-cache"
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches `etag`, using the weak
+    comparison RFC 9110 prescribes for it.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    strip_weak = lambda tag: tag.strip().removeprefix("W/")
+    return strip_weak(etag) in {strip_weak(tag) for tag in if_none_match.split(",")}
+
+def not_modified(headers: Mapping[str, str]) -> Response:
+    return Response(status_code=304, headers=dict(headers))
+
+def cached_response(request_headers: Headers, etag: str, cache_control: str, build) -> Response:
+    """
+    304 if the client already has `etag`, otherwise `build()` with the
+    validator headers added. `build` is only called when the body is needed.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request_headers.get("if-none-match"), etag):
+        return not_modified(headers)
+    response = build()
+    response.headers.update(headers)
+    return response
+
+def accepted_encodings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """
+    Content codings of an Accept-Encoding header with their q-values;
+    codings refused with q=0 are left out.
+    """
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted[coding.strip().lower()] = quality
+    return accepted
+
+def choose_variant(text_path: Path, accept_encoding: Optional[str]) -> Optional[Tuple[str, Path]]:
+    """
+    The best precompressed copy of `text_path` the client accepts, or None
+    to send the text itself.
+    """
+    accepted = accepted_encodings(accept_encoding)
+    candidates = [
+        (accepted.get(encoding, accepted.get("*", 0)), encoding, path)
+        for encoding, path in current_variants(text_path)
+    ]
+    candidates = [candidate for candidate in candidates if candidate[0] > 0]
+    if not candidates:
+        return None
+    # Highest q-value wins; ties go to the smaller format, listed first in VARIANTS
+    _, encoding, path = max(candidates, key=lambda candidate: candidate[0])
+    return encoding, path
+
+def text_file_response(text_path: Path, request_headers: Headers, method: str = "GET", headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Serve an extracted text with a strong ETag from its content hash,
+    long-lived caching and, when accepted, a precompressed copy. Each
+    encoding gets its own ETag, as they are different representations.
+    """
+    sha256 = load_text_index(text_path)["sha256"]
+    variant = choose_variant(text_path, request_headers.get("accept-encoding"))
+    response_headers = {
+        "Cache-Control": immutable_cache_control(),
+        "Vary": "Accept-Encoding",
+        **(headers or {}),
+    }
+    if variant is None:
+        response_headers["ETag"] = f'"{sha256}"'
+    else:
+        encoding, _ = variant
+        response_headers["ETag"] = f'"{sha256}-{encoding}"'
+
+    if etag_matches(request_headers.get("if-none-match"), response_headers["ETag"]):
+        return not_modified(response_headers)
+    if variant is not None:
+        response_headers["Content-Encoding"] = variant[0]
+        # Byte ranges would refer to the compressed copy; only offered for the plain text
+        response_headers.pop("Accept-Ranges", None)
+    return FileResponse(
+        variant[1] if variant else text_path,
+        media_type="text/plain",
+        headers=response_headers,
+        method=method,
+    )
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles for the extracted texts: .txt files get content-hash ETags,
+    immutable caching and precompressed copies; anything else is served as
+    StaticFiles would.
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        full_path = Path(full_path)
+        if full_path.suffix != ".txt" or status_code != 200:
+            return super().file_response(full_path, stat_result, scope, status_code)
+        return text_file_response(full_path, Headers(scope=scope), method=scope["method"])
@@ -0,0 +1,58 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+from sqlalchemy.orm import Session
+from app.models import OCRJobDB
+from app.utils.jobs import Job
+
+def save_job(db: Session, job: Job, history: int):
+    """
+    Upsert the state of `job`. Once it has finished, rows beyond the newest
+    `history` finished jobs are deleted, like JobQueue does in memory.
+    """
+    row = db.get(OCRJobDB, job.id) or OCRJobDB(id=job.id)
+    row.status = job.status
+    row.pages_done = job.pages_done
+    row.total_pages = job.total_pages
+    row.error = job.error
+    row.details = json.dumps(job.metadata)
+    row.created_at = job.created_at
+    row.started_at = job.started_at
+    row.finished_at = job.finished_at
+    db.add(row)
+    if job.status in ("done", "failed"):
+        db.flush()
+        cutoff = (
+            db.query(OCRJobDB.created_at)
+            .filter(OCRJobDB.status.in_(("done", "failed")))
+            .order_by(OCRJobDB.created_at.desc())
+            .offset(history)
+            .limit(1)
+            .scalar()
+        )
+        if cutoff is not None:
+            db.query(OCRJobDB).filter(
+                OCRJobDB.status.in_(("done", "failed")),
+                OCRJobDB.created_at <= cutoff,
+            ).delete(synchronize_session=False)
+    db.commit()
+
+def find_job(db: Session, job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    The same dict as Job.to_dict for a job saved by any worker, or None.
+    """
+    row = db.get(OCRJobDB, job_id)
+    if row is None:
+        return None
+    iso = lambda value: value.isoformat() if isinstance(value, datetime) else None
+    return {
+        "job_id": row.id,
+        "status": row.status,
+        "pages_done": row.pages_done,
+        "total_pages": row.total_pages,
+        "error": row.error,
+        "created_at": iso(row.created_at),
+        "started_at": iso(row.started_at),
+        "finished_at": iso(row.finished_at),
+        **json.loads(row.details or "{}"),
+    }
@@ -0,0 +1,151 @@
+import queue
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+class QueueFullError(Exception):
+    """Raised when the job queue cannot accept more work."""
+
+class Job:
+    """
+    State of one background job. Workers update it through `progress`,
+    readers get a snapshot through `to_dict`.
+    """
+
+    def __init__(self, job_id: str, metadata: Dict[str, Any], on_change: Optional[Callable[["Job"], None]] = None):
+        self.id = job_id
+        self.status = "queued"  # queued -> running -> done | failed
+        self.pages_done = 0
+        self.total_pages = None
+        self.error = None
+        self.metadata = metadata
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self._on_change = on_change
+
+    def progress(self, pages_done: int, total_pages: int):
+        self.pages_done = pages_done
+        self.total_pages = total_pages
+        self.changed()
+
+    def changed(self):
+        if self._on_change is None:
+            return
+        # Publishing status is best effort; it must never fail the job itself
+        try:
+            self._on_change(self)
+        except Exception as e:
+            print(f"Could not publish state of job {self.id}: {str(e)}")  # For debugging
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "pages_done": self.pages_done,
+            "total_pages": self.total_pages,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            **self.metadata,
+        }
+
+class JobQueue:
+    """
+    Bounded queue of jobs executed by a fixed pool of worker threads.
+
+    Jobs are callables taking the Job as their only argument. Submitting to a
+    full queue raises QueueFullError instead of blocking the caller, and only
+    the most recent `history` jobs are kept for status lookups. `on_change`,
+    if given, is called with the job on every status or progress change,
+    e.g. to publish it to other processes.
+    """
+
+    def __init__(self, workers: int, max_queued: int, history: int, on_change: Optional[Callable[[Job], None]] = None):
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._workers = workers
+        self._history = history
+        self._threads = []
+        self._on_change = on_change
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self._workers):
+                thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, fn: Callable[[Job], Any], **metadata) -> Job:
+        self._ensure_started()
+        job = Job(uuid.uuid4().hex, metadata, self._on_change)
+        # Published before it is queued, so a worker's updates always come after
+        job.changed()
+        try:
+            self._queue.put_nowait((job, fn))
+        except queue.Full:
+            job.status = "failed"
+            job.error = "Too many jobs queued, try again later"
+            job.changed()
+            raise QueueFullError(job.error)
+        self._remember(job)
+        return job
+
+    def completed(self, **metadata) -> Job:
+        """
+        Record a job that needed no work (e.g. a duplicate upload), so clients
+        can poll it like any other.
+        """
+        job = Job(uuid.uuid4().hex, metadata, self._on_change)
+        job.status = "done"
+        job.started_at = job.finished_at = job.created_at
+        job.changed()
+        self._remember(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def join(self):
+        """
+        Block until every submitted job has finished.
+        """
+        self._queue.join()
+
+    def _remember(self, job: Job):
+        with self._lock:
+            self._jobs[job.id] = job
+            # Forget the oldest finished jobs once we are over the history size
+            while len(self._jobs) > self._history:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if oldest.status in ("queued", "running"):
+                    break
+                del self._jobs[oldest_id]
+
+    def _run(self):
+        while True:
+            job, fn = self._queue.get()
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            job.changed()
+            try:
+                fn(job)
+                job.status = "done"
+            except Exception as e:
+                print(f"Job {job.id} failed: {str(e)}")  # For debugging
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = datetime.utcnow()
+                job.changed()
+                self._queue.task_done()
@@ -0,0 +1,166 @@
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional
+from app import config
+
+# One turn of a conversation: {"role": "user" | "model", "text": ...}
+Turn = Dict[str, str]
+
+class ChatBackend:
+    """
+    A model that answers a question about a document, streaming the answer
+    as text fragments.
+    """
+
+    def stream(self, context: str, history: List[Turn], question: str) -> Iterator[str]:
+        raise NotImplementedError
+
+class GeminiBackend(ChatBackend):
+    def __init__(self, api_key: str, model_name: str):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    def stream(self, context: str, history: List[Turn], question: str) -> Iterator[str]:
+        contents = [
+            {"role": "user", "parts": [f"Document Context:\n{context}"]},
+            {"role": "model", "parts": ["I have read the document. What would you like to know?"]},
+        ]
+        contents += [{"role": turn["role"], "parts": [turn["text"]]} for turn in history]
+        contents.append({"role": "user", "parts": [question]})
+
+        for chunk in self.model.generate_content(contents, stream=True):
+            # Chunks without text (e.g. safety blocks) raise on .text
+            try:
+                text = chunk.text
+            except ValueError:
+                continue
+            if text:
+                yield text
+
+class FakeBackend(ChatBackend):
+    """
+    Deterministic local stand-in for a real model, for tests and offline
+    development. Answers with the first context sentence sharing a word
+    with the question.
+    """
+
+    def stream(self, context: str, history: List[Turn], question: str) -> Iterator[str]:
+        words = set(re.findall(r"\w+", question.lower()))
+        sentences = re.split(r"(?<=[.!?])\s+", context)
+        answer = next(
+            (s for s in sentences if words & set(re.findall(r"\w+", s.lower()))),
+            "I could not find that in the document.",
+        )
+        for word in answer.split():
+            yield word + " "
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend() -> ChatBackend:
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if config.LLM_BACKEND == "fake":
+                _backend = FakeBackend()
+            elif config.LLM_BACKEND == "gemini":
+                _backend = GeminiBackend(config.GEMINI_API_KEY, config.GEMINI_MODEL)
+            else:
+                raise ValueError(f"Unknown LLM_BACKEND: {config.LLM_BACKEND}")
+        return _backend
+
+class LRUCache:
+    """
+    Small thread-safe LRU map.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+def normalize_question(question: str) -> str:
+    """
+    Fold case, whitespace and trailing punctuation so that trivially
+    different phrasings of the same question share a cache entry.
+    """
+    return re.sub(r"\s+", " ", question).strip().rstrip("?!.").strip().lower()
+
+class ChatService:
+    """
+    Answers questions about documents through a ChatBackend.
+
+    First questions are cached on (document content hash, normalized
+    question); follow-ups depend on the conversation so they always go to
+    the model. Conversations keep their history server-side, so clients
+    only send the new question, and document text is kept between turns
+    instead of being re-read for every message.
+    """
+
+    def __init__(self, backend_factory=get_backend):
+        self._backend_factory = backend_factory
+        self.responses = LRUCache(config.CHAT_CACHE_SIZE)
+        self.contexts = LRUCache(config.CHAT_CONTEXT_CACHE)
+        self.conversations = LRUCache(config.CHAT_CONVERSATIONS)
+
+    def start(self, document_id: str, conversation_id: Optional[str]) -> str:
+        conversation = self.conversations.get(conversation_id) if conversation_id else None
+        if conversation is not None and conversation["document_id"] == document_id:
+            return conversation_id
+        conversation_id = uuid.uuid4().hex
+        self.conversations.put(conversation_id, {"document_id": document_id, "history": []})
+        return conversation_id
+
+    def history(self, conversation_id: str) -> List[Turn]:
+        # A conversation evicted since start() carries on as a fresh one
+        conversation = self.conversations.get(conversation_id)
+        return list(conversation["history"]) if conversation is not None else []
+
+    def cached_answer(self, content_hash: str, conversation_id: str, question: str) -> Optional[str]:
+        if self.history(conversation_id):
+            return None
+        return self.responses.get((content_hash, normalize_question(question)))
+
+    def answer(self, content_hash: str, context: str, conversation_id: str, question: str) -> Iterator[str]:
+        """
+        Stream the answer from the model and record it in the conversation
+        (and the response cache, for first questions) once complete.
+        """
+        history = self.history(conversation_id)
+
+        parts = []
+        for text in self._backend_factory().stream(context, history, question):
+            parts.append(text)
+            yield text
+        answer = "".join(parts)
+
+        if not history:
+            self.responses.put((content_hash, normalize_question(question)), answer)
+        self.record(conversation_id, question, answer)
+
+    def record(self, conversation_id: str, question: str, answer: str):
+        conversation = self.conversations.get(conversation_id)
+        if conversation is None:
+            return
+        history = conversation["history"]
+        history += [{"role": "user", "text": question}, {"role": "model", "text": answer}]
+        # Keep the most recent turns only
+        del history[:-2 * config.CHAT_HISTORY_TURNS]
@@ -0,0 +1,74 @@
+import os
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from app import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: one worker only, locks are no-ops
+    fcntl = None
+
+class FileLock:
+    """
+    Exclusive advisory lock (flock) on a lock file, shared by every process
+    that can see the file, e.g. the workers of one host, or several hosts on
+    a shared volume that supports locking.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._fd: Optional[int] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if self._fd is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                os.close(fd)
+                return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+@contextmanager
+def startup_lock(engine: Engine, name: str) -> Iterator[None]:
+    """
+    Hold a named lock across every worker and host sharing the database:
+    a PostgreSQL advisory lock, or a lock file in LOCK_DIR for other
+    databases (SQLite is only shared by processes that share its file).
+    """
+    if engine.dialect.name == "postgresql":
+        key = zlib.crc32(f"campusconnect:{name}".encode("utf-8"))
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": key})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+                conn.commit()
+        return
+
+    with FileLock(Path(config.LOCK_DIR) / f".campusconnect-{name}.lock"):
+        yield
@@ -0,0 +1,165 @@
+import hashlib
+import random
+import re
+import struct
+import zlib
+from typing import Dict, List, Optional, Sequence, Set
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from app import config
+from app.models import DocumentBandDB, DocumentDB
+from app.utils.ocr import PAGE_MARKER
+
+# Words per shingle; 5-grams tell re-issued notices apart from unrelated ones on the same topic
+SHINGLE_WORDS = 5
+# MinHash signature length, split into BANDS bands of ROWS values for LSH. Texts
+# from about 0.5 similarity up share a bucket in some band with high probability;
+# candidates are then checked against NEAR_DUPLICATE_THRESHOLD with the full signature
+BANDS = 32
+ROWS = 4
+PERMUTATIONS = BANDS * ROWS
+
+_PRIME = (1 << 61) - 1
+# Fixed seed: signatures are stored and must be comparable across processes and restarts
+_rng = random.Random(20250403)
+_PERMUTATION_PARAMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(PERMUTATIONS)]
+_SIGNATURE_FORMAT = f"<{PERMUTATIONS}Q"
+
+WORD = re.compile(r"\w+")
+
+def shingles(content: str) -> Set[int]:
+    """
+    32-bit hashes of the word 5-grams of a text, ignoring case, punctuation,
+    layout and page markers.
+    """
+    words = WORD.findall(PAGE_MARKER.sub(" ", content).lower())
+    if not words:
+        return set()
+    if len(words) < SHINGLE_WORDS:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))}
+    return {
+        zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8"))
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+
+def signature(content: str) -> Optional[List[int]]:
+    """
+    MinHash signature of a text, or None for a text without words.
+    """
+    hashes = shingles(content)
+    if not hashes:
+        return None
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATION_PARAMS]
+
+def pack(values: Sequence[int]) -> bytes:
+    return struct.pack(_SIGNATURE_FORMAT, *values)
+
+def unpack(data: bytes) -> List[int]:
+    return list(struct.unpack(_SIGNATURE_FORMAT, data))
+
+def similarity(first: Sequence[int], second: Sequence[int]) -> float:
+    # Fraction of equal MinHash values estimates the Jaccard similarity of the shingle sets
+    return sum(a == b for a, b in zip(first, second)) / PERMUTATIONS
+
+def band_buckets(values: Sequence[int]) -> Dict[int, int]:
+    """
+    {band: bucket} of a signature; buckets are signed 64-bit so any
+    database's BIGINT holds them.
+    """
+    buckets = {}
+    for band in range(BANDS):
+        rows = struct.pack(f"<{ROWS}Q", *values[band * ROWS:(band + 1) * ROWS])
+        digest = hashlib.blake2b(rows, digest_size=8).digest()
+        buckets[band] = int.from_bytes(digest, "little", signed=True)
+    return buckets
+
+def refresh_latest(db: Session, group_id: str):
+    """
+    Mark the newest upload of a group as its latest version.
+    """
+    members = (
+        db.query(DocumentDB)
+        .filter(DocumentDB.group_id == group_id)
+        .order_by(DocumentDB.uploaded_at.desc(), DocumentDB.id.desc())
+        .all()
+    )
+    for i, member in enumerate(members):
+        member.is_latest = i == 0
+
+def assign_group(db: Session, document_id: str, content: str) -> Optional[str]:
+    """
+    Put a cataloged document into the group of its most similar existing
+    document at or above NEAR_DUPLICATE_THRESHOLD, or into a group of its
+    own, and record its LSH buckets. Only documents sharing a bucket are
+    compared, so the cost depends on the number of near matches, not on
+    the size of the catalog. Returns the group id.
+    """
+    document = db.get(DocumentDB, document_id)
+    if document is None:
+        return None
+    values = signature(content) if config.NEAR_DUPLICATES else None
+    db.query(DocumentBandDB).filter(DocumentBandDB.document_id == document_id).delete(synchronize_session=False)
+
+    group_id = document_id
+    if values is not None:
+        buckets = band_buckets(values)
+        candidates = (
+            db.query(DocumentDB)
+            .join(DocumentBandDB, DocumentBandDB.document_id == DocumentDB.id)
+            .filter(DocumentDB.id != document_id)
+            .filter(or_(*(
+                and_(DocumentBandDB.band == band, DocumentBandDB.bucket == bucket)
+                for band, bucket in buckets.items()
+            )))
+            .distinct()
+            .all()
+        )
+        best, best_score = None, 0.0
+        for candidate in candidates:
+            if candidate.minhash is None:
+                continue
+            score = similarity(values, unpack(candidate.minhash))
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is not None and best_score >= config.NEAR_DUPLICATE_THRESHOLD:
+            group_id = best.group_id or best.id
+        db.add_all(
+            DocumentBandDB(band=band, bucket=bucket, document_id=document_id)
+            for band, bucket in buckets.items()
+        )
+
+    previous_group = document.group_id
+    document.minhash = pack(values) if values is not None else None
+    document.group_id = group_id
+    db.flush()
+    refresh_latest(db, group_id)
+    if previous_group and previous_group != group_id:
+        refresh_latest(db, previous_group)
+    db.commit()
+    return group_id
+
+def group_ungrouped_documents(db: Session, texts_dir) -> int:
+    """
+    Group documents cataloged before near-duplicate detection, oldest
+    first, as if they had been uploaded with it enabled.
+    """
+    documents = (
+        db.query(DocumentDB.id)
+        .filter(DocumentDB.group_id.is_(None))
+        .order_by(DocumentDB.uploaded_at, DocumentDB.id)
+        .all()
+    )
+    count = 0
+    for (document_id,) in documents:
+        text_path = texts_dir / f"{document_id}.txt"
+        if not text_path.exists():
+            continue
+        assign_group(db, document_id, text_path.read_text(encoding="utf-8"))
+        count += 1
+    return count
+
+def superseded_document_ids(db: Session) -> Set[str]:
+    """
+    Documents replaced by a newer version in their group.
+    """
+    return {row[0] for row in db.query(DocumentDB.id).filter(DocumentDB.is_latest.is_(False))}
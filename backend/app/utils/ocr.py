@@ -0,0 +1,314 @@
+import os
+import re
+import hashlib
+import subprocess
+import threading
+import time
+import multiprocessing
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from app import config
+from app.utils.ocr_cache import OCRCache
+from app.utils import metrics
+from app.utils.pages import write_page_index, write_compressed_variants
+
+# Called with (pages_done, total_pages) as extraction progresses
+ProgressCallback = Callable[[int, int], None]
+
+class OCRError(Exception):
+    """Raised when an uploaded file cannot be turned into text."""
+
+def clean_text(text):
+    """
+    Clean the text while preserving paragraph structure.
+    """
+    # Split text into lines
+    lines = text.split('\n')
+    
+    # Process each line
+    processed_lines = []
+    current_line = []
+    
+    for line in lines:
+        # Skip empty lines
+        if not line.strip():
+            if current_line:
+                # Join current paragraph and add it
+                processed_lines.append(' '.join(current_line))
+                current_line = []
+            processed_lines.append('')  # Preserve paragraph break
+            continue
+            
+        # Clean the line
+        cleaned_line = line.strip()
+        if cleaned_line:
+            current_line.append(cleaned_line)
+    
+    # Add any remaining paragraph
+    if current_line:
+        processed_lines.append(' '.join(current_line))
+    
+    # Join lines with double newlines to preserve paragraph structure
+    return '\n\n'.join(processed_lines)
+
+# Shared by every OCR job; created on first use
+_page_pool = None
+_page_pool_lock = threading.Lock()
+_cache = None
+
+def get_cache() -> OCRCache:
+    global _cache
+    if _cache is None:
+        _cache = OCRCache(config.OCR_CACHE_PATH, config.OCR_CACHE_MAX_BYTES)
+    return _cache
+
+def warm_up():
+    """
+    Import the OCR libraries and start the page worker processes now, so
+    the first upload does not pay for it. Called in the background at startup.
+    """
+    import pytesseract  # noqa: F401
+    from PIL import Image  # noqa: F401
+    from pdf2image import convert_from_path  # noqa: F401
+
+    pool = _get_page_pool()
+    # Spawned workers start on first submit; a trivial task starts them all
+    for future in [pool.submit(os.getpid) for _ in range(config.OCR_PAGE_PROCESSES)]:
+        future.result()
+
+def file_digest(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with file_path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _init_page_worker():
+    # Tesseract's own OpenMP threads would just fight the pool for cores
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(
+                max_workers=config.OCR_PAGE_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_page_worker,
+            )
+        return _page_pool
+
+def _ocr_pdf_page(file_path: str, page_number: int, dpi: int, lang: str) -> Tuple[str, Dict[str, float]]:
+    """
+    Rasterize a single PDF page and OCR it. Runs in a worker process, so only
+    one page bitmap per worker is ever held in memory. Pages are cached by the
+    digest of their bitmap, so a re-upload with one edited page only OCRs
+    that page. Returns the text and the seconds spent per stage, which the
+    parent process records.
+    """
+    import pytesseract
+    from pdf2image import convert_from_path
+
+    timings = {}
+    start = time.perf_counter()
+    images = convert_from_path(file_path, dpi=dpi, first_page=page_number, last_page=page_number)
+    timings["rasterize"] = time.perf_counter() - start
+    try:
+        image = images[0]
+        page_digest = hashlib.sha256(image.tobytes())
+        page_digest.update(f"{image.mode}:{image.size}".encode())
+        key = OCRCache.page_key(page_digest.hexdigest(), dpi, lang)
+
+        cache = get_cache()
+        page_text = cache.get(key)
+        if page_text is None:
+            start = time.perf_counter()
+            page_text = pytesseract.image_to_string(image, lang=lang)
+            timings["tesseract"] = time.perf_counter() - start
+            cache.put(key, page_text)
+        return page_text, timings
+    finally:
+        for image in images:
+            image.close()
+
+def join_pages(pages: List[Optional[str]]) -> str:
+    """
+    Join per-page text with "--- Page N ---" separators, skipping failed pages.
+    """
+    return "".join(
+        f"\n\n--- Page {i+1} ---\n\n{page_text}"
+        for i, page_text in enumerate(pages)
+        if page_text is not None
+    )
+
+def read_text_layer(file_path: Path, total_pages: int) -> List[Optional[str]]:
+    """
+    Read the embedded text of every page with poppler's pdftotext (installed
+    alongside pdftoppm, which pdf2image already needs). Returns one entry per
+    page, or all None if the text layer cannot be read.
+    """
+    try:
+        result = subprocess.run(
+            ["pdftotext", "-enc", "UTF-8", str(file_path), "-"],
+            capture_output=True,
+            check=True,
+            timeout=60,
+        )
+    except Exception as e:
+        print(f"Could not read text layer of {file_path.name}: {str(e)}")
+        return [None] * total_pages
+
+    # pdftotext ends every page with a form feed
+    pages = result.stdout.decode("utf-8", errors="replace").split("\f")
+    if len(pages) == total_pages + 1 and not pages[-1].strip():
+        pages = pages[:-1]
+    if len(pages) != total_pages:
+        return [None] * total_pages
+    return pages
+
+def is_usable_text(page_text: Optional[str]) -> bool:
+    """
+    Decide whether a page's text layer is good enough to skip OCR. Scanned
+    pages have no text (or only a stray header), broken font encodings show
+    up as replacement or control characters.
+    """
+    if not page_text:
+        return False
+    visible = [c for c in page_text if not c.isspace()]
+    # Checked separately: PDF_TEXT_MIN_CHARS may be 0
+    if not visible or sum(c.isalnum() for c in visible) < config.PDF_TEXT_MIN_CHARS:
+        return False
+    garbage = sum(c == "\ufffd" or not c.isprintable() for c in visible)
+    return garbage / len(visible) < 0.05
+
+PAGE_MARKER = re.compile(r"^--- Page (\d+) ---$", re.MULTILINE)
+
+def split_pages(text: str) -> List[Tuple[int, str]]:
+    """
+    Split extracted text back into (page number, page text) pairs using the
+    "--- Page N ---" markers. Text without markers (images) is page 1.
+    """
+    parts = PAGE_MARKER.split(text)
+    pages = []
+    if parts[0].strip():
+        pages.append((1, parts[0].strip()))
+    for number, page_text in zip(parts[1::2], parts[2::2]):
+        pages.append((int(number), page_text.strip()))
+    return pages
+
+def _extract_pdf(file_path: Path, progress: Optional[ProgressCallback] = None) -> str:
+    from pdf2image import pdfinfo_from_path
+
+    try:
+        total_pages = pdfinfo_from_path(str(file_path))["Pages"]
+    except Exception as e:
+        raise OCRError(f"Error processing PDF: {str(e)}")
+
+    pages: List[Optional[str]] = [None] * total_pages
+    if config.PDF_TEXT_LAYER:
+        with metrics.ocr_stage_seconds.time(stage="text_layer"):
+            text_layer = read_text_layer(file_path, total_pages)
+        for i, page_text in enumerate(text_layer):
+            if is_usable_text(page_text):
+                pages[i] = page_text
+
+    # Only pages without a usable text layer go through rasterize + OCR
+    to_ocr = [i + 1 for i, page_text in enumerate(pages) if page_text is None]
+    pages_done = total_pages - len(to_ocr)
+    if progress:
+        progress(pages_done, total_pages)
+    if not to_ocr:
+        return join_pages(pages)
+
+    pool = _get_page_pool()
+    pending: Dict = {}
+    queued = iter(to_ocr)
+    next_page = next(queued, None)
+
+    # Keep at most OCR_PAGE_WINDOW pages in flight and reassemble them in order
+    while next_page is not None or pending:
+        while next_page is not None and len(pending) < config.OCR_PAGE_WINDOW:
+            future = pool.submit(_ocr_pdf_page, str(file_path), next_page, config.OCR_DPI, config.OCR_LANG)
+            pending[future] = next_page
+            next_page = next(queued, None)
+
+        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in finished:
+            page_number = pending.pop(future)
+            try:
+                pages[page_number - 1], timings = future.result()
+                for stage, seconds in timings.items():
+                    metrics.ocr_stage_seconds.observe(seconds, stage=stage)
+            except Exception as e:
+                print(f"Error processing page {page_number}: {str(e)}")
+            pages_done += 1
+            if progress:
+                progress(pages_done, total_pages)
+
+    return join_pages(pages)
+
+def extract_text(file_path: Path, progress: Optional[ProgressCallback] = None) -> str:
+    """
+    Run OCR over a stored upload (PDF or image) and return the raw text.
+    PDF pages are separated with "--- Page N ---" markers.
+    """
+    if file_path.suffix.lower() == '.pdf':
+        return _extract_pdf(file_path, progress)
+
+    import pytesseract
+    from PIL import Image
+
+    try:
+        if progress:
+            progress(0, 1)
+        with Image.open(file_path) as image, metrics.ocr_stage_seconds.time(stage="tesseract"):
+            text = pytesseract.image_to_string(image, lang=config.OCR_LANG)
+        if progress:
+            progress(1, 1)
+    except Exception as e:
+        raise OCRError(f"Error processing image: {str(e)}")
+
+    return text
+
+def process_upload(
+    file_path: Path,
+    text_path: Path,
+    progress: Optional[ProgressCallback] = None,
+    digest: Optional[str] = None,
+) -> str:
+    """
+    Extract, clean and persist the text of an upload. Returns the cleaned text.
+    Results are cached by file digest and the settings that affect extraction.
+    """
+    cache = get_cache()
+    key = OCRCache.document_key(
+        digest or file_digest(file_path),
+        config.OCR_DPI,
+        config.OCR_LANG,
+        config.PDF_TEXT_LAYER,
+        config.PDF_TEXT_MIN_CHARS,
+    )
+    cleaned_text = cache.get(key)
+    if cleaned_text is None:
+        text = extract_text(file_path, progress)
+        with metrics.ocr_stage_seconds.time(stage="clean_text"):
+            cleaned_text = clean_text(text)
+        cache.put(key, cleaned_text)
+    elif progress:
+        # Report the real page count, as the page index written below does
+        total_pages = len(split_pages(cleaned_text))
+        progress(total_pages, total_pages)
+
+    # Write next to the final name and rename, so readers never see a partial file
+    partial_path = text_path.with_name(text_path.name + ".part")
+    with metrics.ocr_stage_seconds.time(stage="write"):
+        with partial_path.open("w", encoding="utf-8") as f:
+            f.write(cleaned_text)
+        partial_path.replace(text_path)
+        # Page offsets, so single pages can be served without reading the whole file,
+        # and compressed copies, so the text is never compressed per request
+        data = cleaned_text.encode("utf-8")
+        write_page_index(text_path, data)
+        write_compressed_variants(text_path, data)
+    return cleaned_text
@@ -0,0 +1,88 @@
+import sqlite3
+import time
+from typing import Optional
+
+class OCRCache:
+    """
+    Persistent, size-capped LRU cache of extracted text, stored in its own
+    SQLite file so OCR worker processes can share it.
+
+    Keys are content digests combined with the OCR settings that produced the
+    text, see `document_key` and `page_key`.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_cache ("
+                "key TEXT PRIMARY KEY, text TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_ocr_cache_last_used ON ocr_cache (last_used)")
+            conn.execute("CREATE TABLE IF NOT EXISTS ocr_cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO ocr_cache_size (id, total) VALUES (0, 0)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def document_key(digest: str, *settings) -> str:
+        return ":".join(["doc", digest, *map(str, settings)])
+
+    @staticmethod
+    def page_key(digest: str, *settings) -> str:
+        return ":".join(["page", digest, *map(str, settings)])
+
+    def get(self, key: str) -> Optional[str]:
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT text FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE ocr_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+                return row[0]
+        finally:
+            conn.close()
+
+    def put(self, key: str, text: str):
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                old = conn.execute("SELECT size FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO ocr_cache (key, text, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, text, size, time.time()),
+                )
+                conn.execute(
+                    "UPDATE ocr_cache_size SET total = total + ? WHERE id = 0",
+                    (size - (old[0] if old else 0),),
+                )
+                self._evict(conn)
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection):
+        # Drop least recently used entries until we are back under the cap
+        total = conn.execute("SELECT total FROM ocr_cache_size WHERE id = 0").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM ocr_cache ORDER BY last_used"):
+            if total - freed <= self.max_bytes:
+                break
+            evicted.append((key,))
+            freed += size
+        conn.executemany("DELETE FROM ocr_cache WHERE key = ?", evicted)
+        conn.execute("UPDATE ocr_cache_size SET total = total - ? WHERE id = 0", (freed,))
@@ -0,0 +1,217 @@
+import gzip
+import hashlib
+import json
+import re
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from app import config
+
+# The same "--- Page N ---" markers as ocr.PAGE_MARKER, matched on the UTF-8 bytes
+PAGE_MARKER = re.compile(rb"^--- Page (\d+) ---$", re.MULTILINE)
+
+# (page number, start byte, end byte) of each page's text, markers excluded
+PageEntry = Tuple[int, int, int]
+
+# Precompressed copies next to each text, best first: (Content-Encoding, file suffix)
+VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+
+def index_path(text_path: Path) -> Path:
+    return text_path.with_name(text_path.stem + ".pages.json")
+
+def _partial_path(path: Path) -> Path:
+    # Unique per writer: two requests may index (or compress) the same text at once
+    return path.with_name(f"{path.name}.{uuid.uuid4().hex}.part")
+
+def _trimmed(data: bytes, start: int, end: int) -> Tuple[int, int]:
+    while start < end and data[start:start + 1].isspace():
+        start += 1
+    while end > start and data[end - 1:end].isspace():
+        end -= 1
+    return start, end
+
+def build_page_index(data: bytes) -> List[PageEntry]:
+    """
+    Byte offsets of every page in extracted text, matching split_pages: text
+    before the first marker (or without markers, as for images) is page 1.
+    """
+    markers = list(PAGE_MARKER.finditer(data))
+    pages = []
+    start, end = _trimmed(data, 0, markers[0].start() if markers else len(data))
+    if end > start:
+        pages.append((1, start, end))
+    for i, marker in enumerate(markers):
+        next_start = markers[i + 1].start() if i + 1 < len(markers) else len(data)
+        start, end = _trimmed(data, marker.end(), next_start)
+        pages.append((int(marker.group(1)), start, end))
+    return pages
+
+def write_page_index(text_path: Path, data: Optional[bytes] = None) -> Dict:
+    """
+    Write the page index, and the SHA-256 of the text used as its ETag, next
+    to `text_path`. Called whenever extracted text is written; `data` is the
+    file content if the caller already has it.
+    """
+    if data is None:
+        data = text_path.read_bytes()
+    stat = text_path.stat()
+    index = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "pages": build_page_index(data),
+    }
+    partial_path = _partial_path(index_path(text_path))
+    partial_path.write_text(json.dumps(index))
+    partial_path.replace(index_path(text_path))
+    return index
+
+@lru_cache(maxsize=1024)
+def _load_text_index(text_path: Path, size: int, mtime_ns: int) -> Dict:
+    # Keyed by the text's size and mtime, so a rewritten text is never served stale offsets
+    try:
+        index = json.loads(index_path(text_path).read_text())
+        if index["size"] == size and index["mtime_ns"] == mtime_ns and "sha256" in index:
+            index["pages"] = [tuple(entry) for entry in index["pages"]]
+            return index
+    except (OSError, ValueError, KeyError):
+        pass
+    return write_page_index(text_path)
+
+def load_text_index(text_path: Path) -> Dict:
+    """
+    Page offsets ("pages") and content hash ("sha256") of `text_path`.
+    Documents extracted before the index existed, or whose text changed
+    since, are indexed on first use.
+    """
+    stat = text_path.stat()
+    return _load_text_index(text_path, stat.st_size, stat.st_mtime_ns)
+
+def load_page_index(text_path: Path) -> List[PageEntry]:
+    return load_text_index(text_path)["pages"]
+
+def _brotli():
+    # Optional dependency; without it only gzip copies are written
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+def variant_path(text_path: Path, suffix: str) -> Path:
+    return text_path.with_name(text_path.name + suffix)
+
+def write_compressed_variants(text_path: Path, data: Optional[bytes] = None) -> List[str]:
+    """
+    Write compressed copies of an extracted text next to it, once, so they
+    can be served without compressing per request. Returns the encodings
+    written.
+    """
+    if not config.PRECOMPRESS_TEXTS:
+        return []
+    if data is None:
+        data = text_path.read_bytes()
+    compressors = {"gzip": lambda raw: gzip.compress(raw, compresslevel=9, mtime=0)}
+    brotli = _brotli()
+    if brotli is not None:
+        compressors["br"] = lambda raw: brotli.compress(raw, quality=11, mode=brotli.MODE_TEXT)
+
+    written = []
+    for encoding, suffix in VARIANTS:
+        if encoding not in compressors:
+            continue
+        path = variant_path(text_path, suffix)
+        partial_path = _partial_path(path)
+        partial_path.write_bytes(compressors[encoding](data))
+        partial_path.replace(path)
+        written.append(encoding)
+    return written
+
+def compress_missing_variants(texts_dir: Path) -> int:
+    """
+    Write compressed copies of texts extracted before precompression was
+    enabled (or rewritten since). Returns the number of texts compressed.
+    """
+    count = 0
+    for text_file in texts_dir.glob("*.txt"):
+        if current_variants(text_file):
+            continue
+        if write_compressed_variants(text_file):
+            count += 1
+    return count
+
+def current_variants(text_path: Path) -> List[Tuple[str, Path]]:
+    # Copies older than the text belong to a previous version of it
+    try:
+        text_mtime = text_path.stat().st_mtime_ns
+    except OSError:
+        return []
+    current = []
+    for encoding, suffix in VARIANTS:
+        path = variant_path(text_path, suffix)
+        try:
+            if path.stat().st_mtime_ns >= text_mtime:
+                current.append((encoding, path))
+        except OSError:
+            continue
+    return current
+
+def select_pages(pages: List[PageEntry], first: int, last: int) -> List[PageEntry]:
+    return [entry for entry in pages if first <= entry[0] <= last]
+
+def read_bytes(text_path: Path, start: int, end: int) -> bytes:
+    with text_path.open("rb") as f:
+        f.seek(start)
+        return f.read(end - start)
+
+def read_pages(text_path: Path, first: int, last: int) -> Optional[Dict]:
+    """
+    Text of pages `first` to `last` (inclusive), read without loading the
+    rest of the file. Markers between the pages are kept. None if no page
+    in the range exists.
+    """
+    selected = select_pages(load_page_index(text_path), first, last)
+    if not selected:
+        return None
+    start, end = selected[0][1], selected[-1][2]
+    return {
+        "first_page": selected[0][0],
+        "last_page": selected[-1][0],
+        "pages": [entry[0] for entry in selected],
+        "content": read_bytes(text_path, start, end).decode("utf-8", errors="replace"),
+    }
+
+def parse_page_range(value: str) -> Tuple[int, int]:
+    """
+    "7" or "3-9" as (first, last). Raises ValueError otherwise.
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*(?:-\s*(\d+)\s*)?", value)
+    if not match:
+        raise ValueError(f"Invalid page range: {value!r}, expected e.g. 7 or 3-9")
+    first = int(match.group(1))
+    last = int(match.group(2)) if match.group(2) else first
+    if first < 1 or last < first:
+        raise ValueError(f"Invalid page range: {value!r}")
+    return first, last
+
+def parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    The (start, end exclusive) of a single-range "bytes=..." Range header.
+    Returns None for headers to ignore (other units, several ranges), so the
+    whole file is served; raises ValueError if the range cannot be satisfied.
+    """
+    match = re.fullmatch(r"\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*", header)
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    if match.group(1):
+        start = int(match.group(1))
+        end = int(match.group(2)) + 1 if match.group(2) else size
+    else:
+        # Suffix range: the last N bytes
+        start = max(0, size - int(match.group(2)))
+        end = size
+    end = min(end, size)
+    if start >= size or end <= start:
+        raise ValueError(f"Range not satisfiable for {size} bytes")
+    return start, end
@@ -0,0 +1,38 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Tuple
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Opaque cursor for keyset pagination: the sort key of the last row served.
+    """
+    raw = json.dumps(values, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise InvalidCursorError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursorError("Invalid cursor")
+    return values
+
+def decode_keyset_cursor(cursor: str, id_type: type) -> Tuple[datetime, Any]:
+    """
+    Decode a cursor made by encode_cursor(timestamp.isoformat(), id). The
+    values are type-checked, so a tampered cursor is an InvalidCursorError
+    rather than a failure further down.
+    """
+    timestamp, last_id = decode_cursor(cursor, 2)
+    if not isinstance(timestamp, str) or type(last_id) is not id_type:
+        raise InvalidCursorError("Invalid cursor")
+    try:
+        return datetime.fromisoformat(timestamp), last_id
+    except ValueError:
+        raise InvalidCursorError("Invalid cursor")
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+from passlib.context import CryptContext
+from app import config
+
+# Hashes whose cost differs from BCRYPT_ROUNDS (either way) are flagged for
+# update, so they are transparently re-hashed on the next successful login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=config.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=config.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=config.BCRYPT_ROUNDS,
+)
+
+class PasswordBusyError(Exception):
+    """Raised when too many password operations are already waiting."""
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated, bounded thread pool (bcrypt releases the GIL)
+    instead of the event loop. Once `workers + queue_limit` operations are
+    in flight, new ones are refused with PasswordBusyError rather than
+    queueing without bound.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.capacity = workers + queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._in_flight = 0
+        self._room = threading.Condition()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _release(self, *_):
+        with self._room:
+            self._in_flight -= 1
+            self._room.notify_all()
+
+    async def _run(self, fn, *args):
+        with self._room:
+            if self._in_flight >= self.capacity:
+                raise PasswordBusyError("Too many password operations in progress, try again shortly")
+            self._in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._release()
+
+    def hash_many(self, passwords: Sequence[str]) -> List[str]:
+        """
+        Hash a batch of passwords from a worker thread (bulk import) on the
+        same executor. Each hash waits until a worker is free before it is
+        queued, so batches never queue more than one round ahead of logins
+        and, however many run at once, leave the queue_limit room to them.
+        """
+        futures = []
+        for password in passwords:
+            with self._room:
+                while self._in_flight >= self.workers:
+                    self._room.wait()
+                self._in_flight += 1
+            future = self._executor.submit(pwd_context.hash, password)
+            future.add_done_callback(self._release)
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """
+        (matches, new hash or None). A new hash is returned when the stored
+        one was made with a different cost and should be replaced.
+        """
+        return await self._run(pwd_context.verify_and_update, password, hashed)
+
+password_hasher = PasswordHasher(config.PASSWORD_WORKERS, config.PASSWORD_QUEUE_LIMIT)
@@ -0,0 +1,261 @@
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app.utils.ocr import split_pages
+
+# One row per document page; document_id and page are stored but not tokenized
+CREATE_PAGES_FTS = """
+CREATE VIRTUAL TABLE IF NOT EXISTS document_pages_fts USING fts5(
+    document_id UNINDEXED,
+    page UNINDEXED,
+    content,
+    tokenize = 'porter unicode61'
+)
+"""
+
+# Retrieval chunks for the chatbot; tokens is the estimated LLM token count
+CREATE_CHUNKS_FTS = """
+CREATE VIRTUAL TABLE IF NOT EXISTS document_chunks_fts USING fts5(
+    document_id UNINDEXED,
+    page UNINDEXED,
+    tokens UNINDEXED,
+    content,
+    tokenize = 'porter unicode61'
+)
+"""
+
+# One row per indexed document. Its key fixes the block of FTS rowids the
+# document's pages and chunks use, so they can be deleted by rowid range:
+# document_id is UNINDEXED, and filtering on it scans the whole index
+CREATE_FTS_KEYS = """
+CREATE TABLE IF NOT EXISTS document_fts_keys (
+    key INTEGER PRIMARY KEY,
+    document_id TEXT NOT NULL UNIQUE
+)
+"""
+
+# FTS rows per document block (pages or chunks, counted separately)
+ROWS_PER_DOCUMENT = 1 << 20
+
+# Target chunk size in words; chunks are cut on paragraph boundaries when possible
+CHUNK_WORDS = 180
+
+# Quoted phrases or bare words in a user query
+QUERY_TOKEN = re.compile(r'"([^"]+)"|(\S+)')
+
+# SQLite errors that mean the MATCH expression itself could not be parsed
+QUERY_SYNTAX_ERRORS = ("fts5: syntax error", "unterminated string", "malformed MATCH expression")
+
+class InvalidQueryError(ValueError):
+    """Raised when a search query has nothing to match on or cannot be parsed."""
+
+class SearchUnavailableError(RuntimeError):
+    """Raised when the database has no FTS5 full-text index (server databases)."""
+
+def search_available(bind) -> bool:
+    # The index is built on SQLite FTS5; other databases store documents without it
+    return bind.dialect.name == "sqlite"
+
+def ensure_search_index(engine: Engine):
+    if not search_available(engine):
+        return
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_PAGES_FTS))
+        conn.execute(text(CREATE_CHUNKS_FTS))
+        has_keys = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'document_fts_keys'")
+        ).first()
+        if not has_keys:
+            # Rows indexed before the keys existed have arbitrary rowids; they
+            # are dropped here and reindexed by index_missing_documents
+            conn.execute(text("DELETE FROM document_pages_fts"))
+            conn.execute(text("DELETE FROM document_chunks_fts"))
+            conn.execute(text(CREATE_FTS_KEYS))
+
+def estimate_tokens(content: str) -> int:
+    # Roughly four characters per token for English text
+    return max(1, (len(content) + 3) // 4)
+
+def chunk_page(page_text: str, max_words: int = CHUNK_WORDS) -> List[str]:
+    """
+    Split a page into chunks of about `max_words` words, keeping paragraphs
+    together and only splitting paragraphs that are longer than a chunk.
+    """
+    chunks = []
+    current: List[str] = []
+    for paragraph in page_text.split("\n\n"):
+        words = paragraph.split()
+        while len(words) > max_words:
+            if current:
+                chunks.append(" ".join(current))
+                current = []
+            chunks.append(" ".join(words[:max_words]))
+            words = words[max_words:]
+        if len(current) + len(words) > max_words:
+            chunks.append(" ".join(current))
+            current = []
+        current.extend(words)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+def to_match_query(query: str, match_any: bool = False) -> str:
+    """
+    Turn free text into an FTS5 MATCH expression. "Quoted text" is kept as a
+    phrase, every other word becomes a required term (or an optional one with
+    `match_any`, for natural-language questions). Everything is quoted so FTS5
+    operators in user input are matched literally.
+    """
+    terms = []
+    for phrase, word in QUERY_TOKEN.findall(query):
+        term = (phrase or word).replace('"', "").strip()
+        if term:
+            terms.append(f'"{term}"')
+    if not terms:
+        raise InvalidQueryError("Search query is empty")
+    return (" OR " if match_any else " ").join(terms)
+
+def _rowid_block(db: Session, document_id: str) -> Tuple[int, int]:
+    """
+    First and last FTS rowid reserved for the document.
+    """
+    key = db.execute(
+        text("SELECT key FROM document_fts_keys WHERE document_id = :id"), {"id": document_id}
+    ).scalar()
+    if key is None:
+        key = db.execute(
+            text("INSERT INTO document_fts_keys (document_id) VALUES (:id)"), {"id": document_id}
+        ).lastrowid
+    return key * ROWS_PER_DOCUMENT, (key + 1) * ROWS_PER_DOCUMENT - 1
+
+def index_document(db: Session, document_id: str, content: str):
+    """
+    (Re)index the pages of one document. Called whenever extracted text is written.
+    """
+    if not search_available(db.get_bind()):
+        return
+    first, last = _rowid_block(db, document_id)
+    block = {"first": first, "last": last}
+    db.execute(text("DELETE FROM document_pages_fts WHERE rowid BETWEEN :first AND :last"), block)
+    db.execute(text("DELETE FROM document_chunks_fts WHERE rowid BETWEEN :first AND :last"), block)
+    pages = [(page, page_text) for page, page_text in split_pages(content) if page_text]
+    chunks = [(page, chunk) for page, page_text in pages for chunk in chunk_page(page_text)]
+    if len(pages) > ROWS_PER_DOCUMENT or len(chunks) > ROWS_PER_DOCUMENT:
+        raise ValueError(f"Document {document_id} has too many pages or chunks to index")
+    if pages:
+        db.execute(
+            text(
+                "INSERT INTO document_pages_fts (rowid, document_id, page, content) "
+                "VALUES (:rowid, :id, :page, :content)"
+            ),
+            [
+                {"rowid": first + i, "id": document_id, "page": page, "content": page_text}
+                for i, (page, page_text) in enumerate(pages)
+            ],
+        )
+        db.execute(
+            text(
+                "INSERT INTO document_chunks_fts (rowid, document_id, page, tokens, content) "
+                "VALUES (:rowid, :id, :page, :tokens, :content)"
+            ),
+            [
+                {"rowid": first + i, "id": document_id, "page": page, "tokens": estimate_tokens(chunk), "content": chunk}
+                for i, (page, chunk) in enumerate(chunks)
+            ],
+        )
+    db.commit()
+
+def index_missing_documents(db: Session, texts_dir: Path) -> int:
+    """
+    Index extracted texts that are on disk but not in the search index yet,
+    e.g. documents uploaded before the index existed.
+    """
+    if not search_available(db.get_bind()):
+        return 0
+    indexed = {row[0] for row in db.execute(text("SELECT document_id FROM document_fts_keys"))}
+    count = 0
+    for file in texts_dir.glob("*.txt"):
+        if file.stem in indexed:
+            continue
+        index_document(db, file.stem, file.read_text(encoding="utf-8"))
+        count += 1
+    return count
+
+def run_match(db: Session, statement: str, params: Dict[str, Any]):
+    """
+    Execute a MATCH query. Parse errors in the user's query become
+    InvalidQueryError; any other database error is raised as it is.
+    """
+    try:
+        return db.execute(text(statement), params).all()
+    except OperationalError as e:
+        if any(message in str(e.orig) for message in QUERY_SYNTAX_ERRORS):
+            raise InvalidQueryError(f"Invalid search query: {e.orig}")
+        raise
+
+# Leave out documents superseded by a newer near-duplicate (see near_duplicates.py)
+LATEST_VERSIONS_ONLY = "document_id NOT IN (SELECT id FROM documents WHERE is_latest = 0)"
+
+def search_documents(db: Session, query: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    BM25-ranked page hits for `query`, best first, with a highlighted snippet.
+    """
+    if not search_available(db.get_bind()):
+        raise SearchUnavailableError("Full-text search needs the SQLite FTS5 index")
+    rows = run_match(
+        db,
+        "SELECT document_id, page, bm25(document_pages_fts) AS score, "
+        "snippet(document_pages_fts, 2, '<mark>', '</mark>', '…', 16) AS snippet "
+        "FROM document_pages_fts WHERE document_pages_fts MATCH :query "
+        f"AND {LATEST_VERSIONS_ONLY} "
+        "ORDER BY score LIMIT :limit OFFSET :offset",
+        {"query": to_match_query(query), "limit": limit, "offset": offset},
+    )
+    return [
+        {
+            "document_id": row.document_id,
+            "page": int(row.page),
+            # bm25() is lower-is-better; flip it so clients can sort descending
+            "score": -row.score,
+            "snippet": row.snippet,
+        }
+        for row in rows
+    ]
+
+def retrieve_chunks(db: Session, query: str, k: int = 8, max_tokens: int = 2000) -> List[Dict[str, Any]]:
+    """
+    The best-ranked chunks for a question, at most `k` of them and together
+    no more than `max_tokens` (estimated). Chunks that would overflow the
+    budget are skipped in favour of smaller, lower-ranked ones.
+    """
+    if not search_available(db.get_bind()):
+        raise SearchUnavailableError("Full-text search needs the SQLite FTS5 index")
+    rows = run_match(
+        db,
+        "SELECT document_id, page, tokens, content, bm25(document_chunks_fts) AS score "
+        "FROM document_chunks_fts WHERE document_chunks_fts MATCH :query "
+        f"AND {LATEST_VERSIONS_ONLY} "
+        "ORDER BY score LIMIT :candidates",
+        {"query": to_match_query(query, match_any=True), "candidates": k * 4},
+    )
+    chunks = []
+    budget = max_tokens
+    for row in rows:
+        tokens = int(row.tokens)
+        if tokens > budget:
+            continue
+        chunks.append({
+            "document_id": row.document_id,
+            "page": int(row.page),
+            "score": -row.score,
+            "tokens": tokens,
+            "content": row.content,
+        })
+        budget -= tokens
+        if len(chunks) == k:
+            break
+    return chunks
@@ -1,42 +1,157 @@
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Sequence
 import json
-from textblob import TextBlob
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 import statistics
+from app.utils import metrics
 
-# Download required NLTK data
-try:
-    nltk.data.find('vader_lexicon')
-except LookupError:
-    nltk.download('vader_lexicon')
+SCORERS = ('textblob', 'vader')
 
-def analyze_sentiment(text: str) -> Dict[str, Any]:
+# Batches smaller than this are scored in-process; a process pool only pays off for backfills
+PARALLEL_THRESHOLD = 20000
+
+# Analyzers are built once per process and reused for every message. nltk
+# and textblob are imported here rather than at module level because they
+# take a large share of the application's import time
+_textblob_analyzer = None
+_vader_analyzer = None
+
+def _get_textblob_analyzer():
+    global _textblob_analyzer
+    if _textblob_analyzer is None:
+        from textblob.en.sentiments import PatternAnalyzer
+
+        _textblob_analyzer = PatternAnalyzer()
+    return _textblob_analyzer
+
+def _get_vader_analyzer():
+    global _vader_analyzer
+    if _vader_analyzer is None:
+        import nltk
+        from nltk.sentiment import SentimentIntensityAnalyzer
+
+        # Download required NLTK data
+        try:
+            nltk.data.find('sentiment/vader_lexicon.zip')
+        except LookupError:
+            nltk.download('vader_lexicon')
+        _vader_analyzer = SentimentIntensityAnalyzer()
+    return _vader_analyzer
+
+def warm_up(scorer: str = 'textblob'):
     """
-    Analyze the sentiment of a single text using TextBlob.
-    Returns a dictionary with sentiment details.
+    Load `scorer`'s analyzer (and its data) now instead of on the first message.
     """
-    analysis = TextBlob(text)
-    
-    # Get polarity (-1 to 1) and subjectivity (0 to 1)
-    polarity = analysis.sentiment.polarity
-    subjectivity = analysis.sentiment.subjectivity
-    
-    # Determine overall sentiment
-    if polarity > 0:
-        overall_sentiment = 'positive'
-    elif polarity < 0:
-        overall_sentiment = 'negative'
-    else:
-        overall_sentiment = 'neutral'
-    
+    _SCORE_FUNCTIONS[scorer]("warm up")
+
+def _label(polarity: float, threshold: float = 0) -> str:
+    if polarity > threshold:
+        return 'positive'
+    elif polarity < -threshold:
+        return 'negative'
+    return 'neutral'
+
+def _score_textblob(text: str) -> Dict[str, Any]:
+    # Same analyzer TextBlob(text).sentiment uses, without building a blob per message
+    polarity, subjectivity = _get_textblob_analyzer().analyze(text)
     return {
         'polarity': polarity,
         'subjectivity': subjectivity,
-        'overall_sentiment': overall_sentiment
+        'overall_sentiment': _label(polarity)
+    }
+
+def _score_vader(text: str) -> Dict[str, Any]:
+    scores = _get_vader_analyzer().polarity_scores(text)
+    return {
+        'polarity': scores['compound'],
+        # VADER has no subjectivity; use the share of non-neutral content
+        'subjectivity': 1 - scores['neu'],
+        # VADER's recommended cut-off for the compound score
+        'overall_sentiment': _label(scores['compound'], threshold=0.05)
+    }
+
+_SCORE_FUNCTIONS = {
+    'textblob': _score_textblob,
+    'vader': _score_vader,
+}
+
+def _score_chunk(texts: List[str], scorer: str) -> List[Dict[str, Any]]:
+    score = _SCORE_FUNCTIONS[scorer]
+    return [score(text) for text in texts]
+
+def scoring_pool(processes: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Process pool for score_batch. Pass the same pool to every score_batch
+    call of a long job, so worker processes are started, and import and load
+    the scorer, only once.
+    """
+    return ProcessPoolExecutor(
+        max_workers=processes or os.cpu_count() or 1,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+def score_batch(
+    texts: Sequence[str],
+    scorer: str = 'textblob',
+    processes: Optional[int] = None,
+    chunk_size: int = 5000,
+    pool: Optional[ProcessPoolExecutor] = None,
+) -> Dict[str, Any]:
+    """
+    Score many messages at once. Each distinct text is scored only once, and
+    large batches are spread over a process pool: `pool` if given (see
+    scoring_pool), otherwise one started for this call. Returns the
+    sentiments in input order plus throughput stats.
+    """
+    if scorer not in _SCORE_FUNCTIONS:
+        raise ValueError(f"Unknown sentiment scorer: {scorer}")
+
+    start = time.perf_counter()
+    unique_texts = list(dict.fromkeys(texts))
+    processes = processes or os.cpu_count() or 1
+
+    if len(unique_texts) < PARALLEL_THRESHOLD or processes == 1:
+        processes = 1
+        unique_scores = _score_chunk(unique_texts, scorer)
+    else:
+        chunks = [unique_texts[i:i + chunk_size] for i in range(0, len(unique_texts), chunk_size)]
+        if pool is None:
+            with scoring_pool(processes) as own_pool:
+                chunk_results = list(own_pool.map(_score_chunk, chunks, [scorer] * len(chunks)))
+        else:
+            chunk_results = list(pool.map(_score_chunk, chunks, [scorer] * len(chunks)))
+        unique_scores = [sentiment for chunk_scores in chunk_results for sentiment in chunk_scores]
+
+    by_text = dict(zip(unique_texts, unique_scores))
+    sentiments = [by_text[text] for text in texts]
+    seconds = time.perf_counter() - start
+    metrics.sentiment_batch_seconds.observe(seconds, scorer=scorer)
+    metrics.sentiment_messages.inc(len(texts), scorer=scorer)
+
+    return {
+        'sentiments': sentiments,
+        'stats': {
+            'scorer': scorer,
+            'messages': len(texts),
+            'unique_messages': len(unique_texts),
+            'processes': processes,
+            'seconds': seconds,
+            'messages_per_second': len(texts) / seconds if seconds else 0
+        }
     }
 
-def analyze_feedback_batch(feedback_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+def analyze_sentiment(text: str, scorer: str = 'textblob') -> Dict[str, Any]:
+    """
+    Analyze the sentiment of a single text (TextBlob by default).
+    Returns a dictionary with sentiment details.
+    """
+    if scorer not in _SCORE_FUNCTIONS:
+        raise ValueError(f"Unknown sentiment scorer: {scorer}")
+    return _SCORE_FUNCTIONS[scorer](text)
+
+def analyze_feedback_batch(feedback_list: List[Dict[str, Any]], scorer: str = 'textblob') -> Dict[str, Any]:
     """
     Analyze sentiment for a batch of feedback messages.
     Returns aggregate statistics and individual sentiments.
@@ -61,14 +176,15 @@ def analyze_feedback_batch(feedback_list: List[Dict[str, Any]]) -> Dict[str, Any
             'individual_sentiments': []
         }
     
-    # Analyze each feedback
+    # Analyze all feedback in one batch
+    sentiments = score_batch([feedback['message'] for feedback in feedback_list], scorer)['sentiments']
+
     individual_sentiments = []
     polarities = []
     subjectivities = []
     sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
     
-    for feedback in feedback_list:
-        sentiment = analyze_sentiment(feedback['message'])
+    for feedback, sentiment in zip(feedback_list, sentiments):
         individual_sentiments.append({
             'id': feedback['id'],
             'sentiment': sentiment
@@ -97,4 +213,4 @@ def analyze_feedback_batch(feedback_list: List[Dict[str, Any]]) -> Dict[str, Any
             'percentages': percentages
         },
         'individual_sentiments': individual_sentiments
-    } 
\ No newline at end of file
+    }
@@ -0,0 +1,65 @@
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+class StartupTasks:
+    """
+    Startup work that can run while the server already accepts requests:
+    backfills, admin creation, loading the OCR and NLP libraries. Tasks run
+    one after another on a background thread; `ready` turns true once all
+    have finished (failed tasks are reported but do not block readiness).
+
+    Tasks added with `shared=True` change shared state (the database, the
+    document directories) and run holding `lock(name)`, so with several
+    workers they run one worker at a time; they must be idempotent, as each
+    worker still runs them once the lock is free.
+    """
+
+    def __init__(self, lock: Optional[Callable[[str], ContextManager]] = None):
+        self._tasks: List[Tuple[str, Callable[[], Any], bool]] = []
+        self._lock_factory = lock
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._done = threading.Event()
+
+    def add(self, name: str, fn: Callable[[], Any], shared: bool = False):
+        self._tasks.append((name, fn, shared))
+        self._status[name] = {"status": "pending", "seconds": None, "error": None}
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="startup-tasks", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {name: dict(status) for name, status in self._status.items()}
+
+    def _set(self, name: str, **status):
+        with self._lock:
+            self._status[name].update(status)
+
+    def _run(self):
+        for name, fn, shared in self._tasks:
+            self._set(name, status="running")
+            start = time.perf_counter()
+            try:
+                with self._lock_factory(name) if shared and self._lock_factory else nullcontext():
+                    fn()
+                self._set(name, status="done")
+            except Exception as e:
+                print(f"Startup task {name} failed: {str(e)}")  # For debugging
+                self._set(name, status="failed", error=str(e))
+            finally:
+                self._set(name, seconds=round(time.perf_counter() - start, 3))
+        self._done.set()
@@ -0,0 +1,155 @@
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from app import config
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES."""
+
+class InvalidUploadError(ValueError):
+    """Raised when a request is not multipart/form-data with the expected file."""
+
+def _decode_filename(value: bytes) -> str:
+    try:
+        return value.decode("utf-8")
+    except UnicodeDecodeError:
+        return value.decode("latin-1")
+
+class _FilePartReader:
+    """
+    MultipartParser callbacks that collect the data of the first part named
+    `field` that carries a filename, and skip every other part.
+    """
+
+    def __init__(self, field: str):
+        self.field = field.encode()
+        self.filename: Optional[str] = None
+        self.finished = False
+        # File bytes parsed since the caller last took them
+        self.data: List[bytes] = []
+        self._in_file = False
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._in_file = (
+            self.filename is None and options.get(b"name") == self.field and b"filename" in options
+        )
+        if self._in_file:
+            self.filename = _decode_filename(options[b"filename"])
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self.data.append(data[start:end])
+
+    def on_part_end(self):
+        if self._in_file:
+            self.finished = True
+            self._in_file = False
+
+async def receive_upload(
+    request: Request, destination: Path, field: str = "file", max_bytes: int = None
+) -> Tuple[str, int, str]:
+    """
+    Stream the `field` file of a multipart/form-data request to
+    `destination` as the body arrives, hashing as it goes. Nothing is
+    spooled first, so the upload is written to disk once and memory use
+    does not depend on its size. Returns (client filename, size in bytes,
+    SHA-256 hex digest). The partial file is removed on any error,
+    including a file larger than `max_bytes`.
+    """
+    max_bytes = max_bytes or config.MAX_UPLOAD_BYTES
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise InvalidUploadError("Expected a multipart/form-data upload")
+
+    reader = _FilePartReader(field)
+    parser = MultipartParser(boundary, reader.callbacks())
+    digest = hashlib.sha256()
+    size = 0
+    buffered: List[bytes] = []
+    buffered_bytes = 0
+    try:
+        with destination.open("wb") as out:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                for data in reader.data:
+                    size += len(data)
+                    if size > max_bytes:
+                        raise UploadTooLargeError(f"File is larger than the {max_bytes} byte limit")
+                    digest.update(data)
+                    buffered.append(data)
+                    buffered_bytes += len(data)
+                reader.data.clear()
+                # Written in UPLOAD_CHUNK_BYTES pieces, off the event loop
+                if buffered_bytes >= config.UPLOAD_CHUNK_BYTES:
+                    await run_in_threadpool(out.write, b"".join(buffered))
+                    buffered, buffered_bytes = [], 0
+            parser.finalize()
+            if buffered:
+                await run_in_threadpool(out.write, b"".join(buffered))
+        if not reader.finished:
+            raise InvalidUploadError(f"The upload has no complete '{field}' file")
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+    return reader.filename, size, digest.hexdigest()
+
+class UploadSizeLimitMiddleware:
+    """
+    Refuse uploads whose Content-Length is already over the limit with 413,
+    before any of the body is read. Bodies without a Content-Length are
+    still checked by receive_upload as they arrive.
+    """
+
+    # Room for the multipart boundaries and headers around the file
+    OVERHEAD_BYTES = 64 * 1024
+
+    def __init__(self, app, path_prefix: str, max_bytes: int = None):
+        self.app = app
+        self.path_prefix = path_prefix
+        self.max_bytes = max_bytes or config.MAX_UPLOAD_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"].startswith(self.path_prefix):
+            headers = dict(scope["headers"])
+            length = headers.get(b"content-length")
+            if length and length.isdigit() and int(length) > self.max_bytes + self.OVERHEAD_BYTES:
+                response = JSONResponse(
+                    status_code=413,
+                    content={"detail": f"File is larger than the {self.max_bytes} byte limit"},
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from app import config
+from app.models import User, UserDB
+
+class CachedUser(NamedTuple):
+    user: User
+    token_version: Optional[int]
+    # Time to compare token_version with the database again
+    check_due: bool
+
+class UserCache:
+    """
+    Size-bounded, TTL-limited cache of authenticated users keyed by email
+    (the JWT subject). Entries are read-only `models.User` snapshots, never
+    ORM objects, so they are safe to share between requests and sessions.
+
+    Hits are served without touching the database. Writes in this process
+    invalidate entries through the session and mapper events below, and
+    `put` ignores rows read before the last invalidation, so a lookup
+    running during a delete cannot bring the user back. Changes made by
+    other worker processes bump the row's token_version; each entry is
+    compared with it at most once every `check_interval` seconds.
+    """
+
+    def __init__(self, max_size: int, ttl: float, check_interval: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.check_interval = check_interval
+        # email -> (expires, snapshot, token_version, next check)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.checks = 0
+        self.invalidations = 0
+        # Bumped by every invalidation; see put
+        self._generation = 0
+
+    def get(self, email: str) -> Optional[CachedUser]:
+        with self._lock:
+            entry = self._entries.get(email)
+            now = time.monotonic()
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[email]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(email)
+            self.hits += 1
+            return CachedUser(entry[1], entry[2], entry[3] <= now)
+
+    def confirm(self, email: str, token_version: Optional[int]):
+        """
+        Record that the entry still matches the database's token_version.
+        """
+        with self._lock:
+            entry = self._entries.get(email)
+            self.checks += 1
+            if entry is not None and entry[2] == token_version:
+                self._entries[email] = entry[:3] + (time.monotonic() + self.check_interval,)
+
+    @property
+    def generation(self) -> int:
+        """
+        Read before loading a user from the database and pass to `put`.
+        """
+        with self._lock:
+            return self._generation
+
+    def put(self, user: UserDB, generation: Optional[int] = None) -> User:
+        """
+        Cache `user` and return its snapshot. If anything was invalidated
+        since `generation` was read, the row may predate that change, so it
+        is returned without being cached.
+        """
+        snapshot = User.model_construct(**{field: getattr(user, field) for field in User.model_fields})
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return snapshot
+            now = time.monotonic()
+            self._entries[user.email] = (now + self.ttl, snapshot, user.token_version, now + self.check_interval)
+            self._entries.move_to_end(user.email)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, email: str):
+        with self._lock:
+            self._generation += 1
+            if self._entries.pop(email, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "check_interval_seconds": self.check_interval,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0,
+                "checks": self.checks,
+                "invalidations": self.invalidations
+            }
+
+user_cache = UserCache(config.USER_CACHE_SIZE, config.USER_CACHE_TTL, config.USER_CACHE_CHECK_SECONDS)
+
+# Session.info keys: emails changed in the open transaction, and whether a
+# bulk statement changed users we cannot name
+STALE_EMAILS = "user_cache_stale_emails"
+STALE_ALL = "user_cache_stale_all"
+
+@event.listens_for(UserDB, "before_update")
+def _bump_token_version(mapper, connection, target):
+    target.token_version = (target.token_version or 0) + 1
+
+@event.listens_for(UserDB, "after_update")
+@event.listens_for(UserDB, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    # Drop the current email and, if it was just changed, the previous one
+    emails = {target.email, *(inspect(target).attrs.email.history.deleted or ())}
+    for email in emails:
+        user_cache.invalidate(email)
+    session = inspect(target).session
+    if session is not None:
+        session.info.setdefault(STALE_EMAILS, set()).update(emails)
+
+@event.listens_for(Session, "do_orm_execute")
+def _handle_bulk_user_writes(orm_execute_state):
+    """
+    query(UserDB).update()/delete() and update(UserDB)/delete(UserDB) skip
+    the mapper events: bump token_version for the other workers and drop
+    the whole cache here, since the rows are not known.
+    """
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if not any(mapper.class_ is UserDB for mapper in orm_execute_state.all_mappers):
+        return
+    if orm_execute_state.is_update:
+        orm_execute_state.statement = orm_execute_state.statement.values(
+            token_version=func.coalesce(UserDB.token_version, 0) + 1
+        )
+    user_cache.clear()
+    orm_execute_state.session.info[STALE_ALL] = True
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    # Again once committed: a lookup between the write and the commit read the old row
+    emails = session.info.pop(STALE_EMAILS, ())
+    if session.info.pop(STALE_ALL, False):
+        user_cache.clear()
+    for email in emails:
+        user_cache.invalidate(email)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_stale_users(session):
+    session.info.pop(STALE_EMAILS, None)
+    session.info.pop(STALE_ALL, None)
@@ -0,0 +1,172 @@
+import csv
+import io
+import json
+from typing import Any, BinaryIO, Dict, Iterator, List, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models import UserCreate, UserDB, UserType
+from app.utils.passwords import PasswordHasher, password_hasher
+
+# Rows validated, checked, hashed and inserted together in one transaction
+IMPORT_BATCH_SIZE = 500
+
+# Bulk imports may only create these account types
+IMPORTABLE_USER_TYPES = (UserType.STUDENT, UserType.FACULTY)
+
+def iter_rows(file: BinaryIO, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Stream (row number, parsed row) from a CSV (with a header line) or NDJSON
+    upload without loading the whole file. Unparseable NDJSON lines yield
+    the error message instead of a dict.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for row_number, row in enumerate(csv.DictReader(text), start=1):
+            yield row_number, row
+        return
+
+    for row_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield row_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, f"Invalid JSON: {e}"
+
+def _validate(row: Any, default_user_type: UserType) -> UserCreate:
+    if not isinstance(row, dict):
+        raise ValueError(row if isinstance(row, str) else "Row must be an object")
+    row = {key.strip(): value.strip() if isinstance(value, str) else value for key, value in row.items() if key}
+    row.setdefault("user_type", default_user_type.value)
+    if not row["user_type"]:
+        row["user_type"] = default_user_type.value
+    user = UserCreate(**row)
+    if user.user_type not in IMPORTABLE_USER_TYPES:
+        raise ValueError(f"Cannot import users of type {user.user_type.value}")
+    return user
+
+class UserImporter:
+    """
+    Creates users from a stream of rows in batches: duplicates are detected
+    with one set-based query per batch, passwords are hashed in parallel on
+    the shared password executor (see PasswordHasher.hash_many) and each
+    batch is inserted in a single transaction.
+    """
+
+    def __init__(self, db: Session, default_user_type: UserType, hasher: PasswordHasher = password_hasher):
+        self.db = db
+        self.default_user_type = default_user_type
+        self.hasher = hasher
+        self.results: List[Dict[str, Any]] = []
+        self.seen_emails = set()
+        self.seen_usernames = set()
+
+    def run(self, rows: Iterator[Tuple[int, Any]]) -> Dict[str, Any]:
+        """
+        Import every row and report on each. If the file cannot be read to
+        the end (bad encoding, broken CSV quoting), the rows before the
+        failure are still imported, since earlier batches are already
+        committed, and the report says where reading stopped
+        ("complete": false, "read_error").
+        """
+        read_error = None
+        batch = []
+        last_row = 0
+        try:
+            for row_number, row in rows:
+                last_row = row_number
+                batch.append((row_number, row))
+                if len(batch) == IMPORT_BATCH_SIZE:
+                    self._import_batch(batch)
+                    batch = []
+        except (UnicodeDecodeError, csv.Error) as e:
+            read_error = f"Could not read the file from row {last_row + 1} on: {e}"
+        if batch:
+            self._import_batch(batch)
+        if read_error:
+            self._result(last_row + 1, None, "error", read_error)
+
+        self.results.sort(key=lambda result: result["row"])
+        counts = {"created": 0, "duplicate": 0, "invalid": 0, "error": 0}
+        for result in self.results:
+            counts[result["status"]] += 1
+        return {
+            **counts,
+            "total": len(self.results),
+            "complete": read_error is None,
+            "read_error": read_error,
+            "results": self.results,
+        }
+
+    def _result(self, row_number: int, email, status: str, error: str = None):
+        result = {"row": row_number, "email": email, "status": status}
+        if error:
+            result["error"] = error
+        self.results.append(result)
+
+    def _import_batch(self, batch: List[Tuple[int, Any]]):
+        valid: List[Tuple[int, UserCreate]] = []
+        for row_number, row in batch:
+            try:
+                user = _validate(row, self.default_user_type)
+            except (ValidationError, ValueError, TypeError) as e:
+                email = row.get("email") if isinstance(row, dict) else None
+                message = "; ".join(
+                    f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()
+                ) if isinstance(e, ValidationError) else str(e)
+                self._result(row_number, email, "invalid", message)
+                continue
+            valid.append((row_number, user))
+
+        # One query each for emails and usernames already in the database
+        emails = {user.email for _, user in valid}
+        usernames = {user.username for _, user in valid}
+        existing_emails = {email for (email,) in self.db.query(UserDB.email).filter(UserDB.email.in_(emails))}
+        existing_usernames = {
+            username for (username,) in self.db.query(UserDB.username).filter(UserDB.username.in_(usernames))
+        }
+
+        to_create: List[Tuple[int, UserCreate]] = []
+        for row_number, user in valid:
+            if user.email in existing_emails or user.email in self.seen_emails:
+                self._result(row_number, user.email, "duplicate", "Email already registered")
+            elif user.username in existing_usernames or user.username in self.seen_usernames:
+                self._result(row_number, user.email, "duplicate", "Username already taken")
+            else:
+                self.seen_emails.add(user.email)
+                self.seen_usernames.add(user.username)
+                to_create.append((row_number, user))
+        if not to_create:
+            return
+
+        hashes = self.hasher.hash_many([user.password for _, user in to_create])
+        values = [
+            {**user.model_dump(exclude={"password"}), "user_type": user.user_type.value, "password": hashed}
+            for (_, user), hashed in zip(to_create, hashes)
+        ]
+        try:
+            self.db.execute(insert(UserDB), values)
+            self.db.commit()
+        except IntegrityError:
+            # Someone created one of these users concurrently; insert row by row
+            self.db.rollback()
+            self._insert_one_by_one(to_create, values)
+            return
+
+        for row_number, user in to_create:
+            self._result(row_number, user.email, "created")
+
+    def _insert_one_by_one(self, to_create: List[Tuple[int, UserCreate]], values: List[Dict[str, Any]]):
+        for (row_number, user), row_values in zip(to_create, values):
+            try:
+                self.db.execute(insert(UserDB), [row_values])
+                self.db.commit()
+                self._result(row_number, user.email, "created")
+            except IntegrityError:
+                self.db.rollback()
+                self._result(row_number, user.email, "duplicate", "Email or username already registered")
+            except Exception as e:
+                self.db.rollback()
+                self._result(row_number, user.email, "error", str(e))
@@ -0,0 +1,64 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+from sqlalchemy import Select, func, or_, select
+from app.models import UserDB
+from app.utils.pagination import InvalidCursorError, decode_cursor
+
+# Columns a listing may return; never the password hash
+USER_FIELDS = ('id', 'email', 'username', 'full_name', 'user_type', 'created_at', 'is_active')
+
+# Rows fetched per query when streaming a whole listing
+EXPORT_BATCH_SIZE = 1000
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """
+    Columns named in a comma-separated `fields` parameter, in USER_FIELDS
+    order. id is always included because the cursor is built from it.
+    """
+    if not fields:
+        return list(USER_FIELDS)
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(USER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [field for field in USER_FIELDS if field in requested or field == 'id']
+
+def _prefix_range(column, prefix: str):
+    # lower(column) >= prefix AND < the next prefix, so the expression index is range-scanned
+    prefix = prefix.lower()
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    lowered = func.lower(column)
+    return (lowered >= prefix) & (lowered < upper)
+
+def user_listing(
+    user_type: str,
+    fields: Sequence[str],
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    q: Optional[str] = None,
+    after_id: Optional[int] = None,
+) -> Select:
+    """
+    Statement for one page of users of a type, ordered by id. Only the
+    requested columns are selected, so rows are never loaded as ORM objects.
+    `q` matches the start of the full name or email, ignoring case.
+    """
+    statement = select(*[getattr(UserDB, field) for field in fields]).where(UserDB.user_type == user_type)
+    if q:
+        statement = statement.where(or_(_prefix_range(UserDB.full_name, q), _prefix_range(UserDB.email, q)))
+    if cursor:
+        (after_id,) = decode_cursor(cursor, 1)
+        if not isinstance(after_id, int):
+            raise InvalidCursorError("Invalid cursor")
+    if after_id is not None:
+        statement = statement.where(UserDB.id > after_id)
+    statement = statement.order_by(UserDB.id)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+def user_row_to_dict(row) -> Dict[str, Any]:
+    return {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in row._mapping.items()
+    }
@@ -0,0 +1,142 @@
+import io
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+from PIL import Image, ImageDraw
+
+# Password of every generated user; hashed once and shared
+PASSWORD = "benchmark-password"
+
+WORDS = (
+    "course lecture exam library hostel canteen faculty semester timetable lab project "
+    "assignment schedule notice registration merit scholarship department seminar placement"
+).split()
+
+FEEDBACK_TEMPLATES = (
+    "The {} was really helpful and well organised",
+    "I am disappointed with the {} this semester",
+    "Please share the {} details earlier",
+    "Great {} , thanks to the team",
+    "The {} is too crowded and badly managed",
+    "No complaints about the {}",
+)
+
+# Fixture sizes per scale
+SCALES = {
+    "small": {"users": 500, "documents": 50, "pages": 3, "feedback": 20_000, "pdfs": 10},
+    "full": {"users": 5_000, "documents": 500, "pages": 5, "feedback": 200_000, "pdfs": 40},
+}
+
+def sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+def feedback_message(rng: random.Random) -> str:
+    # A few trailing words keep most messages distinct, like real submissions
+    return rng.choice(FEEDBACK_TEMPLATES).format(rng.choice(WORDS)) + " " + sentence(rng, 4)
+
+def document_text(rng: random.Random, pages: int) -> str:
+    # Same layout process_upload writes: paragraphs under "--- Page N ---" markers
+    return "".join(
+        f"\n\n--- Page {page} ---\n\n" + "\n\n".join(
+            " ".join(sentence(rng) for _ in range(5)) for _ in range(6)
+        )
+        for page in range(1, pages + 1)
+    )
+
+def render_page(rng: random.Random, lines: int = 30) -> Image.Image:
+    """
+    A white A4-ish page at 100 dpi with lines of black text, like a scanned notice.
+    """
+    image = Image.new("L", (827, 1169), 255)
+    draw = ImageDraw.Draw(image)
+    for line in range(lines):
+        draw.text((60, 60 + line * 34), sentence(rng, 9), fill=0)
+    return image
+
+def make_pdf(rng: random.Random, pages: int) -> bytes:
+    images = [render_page(rng) for _ in range(pages)]
+    buffer = io.BytesIO()
+    images[0].save(buffer, format="PDF", save_all=True, append_images=images[1:], resolution=100)
+    return buffer.getvalue()
+
+def make_png(rng: random.Random) -> bytes:
+    buffer = io.BytesIO()
+    render_page(rng, lines=12).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def make_uploads(rng: random.Random, count: int) -> List[Dict]:
+    """
+    Distinct files for the upload benchmark: mostly PDFs of 1-3 pages, some images.
+    """
+    uploads = []
+    for i in range(count):
+        if i % 4 == 3:
+            uploads.append({"filename": f"notice_{i}.png", "content": make_png(rng), "type": "image/png"})
+        else:
+            uploads.append({"filename": f"notice_{i}.pdf", "content": make_pdf(rng, rng.randint(1, 3)), "type": "application/pdf"})
+    return uploads
+
+def populate(workdir: Path, scale: Dict[str, int], seed: int = 0) -> Dict[str, List]:
+    """
+    Fill the (already migrated) database and extracted_texts/ under `workdir`
+    with synthetic users, feedback and documents. Returns the generated user
+    emails and document ids.
+    """
+    from app.database import SessionLocal
+    from app.models import Feedback, UserDB
+    from app.utils.passwords import pwd_context
+
+    rng = random.Random(seed)
+    db = SessionLocal()
+    try:
+        password = pwd_context.hash(PASSWORD)
+        users = [
+            {
+                "email": f"user{i}@bench.example",
+                "username": f"user{i}",
+                "full_name": f"{rng.choice(WORDS).title()} User {i}",
+                "password": password,
+                "user_type": "faculty" if i % 20 == 0 else "student",
+                "created_at": datetime.utcnow(),
+                "is_active": True,
+            }
+            for i in range(scale["users"])
+        ]
+        db.bulk_insert_mappings(UserDB, users)
+        db.commit()
+        user_ids = [user_id for (user_id,) in db.query(UserDB.id).filter(UserDB.user_type != "admin")]
+
+        # Scored already, so startup only has to build the rollups
+        start = datetime.utcnow() - timedelta(days=180)
+        labels = ("positive", "negative", "neutral")
+        batch = []
+        for i in range(scale["feedback"]):
+            label = rng.choice(labels)
+            batch.append({
+                "message": feedback_message(rng),
+                "user_id": rng.choice(user_ids),
+                "created_at": start + timedelta(seconds=rng.randint(0, 180 * 86400)),
+                "polarity": {"positive": 0.5, "negative": -0.5, "neutral": 0.0}[label],
+                "subjectivity": rng.random(),
+                "sentiment_label": label,
+            })
+            if len(batch) == 10_000:
+                db.bulk_insert_mappings(Feedback, batch)
+                batch = []
+        if batch:
+            db.bulk_insert_mappings(Feedback, batch)
+        db.commit()
+    finally:
+        db.close()
+
+    # Text files only; startup catalogs and indexes them like pre-existing documents
+    texts_dir = workdir / "extracted_texts"
+    texts_dir.mkdir(exist_ok=True)
+    document_ids = []
+    for i in range(scale["documents"]):
+        document_id = f"20250101_{i:06d}_notice {i}"
+        (texts_dir / f"{document_id}.txt").write_text(document_text(rng, scale["pages"]), encoding="utf-8")
+        document_ids.append(document_id)
+
+    return {"emails": [user["email"] for user in users], "document_ids": document_ids}
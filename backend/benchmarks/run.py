@@ -0,0 +1,324 @@
+"""
+Benchmark the API hot paths against a throwaway database and synthetic data.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --compare baseline.json --threshold 0.15
+
+Run from backend/. Each benchmark reports throughput and p50/p99 latency;
+with --compare, metrics that got worse than the baseline by more than the
+threshold are listed and the exit status is 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks import fixtures  # noqa: E402
+
+BENCHMARKS = (
+    "login",
+    "upload_file",
+    "list_documents",
+    "get_combined_documents",
+    "get_feedback",
+    "analyze_feedback_batch",
+)
+
+# Requests (or calls) per benchmark and how many run concurrently
+DEFAULT_PLAN = {
+    "login": {"requests": 40, "concurrency": 4},
+    "upload_file": {"requests": 40, "concurrency": 4},
+    "list_documents": {"requests": 300, "concurrency": 8},
+    "get_combined_documents": {"requests": 20, "concurrency": 2},
+    "get_feedback": {"requests": 200, "concurrency": 8},
+    "analyze_feedback_batch": {"requests": 5, "concurrency": 1},
+}
+
+# How often upload_file polls its OCR job, and how long it waits for it
+JOB_POLL_SECONDS = 0.02
+JOB_TIMEOUT_SECONDS = 300
+
+# Lower is better for these; higher is better for throughput
+LATENCY_METRICS = ("p50_ms", "p99_ms")
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(latencies: List[float], errors: int, wall_seconds: float, concurrency: int) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "concurrency": concurrency,
+        "seconds": round(wall_seconds, 4),
+        "throughput_per_s": round(len(latencies) / wall_seconds, 2) if wall_seconds else 0,
+        "mean_ms": round(statistics.mean(ordered) * 1000, 3) if ordered else 0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+    }
+
+async def measure(call: Callable[[int], Awaitable[bool]], requests: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Run `call(i)` for i in range(requests), at most `concurrency` at a time.
+    `call` returns False (or raises) for a failed request.
+    """
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                ok = await call(i)
+            except Exception as e:
+                print(f"  request {i} failed: {e}")
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return summarize(latencies, errors, time.perf_counter() - start, concurrency)
+
+async def run_benchmarks(names: List[str], plan: Dict[str, Dict[str, int]], data: Dict[str, Any], uploads: List[Dict]) -> Dict[str, Any]:
+    import httpx
+    from main import app, startup_tasks
+    from app.routes import ocr_jobs
+    from app.utils.sentiment import analyze_feedback_batch
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        # Measure the warmed-up server, not one still backfilling or loading libraries
+        await asyncio.to_thread(startup_tasks.wait)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.post("/api/v1/login/", json={
+                "email": "admin@campusconnect.com", "password": "admin123"
+            })
+            response.raise_for_status()
+            admin_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            async def login(i: int) -> bool:
+                email = data["emails"][i % len(data["emails"])]
+                response = await client.post("/api/v1/login/", json={"email": email, "password": fixtures.PASSWORD})
+                return response.status_code == 200
+
+            accept_latencies: List[float] = []
+
+            async def upload_file(i: int) -> bool:
+                """
+                Upload and wait for the OCR job: timed until the text is
+                extracted, and a job that fails counts as an error.
+                """
+                upload = uploads[i % len(uploads)]
+                # A per-request suffix keeps every upload distinct, so none is served as a duplicate
+                content = upload["content"] + f"\n%bench-{i}".encode()
+                start = time.perf_counter()
+                response = await client.post(
+                    "/api/v1/upload/",
+                    files={"file": (upload["filename"], content, upload["type"])},
+                )
+                if response.status_code not in (200, 202):
+                    return False
+                accept_latencies.append(time.perf_counter() - start)
+                job_id = response.json()["job_id"]
+                deadline = time.perf_counter() + JOB_TIMEOUT_SECONDS
+                while time.perf_counter() < deadline:
+                    job = (await client.get(f"/api/v1/upload/jobs/{job_id}")).json()
+                    if job["status"] == "done":
+                        return True
+                    if job["status"] == "failed":
+                        raise RuntimeError(f"OCR job failed: {job['error']}")
+                    await asyncio.sleep(JOB_POLL_SECONDS)
+                raise RuntimeError(f"OCR job not done after {JOB_TIMEOUT_SECONDS}s")
+
+            cursors: List[Optional[str]] = [None]
+
+            async def list_documents(i: int) -> bool:
+                # Walk the catalog page by page, starting over at the end
+                cursor = cursors[-1]
+                response = await client.get("/api/v1/documents/", params={
+                    "limit": 20, **({"cursor": cursor} if cursor else {})
+                })
+                if response.status_code != 200:
+                    return False
+                cursors.append(response.json()["next_cursor"])
+                return True
+
+            async def get_combined_documents(i: int) -> bool:
+                response = await client.get("/api/v1/documents/combined")
+                return response.status_code == 200
+
+            async def get_feedback(i: int) -> bool:
+                response = await client.get("/api/v1/feedback", params={"limit": 50}, headers=admin_headers)
+                return response.status_code == 200
+
+            rng = random.Random(1)
+            batch = [
+                {"id": i, "message": fixtures.feedback_message(rng)}
+                for i in range(data["feedback_batch"])
+            ]
+
+            async def analyze_batch(i: int) -> bool:
+                await asyncio.to_thread(analyze_feedback_batch, batch)
+                return True
+
+            calls = {
+                "login": login,
+                "upload_file": upload_file,
+                "list_documents": list_documents,
+                "get_combined_documents": get_combined_documents,
+                "get_feedback": get_feedback,
+                "analyze_feedback_batch": analyze_batch,
+            }
+            for name in names:
+                print(f"Running {name} ...")
+                results[name] = await measure(calls[name], **plan[name])
+                if name == "analyze_feedback_batch":
+                    results[name]["batch_size"] = len(batch)
+                    results[name]["messages_per_s"] = round(
+                        len(batch) * results[name]["throughput_per_s"], 1
+                    )
+                if name == "upload_file":
+                    # Jobs of timed-out uploads may still run; they must not slow down the benchmarks after this
+                    await asyncio.to_thread(ocr_jobs.join)
+                    # Latency and throughput above are to a finished job; this is only the 202
+                    accepted = sorted(accept_latencies)
+                    results[name]["accept_p50_ms"] = round(percentile(accepted, 0.50) * 1000, 3)
+                    results[name]["accept_p99_ms"] = round(percentile(accepted, 0.99) * 1000, 3)
+                print(f"  {results[name]}")
+    return results
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Human-readable regressions of `results` against `baseline`: latency up,
+    or throughput down, by more than `threshold` (a fraction).
+    """
+    regressions = []
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        for metric in LATENCY_METRICS + ("throughput_per_s",):
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change > threshold if metric in LATENCY_METRICS else change < -threshold
+            if worse:
+                regressions.append(f"{name}.{metric}: {old} -> {new} ({change:+.1%})")
+        if current.get("errors", 0) > previous.get("errors", 0):
+            regressions.append(f"{name}.errors: {previous.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the CampusConnect API hot paths")
+    parser.add_argument("--scale", choices=sorted(fixtures.SCALES), default="small", help="Size of the synthetic data")
+    parser.add_argument("--only", help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--requests", type=int, help="Override the request count of every benchmark")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the results")
+    parser.add_argument("--compare", help="Baseline results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown before flagging, e.g. 0.10 = 10%%")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary working directory")
+    args = parser.parse_args(argv)
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+    plan = {name: dict(DEFAULT_PLAN[name]) for name in names}
+    if args.requests:
+        for entry in plan.values():
+            entry["requests"] = args.requests
+
+    scale = fixtures.SCALES[args.scale]
+    output = Path(args.output).resolve()
+    baseline_path = Path(args.compare).resolve() if args.compare else None
+    workdir = Path(tempfile.mkdtemp(prefix="campusconnect-bench-"))
+    print(f"Working directory: {workdir}")
+
+    # Everything the app writes lands in the temporary directory
+    os.chdir(workdir)
+    os.environ.update({
+        "DATA_DIR": str(workdir),
+        "DATABASE_URL": f"sqlite:///{workdir / 'bench.db'}",
+        "LLM_BACKEND": "fake",
+    })
+
+    try:
+        from app.database import engine, upgrade_schema
+
+        setup_start = time.perf_counter()
+        upgrade_schema(engine)
+        data = fixtures.populate(workdir, scale, seed=args.seed)
+        data["feedback_batch"] = min(scale["feedback"], 5000)
+        uploads = fixtures.make_uploads(random.Random(args.seed), scale["pdfs"])
+        print(f"Fixtures ready in {time.perf_counter() - setup_start:.1f}s: {scale}")
+
+        results = {
+            "meta": {
+                "timestamp": datetime.utcnow().isoformat(),
+                "git_revision": git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "scale": args.scale,
+                "fixtures": scale,
+                "plan": plan,
+            },
+            "results": asyncio.run(run_benchmarks(names, plan, data, uploads)),
+        }
+    finally:
+        os.chdir(BACKEND_DIR)
+        if args.keep:
+            print(f"Kept {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+
+    if baseline_path:
+        baseline = json.loads(baseline_path.read_text())
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"Regressions against {baseline_path.name} (threshold {args.threshold:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions against {baseline_path.name}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,45 +1,38 @@
-from fastapi import FastAPI
+import time
+
+# Measured from here so the startup log can report what importing the app costs
+IMPORT_STARTED = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from app.routes import router as api_router
-from app.database import engine, SessionLocal
+from app.routes import router as api_router, feedback_buffer
+from app.database import engine, SessionLocal, upgrade_schema
 from app import models
-from app.base import Base
 from pathlib import Path
 from app.models import UserDB
-from app.routes import pwd_context
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(
-    title="CampusConnect API",
-    description="Backend API for CampusConnect application",
-    version="1.0.0"
-)
-
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:5173"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-    expose_headers=["*"],
-    max_age=3600,
-)
-
-# Mount static files directory for extracted texts
-extracted_texts_dir = Path("extracted_texts")
-extracted_texts_dir.mkdir(exist_ok=True)
-app.mount("/extracted_texts", StaticFiles(directory="extracted_texts"), name="extracted_texts")
+from app.utils.passwords import pwd_context, PasswordBusyError
+from app import config
+from app.utils.search import ensure_search_index, index_missing_documents
+from app.utils.documents import backfill_documents
+from app.utils.feedback import backfill_feedback_sentiment, rebuild_rollups, ensure_rollups
+from app.utils import metrics, ocr, sentiment
+from app.utils.startup import StartupTasks
+from app.utils.locks import startup_lock
+from sqlalchemy.exc import IntegrityError
+from app.utils.uploads import UploadSizeLimitMiddleware
+from app.utils.http_cache import PrecompressedStaticFiles
+from app.utils.pages import compress_missing_variants
+from app.utils.near_duplicates import group_ungrouped_documents
 
 # Create necessary directories
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+UPLOAD_DIR = Path(config.UPLOAD_DIR)
+UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-EXTRACTED_TEXTS_DIR = Path("extracted_texts")
-EXTRACTED_TEXTS_DIR.mkdir(exist_ok=True)
+EXTRACTED_TEXTS_DIR = Path(config.EXTRACTED_TEXTS_DIR)
+EXTRACTED_TEXTS_DIR.mkdir(parents=True, exist_ok=True)
 
 # Create admin user if it doesn't exist
 def create_admin_user():
@@ -57,13 +50,127 @@ def create_admin_user():
             db.add(admin_user)
             db.commit()
             print("Admin user created successfully")
-    except Exception as e:
-        print(f"Error creating admin user: {e}")
+    except IntegrityError:
+        # Another worker created it first
+        db.rollback()
+    finally:
+        db.close()
+
+# Catalog and index documents extracted before the documents table and search index existed
+def index_existing_documents():
+    db = SessionLocal()
+    try:
+        count = backfill_documents(db, EXTRACTED_TEXTS_DIR, UPLOAD_DIR)
+        if count:
+            print(f"Added {count} existing documents to the catalog")
+        count = index_missing_documents(db, EXTRACTED_TEXTS_DIR)
+        if count:
+            print(f"Indexed {count} existing documents for search")
+    finally:
+        db.close()
+
+# Near-duplicate groups of documents cataloged before grouping existed
+def group_existing_documents():
+    db = SessionLocal()
+    try:
+        count = group_ungrouped_documents(db, EXTRACTED_TEXTS_DIR)
+        if count:
+            print(f"Grouped {count} existing documents by near-duplicates")
+    finally:
+        db.close()
+
+# Compressed copies of texts extracted before they were written at upload
+def compress_existing_documents():
+    count = compress_missing_variants(EXTRACTED_TEXTS_DIR)
+    if count:
+        print(f"Compressed {count} existing documents")
+
+# Score feedback written before sentiment was stored with each message, and build the trend rollups
+def score_existing_feedback():
+    db = SessionLocal()
+    try:
+        count = backfill_feedback_sentiment(db)
+        if count:
+            print(f"Scored sentiment of {count} existing feedback messages")
+            rebuild_rollups(db)
+        else:
+            ensure_rollups(db)
     finally:
         db.close()
 
-# Create admin user on startup
-create_admin_user()
+# Run in the background once the server is up; /ready reports their progress.
+# Shared tasks run one worker at a time (they find nothing left to do after the first)
+startup_tasks = StartupTasks(lock=lambda name: startup_lock(engine, name))
+startup_tasks.add("create_admin_user", create_admin_user, shared=True)
+startup_tasks.add("index_existing_documents", index_existing_documents, shared=True)
+startup_tasks.add("group_existing_documents", group_existing_documents, shared=True)
+startup_tasks.add("compress_existing_documents", compress_existing_documents, shared=True)
+startup_tasks.add("score_existing_feedback", score_existing_feedback, shared=True)
+startup_tasks.add("warm_up_sentiment", lambda: sentiment.warm_up(config.SENTIMENT_SCORER))
+startup_tasks.add("warm_up_ocr", ocr.warm_up)
+
+startup_timings = {}
+
+def prepare_database():
+    # Several workers starting at once would race creating tables and indexes
+    with startup_lock(engine, "schema"):
+        upgrade_schema(engine)
+        ensure_search_index(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start = time.perf_counter()
+    # Create database tables (and columns/indexes added since they were created)
+    await run_in_threadpool(prepare_database)
+    # Commit feedback left in the write-behind log by the previous run
+    feedback_buffer.start()
+    startup_tasks.start()
+    startup_timings["startup_seconds"] = round(time.perf_counter() - start, 3)
+    print(
+        f"Imported in {startup_timings['import_seconds']:.2f}s, "
+        f"serving after {startup_timings['startup_seconds']:.2f}s; warming up in the background"
+    )
+    yield
+    # Commit everything still queued when the server stops
+    await run_in_threadpool(feedback_buffer.close)
+
+app = FastAPI(
+    title="CampusConnect API",
+    description="Backend API for CampusConnect application",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# Password hashing is at capacity: ask the client to come back instead of queueing
+@app.exception_handler(PasswordBusyError)
+async def password_busy_handler(request: Request, exc: PasswordBusyError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(config.PASSWORD_RETRY_AFTER)},
+    )
+
+# Refuse oversized uploads from Content-Length before the body is read.
+# Added before CORS so CORS wraps it and its 413s carry the CORS headers
+app.add_middleware(UploadSizeLimitMiddleware, path_prefix="/api/v1/upload")
+
+# Configure CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:5173"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["*"],
+    max_age=3600,
+)
+
+# Per-route request counts and latency; outermost so it sees every request
+if config.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Mount static files directory for extracted texts, with content-hash ETags and precompressed copies
+app.mount("/extracted_texts", PrecompressedStaticFiles(directory=EXTRACTED_TEXTS_DIR), name="extracted_texts")
 
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
@@ -76,6 +183,23 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    200 once the background startup tasks have finished, 503 before.
+    Unlike /health this says whether the first upload or feedback will be slow.
+    """
+    body = {"ready": startup_tasks.ready, "tasks": startup_tasks.to_dict(), **startup_timings}
+    return JSONResponse(status_code=200 if startup_tasks.ready else 503, content=body)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    if not config.METRICS_ENABLED:
+        return PlainTextResponse("Metrics are disabled\n", status_code=404)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+startup_timings["import_seconds"] = round(time.perf_counter() - IMPORT_STARTED, 3)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
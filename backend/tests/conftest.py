@@ -0,0 +1,116 @@
+"""
+Shared fixtures. The app reads its configuration at import time, so the
+environment is pointed at a scratch data directory before anything from
+`app` or `main` is imported.
+"""
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+DATA_DIR = tempfile.mkdtemp(prefix="campusconnect-tests-")
+os.environ.update({
+    "DATA_DIR": DATA_DIR,
+    "LLM_BACKEND": "fake",
+    "BCRYPT_ROUNDS": "4",
+    "FEEDBACK_WRITE_BEHIND": "false",
+})
+
+import pytest
+from fastapi.testclient import TestClient
+
+ADMIN = {"email": "admin@campusconnect.com", "password": "admin123"}
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+@pytest.fixture(scope="session")
+def app():
+    import main
+    return main
+
+@pytest.fixture(scope="session")
+def client(app):
+    with TestClient(app.app) as test_client:
+        app.startup_tasks.wait()
+        yield test_client
+
+@pytest.fixture(scope="session")
+def texts_dir(client):
+    from app.routes import EXTRACTED_TEXTS_DIR
+    return EXTRACTED_TEXTS_DIR
+
+@pytest.fixture
+def db(client):
+    from app.database import SessionLocal
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    response = client.post("/api/v1/login/", json=ADMIN)
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def make_document(db, texts_dir):
+    """
+    Catalog an extracted text as an upload would, returning its id.
+    Later calls get later upload times unless `uploaded_at` is given.
+    """
+    from app.utils import documents as catalog
+    from app.utils import near_duplicates
+    from app.utils.pages import write_page_index, write_compressed_variants
+
+    def make(content: str, name: str = "notice.pdf", uploaded_at: datetime = None, group: bool = False) -> str:
+        uploaded_at = uploaded_at or datetime.utcnow()
+        document_id = f"{uploaded_at:%Y%m%d_%H%M%S}-{uuid.uuid4().hex[:12]}_{Path(name).stem}"
+        text_path = texts_dir / f"{document_id}.txt"
+        text_path.write_text(content, encoding="utf-8")
+        write_page_index(text_path)
+        write_compressed_variants(text_path)
+        catalog.record_document(
+            db, document_id,
+            original_filename=name,
+            stored_filename=f"{document_id}.pdf",
+            content=content,
+            byte_size=len(content),
+            content_hash=uuid.uuid4().hex,
+            uploaded_at=uploaded_at,
+        )
+        if group:
+            near_duplicates.assign_group(db, document_id, content)
+        return document_id
+
+    return make
+
+@pytest.fixture
+def create_user(client, admin_headers):
+    """
+    Create a student through the API, returning (user, auth headers).
+    """
+    def create(password: str = "secret123"):
+        suffix = uuid.uuid4().hex[:10]
+        user = {
+            "email": f"student-{suffix}@example.edu",
+            "username": f"student-{suffix}",
+            "full_name": "Test Student",
+            "password": password,
+            "user_type": "student",
+        }
+        response = client.post("/api/v1/students/", json=user)
+        assert response.status_code == 200, response.text
+        login = client.post("/api/v1/login/", json={"email": user["email"], "password": password})
+        assert login.status_code == 200, login.text
+        return response.json(), {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    return create
+
+def paged_text(*pages: str) -> str:
+    return "\n\n".join(f"--- Page {i} ---\n{page}" for i, page in enumerate(pages, start=1))
+
+def days_ago(days: int) -> datetime:
+    return datetime.utcnow() - timedelta(days=days)
@@ -0,0 +1,23 @@
+from app.utils.llm import ChatService, FakeBackend, LRUCache
+
+CONTEXT = "The library opens at eight. Exams start in June."
+
+def test_evicted_conversation_continues_as_a_fresh_one():
+    chat = ChatService(backend_factory=FakeBackend)
+    chat.conversations = LRUCache(1)
+    conversation_id = chat.start("doc-1", None)
+    chat.start("doc-2", None)  # evicts the first conversation
+
+    assert chat.cached_answer("hash", conversation_id, "When does the library open?") is None
+    answer = "".join(chat.answer("hash", CONTEXT, conversation_id, "When does the library open?"))
+    assert answer.strip() == "The library opens at eight."
+    # Still cached as a first question
+    assert chat.cached_answer("hash", chat.start("doc-1", None), "when does the library open") == answer
+
+def test_follow_ups_are_not_served_from_the_cache():
+    chat = ChatService(backend_factory=FakeBackend)
+    conversation_id = chat.start("doc-1", None)
+    "".join(chat.answer("hash", CONTEXT, conversation_id, "When do exams start?"))
+    assert chat.start("doc-1", conversation_id) == conversation_id
+    assert chat.cached_answer("hash", conversation_id, "When do exams start?") is None
+    assert len(chat.history(conversation_id)) == 2
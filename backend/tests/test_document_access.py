@@ -0,0 +1,35 @@
+import pytest
+
+SECRET = "contents that must never be served"
+
+@pytest.fixture
+def secret_outside_texts(texts_dir):
+    # A .txt next to the extracted texts directory, as "../secret" would reach
+    path = texts_dir.parent / "secret.txt"
+    path.write_text(SECRET, encoding="utf-8")
+    yield path.stem
+    path.unlink(missing_ok=True)
+
+@pytest.mark.parametrize("document_id", ["../secret", "..\\secret", "sub/../../secret", "..%2Fsecret"])
+def test_chat_refuses_ids_outside_the_texts_directory(client, secret_outside_texts, document_id):
+    response = client.post("/api/v1/chat", json={"document_id": document_id, "question": "What is it?"})
+    assert response.status_code == 404
+    assert SECRET not in response.text
+
+@pytest.mark.parametrize("route", ["", "/text", "/pages", "/pages/1"])
+def test_document_routes_refuse_encoded_traversal(client, secret_outside_texts, route):
+    response = client.get(f"/api/v1/document/..%2Fsecret{route}")
+    assert response.status_code == 404
+    assert SECRET not in response.text
+
+def test_uncataloged_text_is_not_served(client, texts_dir):
+    (texts_dir / "stray.txt").write_text("not a cataloged document", encoding="utf-8")
+    assert client.get("/api/v1/document/stray").status_code == 404
+    assert client.post("/api/v1/chat", json={"document_id": "stray", "question": "?"}).status_code == 404
+
+def test_cataloged_document_is_served(client, make_document):
+    document_id = make_document("Hostel fees are due on the first of the month.")
+    assert client.get(f"/api/v1/document/{document_id}").json()["content"].startswith("Hostel fees")
+    response = client.post("/api/v1/chat", json={"document_id": document_id, "question": "When are fees due?"})
+    assert response.status_code == 200
+    assert "event: done" in response.text
@@ -0,0 +1,116 @@
+import pytest
+from app.utils.pagination import encode_cursor
+from tests.conftest import days_ago, paged_text
+
+NOTICE = (
+    "The examination schedule for the autumn semester has been published. "
+    "Students must register for each course examination through the portal "
+    "before the deadline, and bring their identity card to every session. "
+    "Late registrations are only accepted with approval of the department head. "
+    "Results will be announced on the notice board four weeks after the last exam. "
+    "Requests for re-evaluation are handled by the examination office within ten working days, "
+    "and a fee applies per paper. Students with a medical certificate may sit a supplementary "
+    "examination in the following term. Any form of malpractice leads to cancellation of the "
+    "whole examination and a disciplinary hearing before the academic council."
+)
+
+def test_listing_cursor_visits_every_document_once(client, make_document):
+    start = days_ago(4000)
+    ids = {make_document(f"Document {i}", uploaded_at=start.replace(microsecond=0)) for i in range(5)}
+    ids |= {make_document("Later document", uploaded_at=days_ago(3990))}
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, "uploaded_after": days_ago(4001).isoformat(), "uploaded_before": days_ago(3980).isoformat()}
+        if cursor:
+            params["cursor"] = cursor
+        body = client.get("/api/v1/documents/", params=params).json()
+        seen += [document["id"] for document in body["documents"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted(ids)
+    assert len(seen) == len(set(seen))
+
+@pytest.mark.parametrize("values", [None, [1, 2], ["not a date", "id"], ["2024-01-01T00:00:00", 5], ["2024-01-01T00:00:00"]])
+def test_invalid_cursor_is_a_client_error(client, values):
+    cursor = "not-a-cursor" if values is None else encode_cursor(*values)
+    assert client.get("/api/v1/documents/", params={"cursor": cursor}).status_code == 400
+
+def test_document_etag_revalidates_with_304(client, make_document):
+    document_id = make_document(paged_text("First page", "Second page"))
+    first = client.get(f"/api/v1/document/{document_id}")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert "immutable" in first.headers["cache-control"]
+
+    again = client.get(f"/api/v1/document/{document_id}", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert client.get(f"/api/v1/document/{document_id}", headers={"If-None-Match": '"other"'}).status_code == 200
+
+def test_text_range_requests(client, make_document):
+    content = paged_text("First page", "Second page")
+    document_id = make_document(content)
+    data = content.encode("utf-8")
+    pages = client.get(f"/api/v1/document/{document_id}/pages").json()["pages"]
+    second = pages[1]
+
+    response = client.get(
+        f"/api/v1/document/{document_id}/text",
+        headers={"Range": f"bytes={second['start']}-{second['end'] - 1}", "Accept-Encoding": "identity"},
+    )
+    assert response.status_code == 206
+    assert response.content == data[second["start"]:second["end"]] == b"Second page"
+    assert response.headers["content-range"] == f"bytes {second['start']}-{second['end'] - 1}/{len(data)}"
+
+    suffix = client.get(f"/api/v1/document/{document_id}/text", headers={"Range": "bytes=-4"})
+    assert suffix.status_code == 206
+    assert suffix.content == data[-4:]
+
+    unsatisfiable = client.get(f"/api/v1/document/{document_id}/text", headers={"Range": f"bytes={len(data)}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{len(data)}"
+
+def test_single_page_read(client, make_document):
+    document_id = make_document(paged_text("First page", "Second page", "Third page"))
+    body = client.get(f"/api/v1/document/{document_id}", params={"pages": "2"}).json()
+    assert body["pages"] == [2]
+    assert body["content"] == "Second page"
+    assert client.get(f"/api/v1/document/{document_id}/pages/9").status_code == 404
+    assert client.get(f"/api/v1/document/{document_id}", params={"pages": "3-1"}).status_code == 400
+
+def test_reissued_notice_supersedes_the_older_version(client, make_document):
+    older = make_document(NOTICE, uploaded_at=days_ago(3000), group=True)
+    newer = make_document(NOTICE.replace("four weeks", "three weeks"), uploaded_at=days_ago(2999), group=True)
+    unrelated = make_document(
+        "The library will be closed on public holidays; loans due on those days are extended.",
+        uploaded_at=days_ago(2998), group=True,
+    )
+
+    versions = client.get(f"/api/v1/document/{older}/versions").json()
+    assert [version["id"] for version in versions["versions"]] == [newer, older]
+
+    window = {"uploaded_after": days_ago(3001).isoformat(), "uploaded_before": days_ago(2990).isoformat()}
+    listed = {document["id"] for document in client.get("/api/v1/documents/", params=window).json()["documents"]}
+    assert listed == {newer, unrelated}
+    every = client.get("/api/v1/documents/", params={**window, "all_versions": "true"}).json()["documents"]
+    assert {document["id"] for document in every} == {older, newer, unrelated}
+
+    combined = client.get("/api/v1/documents/combined").json()["content"]
+    assert f"--- Document: {newer} ---" in combined
+    assert f"--- Document: {older} ---" not in combined
+
+def test_byte_ranges_are_served_with_a_single_charset(client, make_document):
+    document_id = make_document(paged_text("First page", "Second page"))
+    response = client.get(f"/api/v1/document/{document_id}/text", headers={"Range": "bytes=0-3"})
+    assert response.status_code == 206
+    assert response.headers["content-type"] == "text/plain; charset=utf-8"
+
+def test_whole_texts_are_served_with_a_single_charset(client, make_document):
+    document_id = make_document(paged_text("First page", "Second page"))
+    for path in (f"/api/v1/document/{document_id}/text", f"/extracted_texts/{document_id}.txt"):
+        for encoding in ("identity", "gzip"):
+            response = client.get(path, headers={"Accept-Encoding": encoding})
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "text/plain; charset=utf-8"
@@ -0,0 +1,93 @@
+import json
+from datetime import datetime
+import pytest
+from app.utils.feedback_buffer import FeedbackBuffer
+
+class RecordingBuffer(FeedbackBuffer):
+    """
+    Commits into a list instead of the database. Batches with a message in
+    `failing` raise, as a constraint violation would.
+    """
+
+    def __init__(self, log_path, failing=(), **options):
+        options = {"batch_size": 2, "flush_interval": 0.01, "limit": 1000, **options}
+        super().__init__(session_factory=None, log_path=str(log_path), **options)
+        self.written = []
+        self.failing = set(failing)
+
+    def _write(self, batch):
+        if any(entry["message"] in self.failing for entry in batch):
+            raise RuntimeError("constraint failed")
+        self.written += [entry["message"] for entry in batch]
+
+def submit_all(buffer, messages):
+    for message in messages:
+        buffer.submit(message, user_id=1, created_at=datetime(2025, 1, 1))
+
+def log_files(tmp_path):
+    return sorted(path.name for path in tmp_path.glob("feedback.log*") if not path.name.endswith(".lock"))
+
+def test_commits_everything_and_leaves_no_log(tmp_path):
+    buffer = RecordingBuffer(tmp_path / "feedback.log")
+    buffer.start()
+    submit_all(buffer, [f"message {i}" for i in range(7)])
+    assert buffer.flush(5)
+    buffer.close()
+    assert buffer.written == [f"message {i}" for i in range(7)]
+    assert log_files(tmp_path) == []
+
+def test_committed_segments_are_deleted_while_running(tmp_path):
+    buffer = RecordingBuffer(tmp_path / "feedback.log", segment_size=4)
+    buffer.start()
+    for i in range(50):
+        submit_all(buffer, [f"message {i}"])
+        assert buffer.flush(5)
+    # Only the active segment (and at most one finished one) is left
+    assert len(log_files(tmp_path)) <= 2
+    buffer.close()
+
+def test_restart_replays_only_uncommitted_messages(tmp_path):
+    crashed = RecordingBuffer(tmp_path / "feedback.log", failing={"third"}, max_attempts=1000)
+    crashed.start()
+    submit_all(crashed, ["first", "second"])
+    assert crashed.flush(5)
+    submit_all(crashed, ["third", "fourth"])
+    crashed.close(timeout=1)
+    assert crashed.written == ["first", "second"]
+    assert log_files(tmp_path)
+
+    restarted = RecordingBuffer(tmp_path / "feedback.log")
+    restarted.start()
+    assert restarted.flush(5)
+    restarted.close()
+    assert restarted.written == ["third", "fourth"]
+    assert log_files(tmp_path) == []
+
+def test_log_of_a_process_that_is_gone_is_taken_over(tmp_path):
+    # Slot 1 left behind in the single-file format of earlier versions
+    (tmp_path / "feedback.log.1").write_text(
+        json.dumps({"message": "orphaned", "user_id": 1, "created_at": "2025-01-01T00:00:00"}) + "\n"
+    )
+    buffer = RecordingBuffer(tmp_path / "feedback.log")
+    buffer.start()
+    assert buffer.flush(5)
+    buffer.close()
+    assert buffer.written == ["orphaned"]
+    assert log_files(tmp_path) == []
+
+def test_failing_message_is_dead_lettered_instead_of_blocking_the_queue(tmp_path):
+    dead_letter = tmp_path / "dead.log"
+    buffer = RecordingBuffer(
+        tmp_path / "feedback.log", failing={"poison"}, batch_size=3, max_attempts=2, dead_letter_path=str(dead_letter)
+    )
+    buffer.start()
+    submit_all(buffer, ["before", "poison", "after", "later"])
+    assert buffer.flush(5)
+    buffer.close()
+
+    assert buffer.written == ["before", "after", "later"]
+    assert buffer.stats()["dead_lettered"] == 1
+    (line,) = dead_letter.read_text().splitlines()
+    assert json.loads(line)["message"] == "poison"
+    assert json.loads(line)["error"] == "constraint failed"
+    assert log_files(tmp_path) == []
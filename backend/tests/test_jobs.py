@@ -0,0 +1,43 @@
+import threading
+import pytest
+from app.utils.jobs import JobQueue, QueueFullError
+
+def test_job_runs_and_reports_done():
+    jobs = JobQueue(workers=1, max_queued=4, history=10)
+    job = jobs.submit(lambda job: job.progress(2, 2), filename="a.pdf")
+    jobs.join()
+    state = jobs.get(job.id).to_dict()
+    assert state["status"] == "done"
+    assert (state["pages_done"], state["total_pages"]) == (2, 2)
+    assert state["filename"] == "a.pdf"
+
+def test_failed_job_keeps_its_error():
+    def fail(job):
+        raise RuntimeError("tesseract is not installed")
+
+    jobs = JobQueue(workers=1, max_queued=4, history=10)
+    job = jobs.submit(fail)
+    jobs.join()
+    assert job.status == "failed"
+    assert job.error == "tesseract is not installed"
+
+def test_full_queue_refuses_instead_of_blocking():
+    release = threading.Event()
+    jobs = JobQueue(workers=1, max_queued=1, history=10)
+    jobs.submit(lambda job: release.wait(5))
+    # One running, one waiting: the next one does not fit
+    submitted = 1
+    with pytest.raises(QueueFullError):
+        for _ in range(3):
+            jobs.submit(lambda job: None)
+            submitted += 1
+    assert submitted <= 2
+    release.set()
+    jobs.join()
+
+def test_history_keeps_only_recent_finished_jobs():
+    jobs = JobQueue(workers=1, max_queued=10, history=2)
+    ids = [jobs.submit(lambda job: None).id for _ in range(3)]
+    jobs.join()
+    jobs.completed(duplicate=True)
+    assert jobs.get(ids[0]) is None
@@ -0,0 +1,40 @@
+import uuid
+from app.utils.metrics import Counter, Histogram
+
+def scrape(client) -> str:
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    return response.text
+
+def test_routes_are_labelled_with_their_template(client):
+    document_id = f"missing-{uuid.uuid4().hex}"
+    assert client.get(f"/api/v1/document/{document_id}/pages").status_code == 404
+    client.get(f"/no-such-path/{document_id}")
+    text = scrape(client)
+    assert 'http_requests_total{method="GET",route="/api/v1/document/{document_id}/pages",status="404"}' in text
+    assert 'route="unmatched"' in text
+    # Raw ids would make one time series per document
+    assert document_id not in text
+
+def test_sql_statements_are_labelled_by_operation(client, admin_headers):
+    client.get("/api/v1/feedback", headers=admin_headers)
+    text = scrape(client)
+    assert 'db_queries_total{operation="SELECT"}' in text
+    assert 'db_query_duration_seconds_count{operation="SELECT"}' in text
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test latency", ("stage",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 5):
+        histogram.observe(value, stage="ocr")
+    assert list(histogram.samples()) == [
+        'test_seconds_bucket{stage="ocr",le="0.1"} 1',
+        'test_seconds_bucket{stage="ocr",le="1"} 3',
+        'test_seconds_bucket{stage="ocr",le="+Inf"} 4',
+        'test_seconds_sum{stage="ocr"} 6.05',
+        'test_seconds_count{stage="ocr"} 4',
+    ]
+
+def test_label_values_are_escaped():
+    counter = Counter("test_total", "Test", ("route",))
+    counter.inc(route='/a"b\\c\nd')
+    assert list(counter.samples()) == ['test_total{route="/a\\"b\\\\c\\nd"} 1']
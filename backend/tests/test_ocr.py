@@ -0,0 +1,95 @@
+import threading
+import time
+import pytest
+from concurrent.futures import Future, ThreadPoolExecutor
+from app.utils import ocr
+
+@pytest.fixture
+def pdf_pages(monkeypatch):
+    """
+    Pretend every file is a PDF with the given text layer, and record the
+    pages that would have been rasterized and OCR'd.
+    """
+    ocr_calls = []
+
+    def use(text_layer):
+        monkeypatch.setattr("pdf2image.pdfinfo_from_path", lambda path: {"Pages": len(text_layer)})
+        monkeypatch.setattr(ocr, "read_text_layer", lambda path, total_pages: list(text_layer))
+        return ocr_calls
+
+    def fake_ocr(file_path, page_number, dpi, lang):
+        ocr_calls.append(page_number)
+        return f"OCR text of page {page_number}", {"tesseract": 0.0}
+
+    monkeypatch.setattr(ocr, "_ocr_pdf_page", fake_ocr)
+    monkeypatch.setattr(ocr, "_get_page_pool", lambda: InlinePool())
+    return use
+
+class InlinePool:
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+TEXT_PAGE = "Registration for the autumn semester opens on Monday for all students."
+
+@pytest.mark.parametrize("page_text, usable", [
+    (TEXT_PAGE, True),
+    (None, False),
+    ("", False),
+    ("   \n\f ", False),
+    ("Page 3", False),
+    ("�" * 10 + TEXT_PAGE[:30], False),
+])
+def test_is_usable_text(page_text, usable):
+    assert ocr.is_usable_text(page_text) is usable
+
+def test_blank_page_is_not_usable_without_a_minimum(monkeypatch):
+    monkeypatch.setattr("app.config.PDF_TEXT_MIN_CHARS", 0)
+    assert ocr.is_usable_text("  \n ") is False
+    assert ocr.is_usable_text("ok") is True
+
+def test_only_pages_without_a_text_layer_are_ocrd(pdf_pages, tmp_path):
+    ocr_calls = pdf_pages([TEXT_PAGE, "", None, TEXT_PAGE])
+    progress = []
+    text = ocr.extract_text(tmp_path / "notice.pdf", lambda done, total: progress.append((done, total)))
+    assert sorted(ocr_calls) == [2, 3]
+    assert [number for number, _ in ocr.split_pages(text)] == [1, 2, 3, 4]
+    assert dict(ocr.split_pages(text))[1] == TEXT_PAGE
+    assert progress[0] == (2, 4) and progress[-1] == (4, 4)
+
+def test_text_layer_can_be_turned_off(pdf_pages, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.config.PDF_TEXT_LAYER", False)
+    ocr_calls = pdf_pages([TEXT_PAGE, TEXT_PAGE])
+    ocr.extract_text(tmp_path / "notice.pdf")
+    assert sorted(ocr_calls) == [1, 2]
+
+def test_pages_are_ocrd_in_parallel_within_the_window_and_kept_in_order(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.config.PDF_TEXT_LAYER", False)
+    monkeypatch.setattr("app.config.OCR_PAGE_WINDOW", 3)
+    monkeypatch.setattr("pdf2image.pdfinfo_from_path", lambda path: {"Pages": 8})
+    in_flight, most_in_flight = [0], [0]
+    lock = threading.Lock()
+
+    def fake_ocr(file_path, page_number, dpi, lang):
+        with lock:
+            in_flight[0] += 1
+            most_in_flight[0] = max(most_in_flight[0], in_flight[0])
+        # Later pages finish first, so results arrive out of order
+        time.sleep(0.01 * (9 - page_number))
+        with lock:
+            in_flight[0] -= 1
+        if page_number == 5:
+            raise RuntimeError("unreadable page")
+        return f"Text of page {page_number}", {}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        monkeypatch.setattr(ocr, "_get_page_pool", lambda: pool)
+        monkeypatch.setattr(ocr, "_ocr_pdf_page", fake_ocr)
+        progress = []
+        text = ocr.extract_text(tmp_path / "scan.pdf", lambda done, total: progress.append(done))
+
+    assert most_in_flight[0] == 3
+    # A failed page is left out; the others keep their own numbers
+    assert ocr.split_pages(text) == [(n, f"Text of page {n}") for n in (1, 2, 3, 4, 6, 7, 8)]
+    assert progress == list(range(9))
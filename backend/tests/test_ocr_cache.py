@@ -0,0 +1,52 @@
+import pytest
+from app.utils import ocr
+from app.utils.ocr_cache import OCRCache
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = OCRCache(str(tmp_path / "ocr_cache.db"), max_bytes=100)
+    monkeypatch.setattr(ocr, "_cache", cache)
+    return cache
+
+def test_least_recently_used_entries_are_evicted_over_the_cap(cache):
+    cache.put("a", "x" * 40)
+    cache.put("b", "y" * 40)
+    assert cache.get("a") == "x" * 40  # now more recently used than b
+    cache.put("c", "z" * 40)
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 40
+    assert cache.get("c") == "z" * 40
+
+def test_entries_larger_than_the_cap_are_not_stored(cache):
+    cache.put("big", "x" * 101)
+    assert cache.get("big") is None
+
+def test_replacing_an_entry_does_not_count_it_twice(cache):
+    for _ in range(5):
+        cache.put("a", "x" * 60)
+    cache.put("b", "y" * 40)
+    assert cache.get("a") is not None and cache.get("b") is not None
+
+def test_keys_include_the_extraction_settings():
+    assert OCRCache.document_key("abc", 300, "eng") != OCRCache.document_key("abc", 200, "eng")
+    assert OCRCache.document_key("abc", 300) != OCRCache.page_key("abc", 300)
+
+def test_cache_hit_skips_extraction_and_reports_every_page(cache, tmp_path, monkeypatch):
+    cache.max_bytes = 1024 * 1024
+    calls = []
+
+    def extract(file_path, progress=None):
+        calls.append(file_path)
+        return "\n\n--- Page 1 ---\n\nFirst\n\n--- Page 2 ---\n\nSecond\n\n--- Page 3 ---\n\nThird"
+
+    monkeypatch.setattr(ocr, "extract_text", extract)
+    upload = tmp_path / "notice.pdf"
+    upload.write_bytes(b"%PDF- not really")
+    first = ocr.process_upload(upload, tmp_path / "first.txt")
+
+    progress = []
+    second = ocr.process_upload(upload, tmp_path / "second.txt", lambda done, total: progress.append((done, total)))
+    assert second == first
+    assert len(calls) == 1
+    assert progress == [(3, 3)]
+    assert (tmp_path / "second.txt").read_text(encoding="utf-8") == first
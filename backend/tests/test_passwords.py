@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import pytest
+from passlib.context import CryptContext
+from app.models import UserDB
+from app.utils.passwords import PasswordBusyError, PasswordHasher
+
+def test_operations_over_capacity_are_refused(monkeypatch):
+    hasher = PasswordHasher(workers=1, queue_limit=1)
+    release = threading.Event()
+    monkeypatch.setattr("app.utils.passwords.pwd_context.hash", lambda password: release.wait(5) and "hashed")
+
+    async def run():
+        waiting = [asyncio.ensure_future(hasher.hash("p")) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert hasher.in_flight == 2
+        with pytest.raises(PasswordBusyError):
+            await hasher.hash("p")
+        release.set()
+        assert await asyncio.gather(*waiting) == ["hashed", "hashed"]
+        assert hasher.in_flight == 0
+        # Room again once the others finished
+        assert await hasher.hash("p") == "hashed"
+
+    asyncio.run(run())
+
+def test_busy_hashing_answers_503(client, monkeypatch):
+    async def busy(password):
+        raise PasswordBusyError("Too many password operations in progress, try again shortly")
+
+    monkeypatch.setattr("app.routes.password_hasher.hash", busy)
+    response = client.post("/api/v1/students/", json={
+        "email": "busy@example.edu", "username": "busy", "full_name": "Busy", "password": "secret123",
+        "user_type": "student",
+    })
+    assert response.status_code == 503
+    assert response.headers["retry-after"]
+
+def test_login_rehashes_a_password_made_with_another_cost(client, db, create_user):
+    user, _ = create_user(password="secret123")
+    # As if stored when BCRYPT_ROUNDS was higher
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=5).hash("secret123")
+    row = db.get(UserDB, user["id"])
+    row.password = old_hash
+    db.commit()
+
+    assert client.post("/api/v1/login/", json={"email": user["email"], "password": "secret123"}).status_code == 200
+    db.expire_all()
+    new_hash = db.get(UserDB, user["id"]).password
+    assert new_hash != old_hash
+    assert new_hash.startswith("$2b$04$")
+    assert client.post("/api/v1/login/", json={"email": user["email"], "password": "secret123"}).status_code == 200
+    assert client.post("/api/v1/login/", json={"email": user["email"], "password": "wrong"}).status_code == 401
@@ -0,0 +1,89 @@
+import threading
+import pytest
+from datetime import datetime, timedelta
+from app.database import SessionLocal
+from app.models import Feedback, FeedbackRollup, FeedbackRollupState
+from app.utils import feedback as rollups
+from app.utils.pagination import encode_cursor
+
+def add_feedback(db, created_at: datetime, label: str = "positive", with_rollups: bool = True) -> Feedback:
+    row = Feedback(message="Good course", created_at=created_at, polarity=0.5, subjectivity=0.4, sentiment_label=label)
+    db.add(row)
+    if with_rollups:
+        rollups.update_rollups(db, row)
+    db.commit()
+    return row
+
+def assert_rollups_match_feedback(db):
+    expected = rollups._bucket_totals(db.query(Feedback).filter(Feedback.created_at.isnot(None)))
+    actual = {
+        (rollup.granularity, rollup.bucket_start): {counter: getattr(rollup, counter) for counter in rollups.ROLLUP_COUNTERS}
+        for rollup in db.query(FeedbackRollup).filter(FeedbackRollup.count != 0)
+    }
+    assert actual.keys() == expected.keys()
+    for key, totals in expected.items():
+        assert actual[key]["count"] == totals["count"]
+        assert abs(actual[key]["polarity_sum"] - totals["polarity_sum"]) < 1e-9
+    assert rollups.aggregate_stats(db)["total_feedback"] == sum(
+        totals["count"] for (granularity, _), totals in expected.items() if granularity == "week"
+    )
+
+def test_startup_backfill_includes_history_after_an_early_write(db):
+    # Historic feedback without rollups, and no completed rebuild yet
+    for days in (400, 401, 420):
+        add_feedback(db, datetime.utcnow() - timedelta(days=days), with_rollups=False)
+    db.query(FeedbackRollupState).delete()
+    db.commit()
+    # Written after the server started but before the backfill task ran
+    add_feedback(db, datetime.utcnow())
+
+    rollups.ensure_rollups(db)
+    assert db.get(FeedbackRollupState, 1) is not None
+    assert_rollups_match_feedback(db)
+
+def test_rollups_follow_creates_and_deletes(db):
+    rollups.ensure_rollups(db)
+    when = datetime(2023, 3, 15, 10, 30)
+    first = add_feedback(db, when, "positive")
+    add_feedback(db, when + timedelta(minutes=5), "negative")
+    rollups.update_rollups(db, first, sign=-1)
+    db.delete(first)
+    db.commit()
+
+    trend = rollups.sentiment_trend(db, "hour", when - timedelta(hours=1), when + timedelta(hours=1))
+    assert [(bucket["bucket_start"], bucket["sentiment_counts"]) for bucket in trend] == [
+        ("2023-03-15T10:00:00", {"positive": 0, "negative": 1, "neutral": 0})
+    ]
+    assert_rollups_match_feedback(db)
+
+def test_write_during_a_rebuild_waits_and_is_kept(db, monkeypatch):
+    add_feedback(db, datetime.utcnow() - timedelta(days=30))
+    bucket_totals = rollups._bucket_totals
+    writer_finished = threading.Event()
+
+    def write_concurrently():
+        other = SessionLocal()
+        try:
+            add_feedback(other, datetime.utcnow())
+        finally:
+            other.close()
+        writer_finished.set()
+
+    def totals_with_a_concurrent_write(rows):
+        totals = bucket_totals(rows)
+        threading.Thread(target=write_concurrently).start()
+        # The writer has to wait for the rebuild to commit
+        assert not writer_finished.wait(0.5)
+        return totals
+
+    monkeypatch.setattr(rollups, "_bucket_totals", totals_with_a_concurrent_write)
+    rollups.rebuild_rollups(db)
+    assert writer_finished.wait(10)
+    monkeypatch.setattr(rollups, "_bucket_totals", bucket_totals)
+    db.expire_all()
+    assert_rollups_match_feedback(db)
+
+@pytest.mark.parametrize("values", [[1, 2], ["2024-01-01T00:00:00", "7"], ["yesterday", 7]])
+def test_invalid_feedback_cursor_is_a_client_error(client, admin_headers, values):
+    response = client.get("/api/v1/feedback", params={"cursor": encode_cursor(*values)}, headers=admin_headers)
+    assert response.status_code == 400
@@ -0,0 +1,99 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app.utils.search import (
+    CREATE_CHUNKS_FTS, CREATE_PAGES_FTS, ROWS_PER_DOCUMENT, InvalidQueryError,
+    ensure_search_index, index_document, index_missing_documents, run_match,
+)
+from tests.conftest import paged_text
+
+@pytest.fixture
+def server_errors_client(app):
+    # Unhandled errors become 500 responses instead of being raised into the test
+    return TestClient(app.app, raise_server_exceptions=False)
+
+def test_query_parse_errors_are_client_errors(db):
+    with pytest.raises(InvalidQueryError):
+        run_match(db, "SELECT * FROM document_pages_fts WHERE document_pages_fts MATCH :query", {"query": '"unterminated'})
+
+def test_other_database_errors_are_not_client_errors(db):
+    with pytest.raises(OperationalError):
+        run_match(db, "SELECT * FROM no_such_table WHERE content MATCH :query", {"query": "fees"})
+
+def test_search_finds_indexed_pages(client, db, make_document):
+    from app.utils.search import index_document
+    document_id = make_document("Scholarship applications close on Friday.")
+    index_document(db, document_id, "Scholarship applications close on Friday.")
+    results = client.get("/api/v1/search", params={"q": "scholarship"}).json()["results"]
+    assert document_id in {hit["document_id"] for hit in results}
+
+def test_empty_search_query_is_400(client):
+    assert client.get("/api/v1/search", params={"q": '""'}).status_code == 400
+
+def test_search_failure_is_500(server_errors_client, monkeypatch):
+    def broken(*args, **kwargs):
+        raise OperationalError("SELECT ...", {}, Exception("database disk image is malformed"))
+
+    monkeypatch.setattr("app.routes.search_documents", broken)
+    assert server_errors_client.get("/api/v1/search", params={"q": "fees"}).status_code == 500
+
+def test_retrieve_returns_chunks_within_the_budget(client, db, make_document):
+    from app.utils.search import index_document
+    content = "The hostel mess serves dinner from seven to nine in the evening."
+    document_id = make_document(content)
+    index_document(db, document_id, content)
+    body = client.get("/api/v1/retrieve", params={"q": "when is dinner served?", "max_tokens": 100}).json()
+    assert document_id in {chunk["document_id"] for chunk in body["chunks"]}
+    assert body["total_tokens"] <= 100
+
+def test_empty_retrieve_query_is_400(client):
+    assert client.get("/api/v1/retrieve", params={"q": '"'}).status_code == 400
+
+def test_retrieve_failure_is_500(server_errors_client, monkeypatch):
+    def broken(*args, **kwargs):
+        raise OperationalError("SELECT ...", {}, Exception("database is locked"))
+
+    monkeypatch.setattr("app.routes.retrieve_chunks", broken)
+    assert server_errors_client.get("/api/v1/retrieve", params={"q": "fees"}).status_code == 500
+
+def fts_rows(db, table, document_id):
+    return db.execute(text(f"SELECT rowid, page FROM {table} WHERE document_id = :id"), {"id": document_id}).all()
+
+def test_reindexing_replaces_only_that_documents_rows(db, make_document):
+    first = make_document("placeholder")
+    second = make_document("placeholder")
+    index_document(db, first, paged_text("Library fines double after a week.", "Renewals are free online."))
+    index_document(db, second, "Hostel rooms are allotted by seniority.")
+    index_document(db, first, paged_text("Library fines are waived this month."))
+
+    assert [page for _, page in fts_rows(db, "document_pages_fts", first)] == [1]
+    assert len(fts_rows(db, "document_chunks_fts", first)) == 1
+    assert len(fts_rows(db, "document_pages_fts", second)) == 1
+    # Each document's rows sit in its own rowid block
+    first_rowids = {rowid for rowid, _ in fts_rows(db, "document_pages_fts", first)}
+    second_rowids = {rowid for rowid, _ in fts_rows(db, "document_pages_fts", second)}
+    assert {rowid // ROWS_PER_DOCUMENT for rowid in first_rowids}.isdisjoint(
+        rowid // ROWS_PER_DOCUMENT for rowid in second_rowids
+    )
+
+def test_index_built_before_rowid_blocks_is_rebuilt(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_PAGES_FTS))
+        conn.execute(text(CREATE_CHUNKS_FTS))
+        conn.execute(text("INSERT INTO document_pages_fts (document_id, page, content) VALUES ('old', 1, 'Old row')"))
+    (tmp_path / "old.txt").write_text("Exam halls open at nine.", encoding="utf-8")
+
+    ensure_search_index(engine)
+    session = Session(engine)
+    try:
+        assert index_missing_documents(session, tmp_path) == 1
+        assert index_missing_documents(session, tmp_path) == 0
+        rows = fts_rows(session, "document_pages_fts", "old")
+        assert [page for _, page in rows] == [1]
+        assert rows[0][0] >= ROWS_PER_DOCUMENT
+    finally:
+        session.close()
+        engine.dispose()
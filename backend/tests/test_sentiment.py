@@ -0,0 +1,45 @@
+from datetime import datetime
+from app.models import Feedback
+from app.utils import feedback as feedback_utils
+from app.utils.sentiment import score_batch
+
+class InlinePool:
+    """Stands in for the process pool, counting how often one is started."""
+    started = 0
+
+    def __init__(self, processes=None):
+        InlinePool.started += 1
+        self.maps = 0
+
+    def map(self, fn, *iterables):
+        self.maps += 1
+        return map(fn, *iterables)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+def test_score_batch_keeps_input_order_and_scores_duplicates_once():
+    result = score_batch(["great course", "terrible lab", "great course"], "textblob")
+    labels = [sentiment["overall_sentiment"] for sentiment in result["sentiments"]]
+    assert labels == ["positive", "negative", "positive"]
+    assert result["stats"]["unique_messages"] == 2
+
+def test_rescore_uses_one_pool_for_every_batch(db, monkeypatch):
+    db.add_all(
+        Feedback(message=f"The lectures were great, week {i}", user_id=1, created_at=datetime(2025, 2, 1))
+        for i in range(7)
+    )
+    db.commit()
+    monkeypatch.setattr("app.utils.sentiment.PARALLEL_THRESHOLD", 1)
+    monkeypatch.setattr(feedback_utils, "scoring_pool", InlinePool)
+    InlinePool.started = 0
+
+    result = feedback_utils.rescore_feedback(db, "textblob", batch_size=3, processes=2)
+
+    assert result["messages"] >= 7
+    assert InlinePool.started == 1
+    rescored = db.query(Feedback).filter(Feedback.message.like("The lectures were great, week %")).all()
+    assert {row.sentiment_label for row in rescored} == {"positive"}
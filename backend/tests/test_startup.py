@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from app.utils.startup import StartupTasks
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+def test_tasks_run_in_order_and_failures_do_not_block_readiness():
+    events = []
+
+    @contextmanager
+    def lock(name):
+        events.append(f"lock {name}")
+        yield
+        events.append(f"unlock {name}")
+
+    def fail():
+        raise RuntimeError("index is corrupt")
+
+    tasks = StartupTasks(lock=lock)
+    tasks.add("backfill", lambda: events.append("backfill"), shared=True)
+    tasks.add("broken", fail)
+    tasks.add("warm_up", lambda: events.append("warm_up"))
+    assert not tasks.ready
+    assert tasks.to_dict()["backfill"]["status"] == "pending"
+
+    tasks.start()
+    assert tasks.wait(5)
+    # Only shared tasks hold the cross-worker lock
+    assert events == ["lock backfill", "backfill", "unlock backfill", "warm_up"]
+    status = tasks.to_dict()
+    assert [status[name]["status"] for name in ("backfill", "broken", "warm_up")] == ["done", "failed", "done"]
+    assert status["broken"]["error"] == "index is corrupt"
+    assert tasks.ready
+
+def test_ready_reports_the_startup_tasks(app, client, monkeypatch):
+    body = client.get("/ready").json()
+    assert body["ready"] is True
+    assert body["tasks"]["create_admin_user"]["status"] == "done"
+    assert "import_seconds" in body and "startup_seconds" in body
+
+    pending = StartupTasks()
+    pending.add("warm_up_ocr", lambda: None)
+    monkeypatch.setattr(app, "startup_tasks", pending)
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["tasks"]["warm_up_ocr"]["status"] == "pending"
+    assert client.get("/health").status_code == 200
+
+def test_importing_the_app_does_not_load_ocr_or_nlp_libraries():
+    libraries = ("pytesseract", "pdf2image", "PIL", "textblob", "nltk", "google.generativeai")
+    with tempfile.TemporaryDirectory() as data_dir:
+        result = subprocess.run(
+            [sys.executable, "-c", f"import sys, main; print([m for m in {libraries!r} if m in sys.modules])"],
+            cwd=BACKEND_DIR,
+            env={**os.environ, "DATA_DIR": data_dir, "LLM_BACKEND": "fake"},
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,98 @@
+import asyncio
+import hashlib
+import os
+import pytest
+from starlette.requests import Request
+from app import routes
+from app.utils.uploads import receive_upload, InvalidUploadError, UploadTooLargeError, UploadSizeLimitMiddleware
+
+BOUNDARY = "test-boundary"
+
+def multipart_body(parts) -> bytes:
+    body = b""
+    for name, filename, content in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        body += f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n".encode() + content + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+def streamed_request(body: bytes, chunk_size: int) -> Request:
+    # A request whose body arrives in small pieces, as from a slow client
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": headers}, receive)
+
+def test_receive_upload_streams_the_file_part(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.config.UPLOAD_CHUNK_BYTES", 64)
+    content = os.urandom(5000)
+    body = multipart_body([("note", None, b"ignored"), ("file", "scan.png", content)])
+    destination = tmp_path / "upload.part"
+    filename, size, digest = asyncio.run(receive_upload(streamed_request(body, 7), destination))
+    assert (filename, size, digest) == ("scan.png", len(content), hashlib.sha256(content).hexdigest())
+    assert destination.read_bytes() == content
+
+def test_receive_upload_removes_the_partial_file_over_the_limit(tmp_path):
+    body = multipart_body([("file", "big.pdf", b"x" * 1000)])
+    destination = tmp_path / "upload.part"
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(receive_upload(streamed_request(body, 100), destination, max_bytes=500))
+    assert not destination.exists()
+
+def test_receive_upload_needs_the_file_field(tmp_path):
+    body = multipart_body([("other", "scan.png", b"data")])
+    destination = tmp_path / "upload.part"
+    with pytest.raises(InvalidUploadError):
+        asyncio.run(receive_upload(streamed_request(body, 100), destination))
+    assert not destination.exists()
+
+def test_upload_stores_the_file_once(client):
+    content = os.urandom(4096)
+    response = client.post("/api/v1/upload/", files={"file": ("scan.png", content, "image/png")})
+    assert response.status_code == 202, response.text
+    stored = routes.UPLOAD_DIR / response.json()["filename"]
+    assert stored.read_bytes() == content
+    assert response.json()["filename"].endswith("_scan.png")
+    assert not list(routes.UPLOAD_DIR.glob("*.part"))
+
+def test_upload_over_the_limit_is_413(client, monkeypatch):
+    monkeypatch.setattr("app.config.MAX_UPLOAD_BYTES", 1000)
+    response = client.post("/api/v1/upload/", files={"file": ("big.png", b"x" * 2000, "image/png")})
+    assert response.status_code == 413
+    assert not list(routes.UPLOAD_DIR.glob("*.part"))
+
+def test_upload_without_a_file_is_422(client):
+    response = client.post("/api/v1/upload/", data={"note": "no file"}, files={"other": ("a.png", b"x")})
+    assert response.status_code == 422
+    response = client.post("/api/v1/upload/", content=b"{}", headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+
+def test_upload_removes_the_received_file_when_storing_fails(client, monkeypatch):
+    def fail(db, digest):
+        raise RuntimeError("database is gone")
+    monkeypatch.setattr("app.utils.documents.find_document_by_hash", fail)
+    response = client.post("/api/v1/upload/", files={"file": ("scan.png", os.urandom(2048), "image/png")})
+    assert response.status_code == 500
+    assert not list(routes.UPLOAD_DIR.glob("*.part"))
+
+def test_early_413_carries_cors_headers(app, client, monkeypatch):
+    layer = app.app.middleware_stack
+    while not isinstance(layer, UploadSizeLimitMiddleware):
+        layer = layer.app
+    monkeypatch.setattr(layer, "max_bytes", 10)
+    monkeypatch.setattr(layer, "OVERHEAD_BYTES", 0)
+    response = client.post(
+        "/api/v1/upload/",
+        files={"file": ("big.png", b"x" * 2000, "image/png")},
+        headers={"Origin": "http://localhost:5173"},
+    )
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"] == "http://localhost:5173"
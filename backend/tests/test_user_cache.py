@@ -0,0 +1,124 @@
+import time
+from types import SimpleNamespace
+from datetime import datetime
+import pytest
+from sqlalchemy import event, text
+from app.database import async_engine
+from app.models import UserDB
+from app.utils.user_cache import UserCache, user_cache
+
+TRENDS = "/api/v1/feedback/trends"
+# Needs nothing from the database after authentication
+CACHE_STATS = "/api/v1/auth/cache"
+
+def row(email="a@example.edu", token_version=0):
+    return SimpleNamespace(
+        id=1, email=email, username="a", full_name="A", user_type="student",
+        created_at=datetime(2025, 1, 1), is_active=True, token_version=token_version,
+    )
+
+@pytest.fixture
+def statements():
+    """
+    SQL statements run by request handlers while the test runs.
+    """
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+@pytest.fixture
+def later(monkeypatch):
+    """
+    Move the user cache's clock forward by some seconds.
+    """
+    def advance(seconds: float):
+        now = time.monotonic() + seconds
+        monkeypatch.setattr("app.utils.user_cache.time", SimpleNamespace(monotonic=lambda: now))
+    return advance
+
+def test_put_started_before_an_invalidation_is_not_cached():
+    cache = UserCache(max_size=10, ttl=60, check_interval=5)
+    generation = cache.generation
+    # ...the lookup is still running when the user is deleted
+    cache.invalidate("a@example.edu")
+    cache.put(row(), generation)
+    assert cache.get("a@example.edu") is None
+
+    cache.put(row(), cache.generation)
+    cached = cache.get("a@example.edu")
+    assert (cached.user.email, cached.token_version, cached.check_due) == ("a@example.edu", 0, False)
+
+def test_check_falls_due_after_the_interval():
+    cache = UserCache(max_size=10, ttl=60, check_interval=0)
+    cache.put(row())
+    assert cache.get("a@example.edu").check_due
+    cache.check_interval = 60
+    cache.confirm("a@example.edu", 0)
+    assert not cache.get("a@example.edu").check_due
+
+def test_hits_do_not_query_the_database(client, create_user, statements):
+    user, headers = create_user()
+    assert client.get(CACHE_STATS, headers=headers).status_code == 403
+    statements.clear()
+    for _ in range(3):
+        assert client.get(CACHE_STATS, headers=headers).status_code == 403
+    assert statements == []
+
+def test_deleted_user_loses_access(client, admin_headers, create_user):
+    user, headers = create_user()
+    # Authenticated (and now cached), but not an admin
+    assert client.get(TRENDS, headers=headers).status_code == 403
+    assert client.delete(f"/api/v1/users/{user['id']}", headers=admin_headers).status_code == 200
+    assert client.get(TRENDS, headers=headers).status_code == 401
+
+def test_bulk_delete_in_this_process_applies_at_once(client, db, create_user):
+    user, headers = create_user()
+    assert client.get(TRENDS, headers=headers).status_code == 403
+    db.query(UserDB).filter(UserDB.id == user["id"]).delete(synchronize_session=False)
+    db.commit()
+    assert client.get(TRENDS, headers=headers).status_code == 401
+
+def test_bulk_update_bumps_token_version_and_applies_at_once(client, db, create_user):
+    user, headers = create_user()
+    assert client.get(TRENDS, headers=headers).status_code == 403
+    before = db.get(UserDB, user["id"]).token_version
+    db.query(UserDB).filter(UserDB.id == user["id"]).update({"user_type": "admin"}, synchronize_session=False)
+    db.commit()
+    db.expire_all()
+    assert db.get(UserDB, user["id"]).token_version == before + 1
+    assert client.get(TRENDS, headers=headers).status_code == 200
+
+def test_change_by_another_worker_applies_within_the_check_interval(client, db, create_user, later):
+    user, headers = create_user()
+    assert client.get(TRENDS, headers=headers).status_code == 403
+    # What another worker's update writes; no events fire in this process
+    db.execute(
+        text("UPDATE users SET user_type = 'admin', token_version = token_version + 1 WHERE id = :id"),
+        {"id": user["id"]},
+    )
+    db.commit()
+    # Served from the cache until the entry is due for its check
+    assert client.get(TRENDS, headers=headers).status_code == 403
+    later(user_cache.check_interval + 1)
+    assert client.get(TRENDS, headers=headers).status_code == 200
+
+def test_delete_by_another_worker_applies_within_the_check_interval(client, db, create_user, later):
+    user, headers = create_user()
+    assert client.get(TRENDS, headers=headers).status_code == 403
+    db.execute(text("DELETE FROM users WHERE id = :id"), {"id": user["id"]})
+    db.commit()
+    later(user_cache.check_interval + 1)
+    assert client.get(TRENDS, headers=headers).status_code == 401
+
+def test_orm_update_bumps_token_version(db, create_user):
+    user, _ = create_user()
+    row = db.get(UserDB, user["id"])
+    before = row.token_version
+    row.full_name = "Renamed Student"
+    db.commit()
+    assert row.token_version == before + 1
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+import uuid
+from app.models import UserDB
+from app.utils.passwords import PasswordHasher, pwd_context
+
+def csv_rows(count: int) -> bytes:
+    batch = uuid.uuid4().hex[:8]
+    lines = ["email,username,full_name,password"] + [
+        f"import-{batch}-{i}@example.edu,import-{batch}-{i},Imported Student {i},secret123" for i in range(count)
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+def import_file(client, admin_headers, content: bytes, filename: str = "users.csv"):
+    response = client.post(
+        "/api/v1/users/import",
+        files={"file": (filename, content, "text/csv")},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_import_reports_every_row(client, admin_headers):
+    content = csv_rows(3) + b"not-an-email,someone,Someone,secret123\n"
+    report = import_file(client, admin_headers, content)
+    assert (report["created"], report["invalid"], report["complete"]) == (3, 1, True)
+    assert [result["row"] for result in report["results"]] == [1, 2, 3, 4]
+
+def test_unreadable_csv_keeps_the_partial_report(client, admin_headers, db):
+    # A field over the csv module's size limit, e.g. from a missing closing quote
+    content = csv_rows(3) + b"x" * 200_000 + b",x,y,z\n" + csv_rows(2).split(b"\n", 1)[1]
+    report = import_file(client, admin_headers, content)
+    assert report["complete"] is False
+    assert report["created"] == 3
+    assert report["error"] == 1
+    error = report["results"][-1]
+    assert (error["row"], error["status"]) == (4, "error")
+    assert "row 4" in report["read_error"]
+    created = [result["email"] for result in report["results"] if result["status"] == "created"]
+    assert db.query(UserDB).filter(UserDB.email.in_(created)).count() == 3
+
+def test_bad_encoding_after_committed_batches_keeps_the_partial_report(client, admin_headers, db, monkeypatch):
+    # Small batches, so some are committed before the bad bytes are read
+    monkeypatch.setattr("app.utils.user_import.IMPORT_BATCH_SIZE", 50)
+    content = csv_rows(300) + b"\xff\xfe broken,x,y,z\n"
+    report = import_file(client, admin_headers, content)
+    assert report["complete"] is False
+    assert report["created"] > 0
+    assert report["created"] + report["error"] == report["total"]
+    created = [result["email"] for result in report["results"] if result["status"] == "created"]
+    assert db.query(UserDB).filter(UserDB.email.in_(created)).count() == report["created"]
+
+def test_import_hashes_on_the_shared_executor_without_crowding_out_logins(monkeypatch):
+    hasher = PasswordHasher(workers=2, queue_limit=1)
+    most_in_flight = []
+    real_hash = pwd_context.hash
+
+    def slow_hash(password):
+        most_in_flight.append(hasher.in_flight)
+        time.sleep(0.01)
+        return real_hash(password)
+
+    monkeypatch.setattr(pwd_context, "hash", slow_hash)
+    imports = [threading.Thread(target=hasher.hash_many, args=(["secret123"] * 10,)) for _ in range(3)]
+    for thread in imports:
+        thread.start()
+    # Three imports at once still leave room for a login on top of them
+    for _ in range(5):
+        assert asyncio.run(hasher.hash("login-password"))
+    for thread in imports:
+        thread.join()
+    assert max(most_in_flight) <= hasher.workers + 1
+    assert hasher.in_flight == 0
@@ -0,0 +1,64 @@
+import json
+import uuid
+import pytest
+from app.utils.pagination import encode_cursor
+
+@pytest.fixture
+def faculty(client):
+    """
+    Five faculty members whose names share a fresh prefix, returned by id.
+    """
+    prefix = f"Zq{uuid.uuid4().hex[:6]}"
+    created = []
+    for i in range(5):
+        suffix = uuid.uuid4().hex[:8]
+        response = client.post("/api/v1/faculty/", json={
+            "email": f"faculty-{suffix}@example.edu",
+            "username": f"faculty-{suffix}",
+            "full_name": f"{prefix} Lecturer {i}",
+            "password": "secret123",
+            "user_type": "faculty",
+        })
+        assert response.status_code == 200, response.text
+        created.append(response.json())
+    return prefix, sorted(created, key=lambda user: user["id"])
+
+def test_cursor_pages_through_every_match_once(client, faculty):
+    prefix, created = faculty
+    seen, cursor = [], None
+    while True:
+        params = {"q": prefix, "limit": 2, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/api/v1/faculty/", params=params).json()
+        seen += [user["id"] for user in body["users"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [user["id"] for user in created]
+
+def test_prefix_search_ignores_case_and_matches_email(client, faculty):
+    prefix, created = faculty
+    by_name = client.get("/api/v1/faculty/", params={"q": prefix.lower()}).json()["users"]
+    assert len(by_name) == 5
+    email = created[0]["email"]
+    by_email = client.get("/api/v1/faculty/", params={"q": email[:-4].upper()}).json()["users"]
+    assert [user["id"] for user in by_email] == [created[0]["id"]]
+    # Students are listed separately
+    assert client.get("/api/v1/students/", params={"q": prefix}).json()["users"] == []
+
+def test_fields_select_columns(client, faculty):
+    prefix, _ = faculty
+    users = client.get("/api/v1/faculty/", params={"q": prefix, "fields": "full_name"}).json()["users"]
+    assert all(set(user) == {"id", "full_name"} for user in users)
+    assert client.get("/api/v1/faculty/", params={"fields": "password"}).status_code == 400
+
+def test_ndjson_streams_every_match(client, faculty):
+    prefix, created = faculty
+    response = client.get("/api/v1/faculty/", params={"q": prefix, "format": "ndjson", "limit": 1})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [user["id"] for user in lines] == [user["id"] for user in created]
+    assert all("password" not in user for user in lines)
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor("1"), encode_cursor(1, 2)])
+def test_invalid_cursor_is_a_client_error(client, cursor):
+    assert client.get("/api/v1/faculty/", params={"cursor": cursor}).status_code == 400
@@ -13,9 +13,15 @@ import {
   Paper,
   Tabs,
   Tab,
+  Pagination,
+  FormControlLabel,
+  Switch,
 } from '@mui/material';
 import GeminiChat from './GeminiChat';
 
+const PAGE_SIZE = 30;
+const API_URL = 'http://localhost:8000/api/v1';
+
 const DocumentList = () => {
   const [documents, setDocuments] = useState([]);
   const [selectedDocument, setSelectedDocument] = useState(null);
@@ -23,19 +29,31 @@ const DocumentList = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [tabValue, setTabValue] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Page numbers of the open document; its text is fetched one page at a time
+  const [pageNumbers, setPageNumbers] = useState([]);
+  const [pageIndex, setPageIndex] = useState(0);
+  const [pageContent, setPageContent] = useState('');
+  const [chatCurrentPage, setChatCurrentPage] = useState(false);
 
   useEffect(() => {
     fetchDocuments();
   }, []);
 
-  const fetchDocuments = async () => {
+  const fetchDocuments = async (cursor = null) => {
     try {
-      const response = await fetch('http://localhost:8000/api/v1/documents/');
+      const params = new URLSearchParams({ limit: PAGE_SIZE });
+      if (cursor) {
+        params.set('cursor', cursor);
+      }
+      const response = await fetch(`${API_URL}/documents/?${params}`);
       if (!response.ok) {
         throw new Error('Failed to fetch documents');
       }
       const data = await response.json();
-      setDocuments(data);
+      setDocuments((prev) => (cursor ? [...prev, ...data.documents] : data.documents));
+      setNextCursor(data.next_cursor);
     } catch (err) {
       setError(err.message);
     } finally {
@@ -43,24 +61,58 @@ const DocumentList = () => {
     }
   };
 
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    await fetchDocuments(nextCursor);
+    setLoadingMore(false);
+  };
+
+  const fetchPage = async (documentId, page) => {
+    const response = await fetch(`${API_URL}/document/${encodeURIComponent(documentId)}/pages/${page}`);
+    if (!response.ok) {
+      throw new Error('Failed to fetch document content');
+    }
+    const data = await response.json();
+    setPageContent(data.content);
+  };
+
   const handleDocumentClick = async (document) => {
     try {
-      const response = await fetch(`http://localhost:8000/api/v1/document/${document.id}`);
+      const response = await fetch(`${API_URL}/document/${encodeURIComponent(document.id)}/pages`);
       if (!response.ok) {
         throw new Error('Failed to fetch document content');
       }
       const data = await response.json();
-      setSelectedDocument({ ...document, content: data.content });
+      const numbers = data.pages.map((entry) => entry.page);
+      setPageNumbers(numbers);
+      setPageIndex(0);
+      setPageContent('');
+      if (numbers.length > 0) {
+        await fetchPage(document.id, numbers[0]);
+      }
+      setSelectedDocument(document);
       setOpen(true);
     } catch (err) {
       setError(err.message);
     }
   };
 
+  const handlePageChange = async (event, value) => {
+    setPageIndex(value - 1);
+    try {
+      await fetchPage(selectedDocument.id, pageNumbers[value - 1]);
+    } catch (err) {
+      setError(err.message);
+    }
+  };
+
   const handleClose = () => {
     setOpen(false);
     setSelectedDocument(null);
     setTabValue(0);
+    setPageNumbers([]);
+    setPageContent('');
+    setChatCurrentPage(false);
   };
 
   const handleTabChange = (event, newValue) => {
@@ -115,6 +167,13 @@ const DocumentList = () => {
           </Grid>
         ))}
       </Grid>
+      {nextCursor && (
+        <Box sx={{ mt: 3, textAlign: 'center' }}>
+          <Button variant="outlined" onClick={handleLoadMore} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </Button>
+        </Box>
+      )}
 
       <Dialog
         open={open}
@@ -140,14 +199,36 @@ const DocumentList = () => {
               }}
             >
               <Typography variant="body1">
-                {selectedDocument?.content}
+                {pageContent}
               </Typography>
             </Paper>
           ) : (
-            <GeminiChat
-              extractedText={selectedDocument?.content}
-              docId={selectedDocument?.id}
-            />
+            <>
+              {pageNumbers.length > 1 && (
+                <FormControlLabel
+                  control={
+                    <Switch
+                      checked={chatCurrentPage}
+                      onChange={(event) => setChatCurrentPage(event.target.checked)}
+                    />
+                  }
+                  label={`Only ask about page ${pageNumbers[pageIndex]}`}
+                />
+              )}
+              <GeminiChat
+                docId={selectedDocument?.id}
+                pages={chatCurrentPage ? String(pageNumbers[pageIndex]) : null}
+              />
+            </>
+          )}
+          {tabValue === 0 && pageNumbers.length > 1 && (
+            <Box sx={{ mt: 2, display: 'flex', justifyContent: 'center' }}>
+              <Pagination
+                count={pageNumbers.length}
+                page={pageIndex + 1}
+                onChange={handlePageChange}
+              />
+            </Box>
           )}
         </DialogContent>
         <DialogActions>
@@ -11,12 +11,17 @@ import {
 import { CloudUpload as CloudUploadIcon } from '@mui/icons-material';
 import { userService } from '../services/api';
 
+const POLL_INTERVAL_MS = 1000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
 const DocumentUpload = () => {
   const [file, setFile] = useState(null);
   const [uploading, setUploading] = useState(false);
   const [error, setError] = useState(null);
   const [success, setSuccess] = useState(false);
   const [extractedText, setExtractedText] = useState(null);
+  const [jobStatus, setJobStatus] = useState(null);
 
   const handleFileChange = (event) => {
     const selectedFile = event.target.files[0];
@@ -24,6 +29,20 @@ const DocumentUpload = () => {
     setError(null);
     setSuccess(false);
     setExtractedText(null);
+    setJobStatus(null);
+  };
+
+  // Poll the OCR job until the worker has finished with it
+  const waitForJob = async (jobId) => {
+    for (;;) {
+      const job = await userService.getUploadJob(jobId);
+      setJobStatus(job);
+      if (job.status === 'done') return job;
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Text extraction failed');
+      }
+      await sleep(POLL_INTERVAL_MS);
+    }
   };
 
   const handleUpload = async () => {
@@ -36,12 +55,14 @@ const DocumentUpload = () => {
     setError(null);
     setSuccess(false);
     setExtractedText(null);
+    setJobStatus(null);
 
     try {
       const formData = new FormData();
       formData.append('file', file);
 
       const response = await userService.uploadDocument(formData);
+      await waitForJob(response.job_id);
       setSuccess(true);
       setFile(null);
 
@@ -52,7 +73,7 @@ const DocumentUpload = () => {
         setExtractedText(text);
       }
     } catch (err) {
-      setError(err.response?.data?.detail || 'Error uploading file');
+      setError(err.response?.data?.detail || err.message || 'Error uploading file');
     } finally {
       setUploading(false);
     }
@@ -109,7 +130,11 @@ const DocumentUpload = () => {
           {uploading ? (
             <>
               <CircularProgress size={24} sx={{ mr: 1 }} />
-              Processing...
+              {jobStatus?.status === 'running' && jobStatus.total_pages
+                ? `Processing page ${jobStatus.pages_done} of ${jobStatus.total_pages}...`
+                : jobStatus?.status === 'queued'
+                  ? 'Queued...'
+                  : 'Processing...'}
             </>
           ) : (
             'Upload'
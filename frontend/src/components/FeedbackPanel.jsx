@@ -26,6 +26,8 @@ import SentimentVeryDissatisfiedIcon from '@mui/icons-material/SentimentVeryDiss
 import SentimentNeutralIcon from '@mui/icons-material/SentimentNeutral';
 import DeleteIcon from '@mui/icons-material/Delete';
 
+const PAGE_SIZE = 50;
+
 const FeedbackPanel = () => {
   const [feedback, setFeedback] = useState([]);
   const [sentimentAnalysis, setSentimentAnalysis] = useState(null);
@@ -33,12 +35,14 @@ const FeedbackPanel = () => {
   const [error, setError] = useState(null);
   const [deleteDialogOpen, setDeleteDialogOpen] = useState(false);
   const [selectedFeedback, setSelectedFeedback] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchFeedback();
   }, []);
 
-  const fetchFeedback = async () => {
+  const fetchFeedback = async (cursor = null) => {
     try {
       setError(null);
       const token = localStorage.getItem("token");
@@ -47,14 +51,28 @@ const FeedbackPanel = () => {
       }
 
       const response = await axios.get("http://localhost:8000/api/v1/feedback", {
+        params: { limit: PAGE_SIZE, ...(cursor && { cursor }) },
         headers: {
           Authorization: `Bearer ${token}`,
         },
       });
 
       if (response.data) {
-        setFeedback(response.data.feedback || []);
-        setSentimentAnalysis(response.data.sentiment_analysis);
+        const page = response.data.feedback || [];
+        const sentiments = response.data.sentiment_analysis;
+        setFeedback((prev) => (cursor ? [...prev, ...page] : page));
+        setSentimentAnalysis((prev) =>
+          cursor && prev
+            ? {
+                ...sentiments,
+                individual_sentiments: [
+                  ...prev.individual_sentiments,
+                  ...sentiments.individual_sentiments,
+                ],
+              }
+            : sentiments
+        );
+        setNextCursor(response.data.next_cursor);
       }
     } catch (error) {
       console.error("Error fetching feedback:", error);
@@ -64,6 +82,12 @@ const FeedbackPanel = () => {
     }
   };
 
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    await fetchFeedback(nextCursor);
+    setLoadingMore(false);
+  };
+
   const handleDeleteClick = (feedbackItem) => {
     setSelectedFeedback(feedbackItem);
     setDeleteDialogOpen(true);
@@ -121,7 +145,7 @@ const FeedbackPanel = () => {
         <Alert severity="error" sx={{ mb: 2 }}>
           {error}
         </Alert>
-        <Button variant="contained" onClick={fetchFeedback}>
+        <Button variant="contained" onClick={() => fetchFeedback()}>
           Retry
         </Button>
       </Box>
@@ -232,6 +256,13 @@ const FeedbackPanel = () => {
             </ListItem>
           )}
         </List>
+        {nextCursor && (
+          <Box sx={{ p: 2, textAlign: "center" }}>
+            <Button variant="outlined" onClick={handleLoadMore} disabled={loadingMore}>
+              {loadingMore ? "Loading..." : "Load more"}
+            </Button>
+          </Box>
+        )}
       </Paper>
 
       {/* Delete Confirmation Dialog */}
@@ -1,15 +1,44 @@
 import React, { useState, useEffect, useRef } from "react";
-import axios from "axios";
 import ReactMarkdown from "react-markdown";
 import remarkGfm from "remark-gfm";
 import { Volume2 } from "lucide-react";
 import "./GeminiChat.css";
 
-const GeminiChat = ({ extractedText, docId }) => {
+const CHAT_URL = "http://localhost:8000/api/v1/chat";
+
+// Parse a server-sent event stream, calling onEvent(name, data) per event
+const readEventStream = async (response, onEvent) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let name = "message";
+      let data = "";
+      for (const line of rawEvent.split("\n")) {
+        if (line.startsWith("event: ")) name = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      }
+      onEvent(name, data ? JSON.parse(data) : {});
+    }
+  }
+};
+
+const GeminiChat = ({ docId, pages = null }) => {
   const [userMessage, setUserMessage] = useState("");
   const [chatbotMessages, setChatbotMessages] = useState([]);
   const [isLoading, setIsLoading] = useState(false);
   const [speakingMessage, setSpeakingMessage] = useState(null);
+  const [conversationId, setConversationId] = useState(null);
   const messagesEndRef = useRef(null);
 
   const scrollToBottom = () => {
@@ -26,6 +55,7 @@ const GeminiChat = ({ extractedText, docId }) => {
     const chatKey = `chatHistory_${docId}`;
     const storedChat = JSON.parse(localStorage.getItem(chatKey)) || [];
     setChatbotMessages(storedChat);
+    setConversationId(localStorage.getItem(`chatConversation_${docId}`));
   }, [docId]);
 
   useEffect(() => {
@@ -44,24 +74,43 @@ const GeminiChat = ({ extractedText, docId }) => {
     setIsLoading(true);
 
     try {
-      const apiKey = import.meta.env.VITE_GEMINI_API_KEY;
-      const response = await axios.post(
-        `https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key=${apiKey}`,
-        {
-          contents: [
-            {
-              parts: [
-                { text: `Document Context:\n${extractedText}\n\nUser query: ${userMessage}` },
-              ],
-            },
-          ],
-        }
-      );
+      // The backend already has the document; only the question is sent
+      const response = await fetch(CHAT_URL, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          document_id: docId,
+          question: userMessage,
+          conversation_id: conversationId,
+          // e.g. "7": answer from that page only
+          ...(pages ? { pages } : {}),
+        }),
+      });
+      if (!response.ok) {
+        throw new Error(`Chat request failed: ${response.status}`);
+      }
 
-      const botResponse =
-        response.data?.candidates?.[0]?.content?.parts?.[0]?.text || "No response received.";
+      // Show the answer as it streams in
+      let botResponse = "";
+      setIsLoading(false);
+      setChatbotMessages([...newMessages, { sender: "chatbot", message: "" }]);
+
+      await readEventStream(response, (event, data) => {
+        if (event === "start") {
+          setConversationId(data.conversation_id);
+          localStorage.setItem(`chatConversation_${docId}`, data.conversation_id);
+        } else if (event === "token") {
+          botResponse += data.text;
+          setChatbotMessages([...newMessages, { sender: "chatbot", message: botResponse }]);
+        } else if (event === "error") {
+          throw new Error(data.detail);
+        }
+      });
 
-      const updatedMessages = [...newMessages, { sender: "chatbot", message: botResponse }];
+      const updatedMessages = [
+        ...newMessages,
+        { sender: "chatbot", message: botResponse || "No response received." },
+      ];
       setChatbotMessages(updatedMessages);
       localStorage.setItem(`chatHistory_${docId}`, JSON.stringify(updatedMessages));
     } catch (error) {
@@ -20,30 +20,31 @@ import SendIcon from "@mui/icons-material/Send";
 import CloseIcon from "@mui/icons-material/Close";
 import "./GeminiChat.css";
 import { useAuth } from "../contexts/AuthContext";
+import { userService } from "../services/api";
+
+// Context sent to the model per question, in (estimated) tokens
+const CONTEXT_TOKEN_BUDGET = 3000;
 
 const GlobalChatbot = () => {
   const [open, setOpen] = useState(false);
   const [userMessage, setUserMessage] = useState("");
   const [chatbotMessages, setChatbotMessages] = useState([]);
   const [isLoading, setIsLoading] = useState(false);
-  const [knowledgeBase, setKnowledgeBase] = useState("");
   const messagesEndRef = useRef(null);
   const { user } = useAuth();
 
-  useEffect(() => {
-    fetchKnowledgeBase();
-  }, []);
-
-  const fetchKnowledgeBase = async () => {
+  // Only the passages relevant to the question are sent to the model
+  const fetchKnowledgeBase = async (question) => {
     try {
-      const response = await fetch("http://localhost:8000/api/v1/documents/combined");
-      if (!response.ok) {
-        throw new Error("Failed to fetch knowledge base");
-      }
-      const data = await response.json();
-      setKnowledgeBase(data.content);
+      const data = await userService.retrieveChunks(question, {
+        maxTokens: CONTEXT_TOKEN_BUDGET,
+      });
+      return data.chunks
+        .map((chunk) => `--- Document: ${chunk.filename} (page ${chunk.page}) ---\n${chunk.content}`)
+        .join("\n\n");
     } catch (error) {
       console.error("Error fetching knowledge base:", error);
+      return "";
     }
   };
 
@@ -99,6 +100,7 @@ const GlobalChatbot = () => {
       }
 
       // Regular chatbot response for non-feedback messages
+      const knowledgeBase = await fetchKnowledgeBase(userMessage);
       const apiKey = import.meta.env.VITE_GEMINI_API_KEY;
       const response = await axios.post(
         `https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key=${apiKey}`,
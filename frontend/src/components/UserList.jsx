@@ -22,7 +22,8 @@ import {
   DialogContent,
   DialogActions,
   IconButton,
-  Tooltip
+  Tooltip,
+  TextField
 } from '@mui/material';
 import { userService } from '../services/api';
 import DeleteIcon from '@mui/icons-material/Delete';
@@ -62,9 +63,17 @@ const EmptyState = ({ message }) => (
   </Box>
 );
 
+const PAGE_SIZE = 50;
+// Only the columns the table shows
+const LIST_FIELDS = 'id,full_name,email,user_type';
+
 const UserList = () => {
   const [faculty, setFaculty] = useState([]);
   const [students, setStudents] = useState([]);
+  const [facultyCursor, setFacultyCursor] = useState(null);
+  const [studentsCursor, setStudentsCursor] = useState(null);
+  const [search, setSearch] = useState('');
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [tabValue, setTabValue] = useState(0);
@@ -72,14 +81,17 @@ const UserList = () => {
   const [selectedUser, setSelectedUser] = useState(null);
   const { user } = useAuth();
 
-  const fetchData = async () => {
+  const fetchData = async (q = search) => {
+    const params = { limit: PAGE_SIZE, fields: LIST_FIELDS, q: q.trim() };
     try {
       const [facultyData, studentsData] = await Promise.all([
-        userService.getFaculty(),
-        userService.getStudents()
+        userService.getFaculty(params),
+        userService.getStudents(params)
       ]);
-      setFaculty(facultyData);
-      setStudents(studentsData);
+      setFaculty(facultyData.users);
+      setFacultyCursor(facultyData.next_cursor);
+      setStudents(studentsData.users);
+      setStudentsCursor(studentsData.next_cursor);
     } catch (err) {
       setError('Failed to fetch users');
       console.error('Error fetching users:', err);
@@ -89,8 +101,36 @@ const UserList = () => {
   };
 
   useEffect(() => {
-    fetchData();
-  }, []);
+    // Wait for a pause in typing before searching
+    const timer = setTimeout(() => fetchData(search), 300);
+    return () => clearTimeout(timer);
+  }, [search]);
+
+  const handleLoadMore = async () => {
+    const isFaculty = tabValue === 0;
+    const params = {
+      limit: PAGE_SIZE,
+      fields: LIST_FIELDS,
+      q: search.trim(),
+      cursor: isFaculty ? facultyCursor : studentsCursor
+    };
+    setLoadingMore(true);
+    try {
+      if (isFaculty) {
+        const data = await userService.getFaculty(params);
+        setFaculty((prev) => [...prev, ...data.users]);
+        setFacultyCursor(data.next_cursor);
+      } else {
+        const data = await userService.getStudents(params);
+        setStudents((prev) => [...prev, ...data.users]);
+        setStudentsCursor(data.next_cursor);
+      }
+    } catch (err) {
+      console.error('Error fetching users:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   const handleTabChange = (event, newValue) => {
     setTabValue(newValue);
@@ -144,6 +184,15 @@ const UserList = () => {
             <Tab label="Students" />
           </Tabs>
         </Box>
+        <Box sx={{ px: 3, pt: 2 }}>
+          <TextField
+            fullWidth
+            size="small"
+            label="Search by name or email"
+            value={search}
+            onChange={(e) => setSearch(e.target.value)}
+          />
+        </Box>
 
         <TabPanel value={tabValue} index={0}>
           <Typography variant="h6" gutterBottom>
@@ -185,6 +234,13 @@ const UserList = () => {
               </Table>
             </TableContainer>
           )}
+          {facultyCursor && (
+            <Box sx={{ pt: 2, textAlign: 'center' }}>
+              <Button variant="outlined" onClick={handleLoadMore} disabled={loadingMore}>
+                {loadingMore ? 'Loading...' : 'Load more'}
+              </Button>
+            </Box>
+          )}
         </TabPanel>
 
         <TabPanel value={tabValue} index={1}>
@@ -227,6 +283,13 @@ const UserList = () => {
               </Table>
             </TableContainer>
           )}
+          {studentsCursor && (
+            <Box sx={{ pt: 2, textAlign: 'center' }}>
+              <Button variant="outlined" onClick={handleLoadMore} disabled={loadingMore}>
+                {loadingMore ? 'Loading...' : 'Load more'}
+              </Button>
+            </Box>
+          )}
         </TabPanel>
       </Paper>
 
@@ -16,26 +16,49 @@ export const userService = {
   },
 
   uploadDocument: async (formData) => {
+    const token = localStorage.getItem("token");
     const response = await api.post("/upload/", formData, {
       headers: {
         "Content-Type": "multipart/form-data",
+        ...(token && { Authorization: `Bearer ${token}` }),
       },
     });
     return response.data;
   },
 
+  getUploadJob: async (jobId) => {
+    const response = await api.get(`/upload/jobs/${jobId}`);
+    return response.data;
+  },
+
+  searchDocuments: async (query, { limit = 20, offset = 0 } = {}) => {
+    const response = await api.get("/search", { params: { q: query, limit, offset } });
+    return response.data;
+  },
+
+  retrieveChunks: async (question, { k = 8, maxTokens = 2000 } = {}) => {
+    const response = await api.get("/retrieve", {
+      params: { q: question, k, max_tokens: maxTokens },
+    });
+    return response.data;
+  },
+
   getUsers: async () => {
     const response = await api.get("/users/");
     return response.data;
   },
 
-  getFaculty: async () => {
-    const response = await api.get("/faculty/");
+  getFaculty: async ({ limit = 50, cursor, q, fields } = {}) => {
+    const response = await api.get("/faculty/", {
+      params: { limit, ...(cursor && { cursor }), ...(q && { q }), ...(fields && { fields }) },
+    });
     return response.data;
   },
 
-  getStudents: async () => {
-    const response = await api.get("/students/");
+  getStudents: async ({ limit = 50, cursor, q, fields } = {}) => {
+    const response = await api.get("/students/", {
+      params: { limit, ...(cursor && { cursor }), ...(q && { q }), ...(fields && { fields }) },
+    });
     return response.data;
   },
 
@@ -53,6 +76,19 @@ export const userService = {
     const response = await api.post("/students/", studentData);
     return response.data;
   },
+
+  importUsers: async (file, userType = "student") => {
+    const formData = new FormData();
+    formData.append("file", file);
+    const response = await api.post("/users/import", formData, {
+      params: { user_type: userType },
+      headers: {
+        "Content-Type": "multipart/form-data",
+        Authorization: `Bearer ${localStorage.getItem("token")}`,
+      },
+    });
+    return response.data;
+  },
 };
 
 export default api;